@@ -0,0 +1,11 @@
+"""Headless benchmark suite of droplet.
+
+Benchmarks time the C generation engine, the ctypes boundary (streaming and
+array extraction) and the Python post-processing (colour profiles and raster
+rendering) across lattice types, attractor types and particle counts. Results
+are written as JSON and can be compared against a stored baseline to flag
+regressions. Run from the repository root, e.g.
+
+    python -m benchmarks run --output results.json
+    python -m benchmarks compare baseline.json results.json
+"""
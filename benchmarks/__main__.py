@@ -0,0 +1,57 @@
+"""Command line interface of the benchmark suite, see `benchmarks`."""
+import argparse
+import json
+import sys
+from benchmarks import suite
+
+def _run(args):
+    sizes = (500,) if args.quick else args.sizes
+    repeat = 1 if args.quick else args.repeat
+    results = suite.run(args.cases, sizes, repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+def _compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = suite.compare(baseline, current, args.threshold)
+    nregressed = 0
+    for (name, params), before, after, ratio, regressed in rows:
+        nregressed += regressed
+        print("{:<9} {:<70} {:12.6f} s -> {:12.6f} s  {:6.2f}x{}".format(
+            name, params, before, after, ratio, "  REGRESSION" if regressed else ""))
+    print("{} of {} benchmarks regressed by more than {:.0%}.".format(
+        nregressed, len(rows), args.threshold))
+    return 1 if nregressed else 0
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description="droplet benchmark suite.")
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+    run = commands.add_parser('run', help="run benchmarks")
+    run.add_argument('--cases', nargs='+', choices=sorted(suite.CASES),
+                     help="cases to run, defaults to all")
+    run.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000],
+                     help="particle counts to benchmark at")
+    run.add_argument('--repeat', type=int, default=3,
+                     help="timed repeats of each benchmark, the best is kept")
+    run.add_argument('--quick', action='store_true',
+                     help="single small run of each benchmark, as a smoke test")
+    run.add_argument('--output', '-o', help="path of the JSON results file")
+    run.set_defaults(func=_run)
+    cmp_ = commands.add_parser('compare', help="flag regressions against a baseline")
+    cmp_.add_argument('baseline', help="JSON results of the reference run")
+    cmp_.add_argument('current', help="JSON results of the run to check")
+    cmp_.add_argument('--threshold', type=float, default=0.1,
+                      help="relative slow-down flagged as a regression")
+    cmp_.set_defaults(func=_compare)
+    args = parser.parse_args()
+    return args.func(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
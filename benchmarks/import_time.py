@@ -0,0 +1,55 @@
+"""Benchmark of the time taken to import droplet in a fresh interpreter.
+
+Importing droplet must stay cheap for headless batch workers, e.g. those of
+`droplet.ensemble`, so it must neither import matplotlib nor load the shared
+library. Each sample imports droplet in a new interpreter; the script exits
+with a non-zero status if either constraint is broken, or if the median time
+exceeds `--max-ms`.
+
+Run from the repository root with `python benchmarks/import_time.py`.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PROBE = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "import droplet\n"
+    "elapsed = time.perf_counter() - start\n"
+    "print(1e3*elapsed, 'matplotlib' in sys.modules, droplet.dla.LIBDRP.loaded)\n")
+
+def sample():
+    """Imports droplet in a fresh interpreter, returning the import time in
+    milliseconds and whether matplotlib and the shared library were loaded."""
+    out = subprocess.check_output([sys.executable, '-c', _PROBE], cwd=_ROOT)
+    millis, mpl, lib = out.decode().split()
+    return float(millis), mpl == 'True', lib == 'True'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10,
+                        help="number of fresh interpreters to sample")
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help="maximum allowed median import time in milliseconds")
+    args = parser.parse_args()
+    samples = [sample() for _ in range(args.repeat)]
+    times = sorted(s[0] for s in samples)
+    median = times[len(times)//2]
+    print("import droplet: median {:.1f} ms, min {:.1f} ms over {} runs".format(
+        median, times[0], len(times)))
+    failures = []
+    if any(s[1] for s in samples):
+        failures.append("matplotlib was imported")
+    if any(s[2] for s in samples):
+        failures.append("the shared library was loaded")
+    if args.max_ms is not None and median > args.max_ms:
+        failures.append("median import time exceeds {:.1f} ms".format(args.max_ms))
+    for failure in failures:
+        print("FAIL: {}".format(failure))
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
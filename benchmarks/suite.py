@@ -0,0 +1,222 @@
+"""Benchmark cases and the runner collecting their results."""
+import itertools
+import platform
+import time
+import numpy as np
+import droplet as drp
+import droplet.colorprofiles as clrpr
+
+_ATTRACTORS = {
+    2 : (drp.AttractorType.POINT, drp.AttractorType.LINE),
+    3 : (drp.AttractorType.POINT, drp.AttractorType.LINE, drp.AttractorType.PLANE)
+}
+
+def _best_time(func, setup=None, repeat=3):
+    """Returns the minimum wall-clock time of `repeat` calls of `func`, each
+    passed the return value of an untimed call of `setup` if given, along with
+    the return value of the final call."""
+    best, ret = float('inf'), None
+    for _ in range(repeat):
+        arg = setup() if setup is not None else None
+        start = time.perf_counter()
+        ret = func(arg) if setup is not None else func()
+        best = min(best, time.perf_counter() - start)
+    return best, ret
+
+def _aggregate(dims, nparticles, engine=drp.WalkEngine.LONG_JUMP, **kwargs):
+    """Returns a new seeded aggregate of `nparticles`."""
+    cls = drp.Aggregate2D if dims == 2 else drp.Aggregate3D
+    agg = cls(seed=1, engine=engine, **kwargs)
+    agg.generate(nparticles, display_progress=False)
+    return agg
+
+def _record(name, params, seconds, **metrics):
+    return {'name' : name, 'params' : params, 'seconds' : seconds, 'metrics' : metrics}
+
+def bench_generate(sizes, repeat):
+    """Times single-threaded generation, reporting particles and lattice steps
+    per second, for every lattice, attractor, engine and particle count."""
+    for dims in (2, 3):
+        for lattice, attractor, engine, n in itertools.product(
+                drp.LatticeType, _ATTRACTORS[dims], drp.WalkEngine, sizes):
+            cls = drp.Aggregate2D if dims == 2 else drp.Aggregate3D
+            def setup():
+                return cls(seed=1, lattice_type=lattice, attractor_type=attractor,
+                           engine=engine)
+            def run(agg):
+                agg.generate(n, display_progress=False)
+                return agg
+            seconds, agg = _best_time(run, setup, repeat)
+            stats = agg.stats
+            steps = stats['count']*stats['mean_steps']
+            params = {'dims' : dims, 'lattice' : lattice.name, 'attractor' : attractor.name,
+                      'engine' : engine.name, 'n' : n}
+            yield _record('generate', params, seconds, particles_per_s=n/seconds,
+                          steps_per_s=steps/seconds)
+
+def bench_engines(sizes, repeat):
+    """Times generation with each walk engine around a point attractor,
+    reporting the speed-up of `LONG_JUMP` over `UNIT_STEP` for every spawn
+    type, which should not fall below one. As the walk of a single aggregate
+    varies widely in length, times are averaged over `repeat` seeds, the
+    engines alternating between them."""
+    for dims, spawn, n in itertools.product((2, 3), drp.SpawnType, sizes):
+        cls = drp.Aggregate2D if dims == 2 else drp.Aggregate3D
+        seconds = dict((engine, 0.0) for engine in drp.WalkEngine)
+        for seed in range(1, repeat + 1):
+            for engine in drp.WalkEngine:
+                agg = cls(seed=seed, spawn_type=spawn, engine=engine)
+                start = time.perf_counter()
+                agg.generate(n, display_progress=False)
+                seconds[engine] += (time.perf_counter() - start)/repeat
+        unit = seconds[drp.WalkEngine.UNIT_STEP]
+        jump = seconds[drp.WalkEngine.LONG_JUMP]
+        params = {'dims' : dims, 'spawn' : spawn.name, 'n' : n}
+        yield _record('engines', params, jump, unit_step_s=unit, speedup=unit/jump)
+
+def bench_stream(sizes, repeat):
+    """Times `generate_stream` for single-particle and batched yields."""
+    for dims, batch, n in itertools.product((2, 3), (1, 100), sizes):
+        cls = drp.Aggregate2D if dims == 2 else drp.Aggregate3D
+        def setup():
+            return cls(seed=1, engine=drp.WalkEngine.LONG_JUMP)
+        def run(agg):
+            for _ in agg.generate_stream(n, batch=batch):
+                pass
+        seconds, _ = _best_time(run, setup, repeat)
+        params = {'dims' : dims, 'batch' : batch, 'n' : n}
+        yield _record('stream', params, seconds, particles_per_s=n/seconds)
+
+def bench_extract(sizes, repeat):
+    """Times copying the co-ordinates and required steps out of an aggregate."""
+    for dims, n in itertools.product((2, 3), sizes):
+        agg = _aggregate(dims, n)
+        for what, func in (('as_ndarray', agg.as_ndarray),
+                           ('required_steps', agg.required_steps_as_ndarray)):
+            seconds, arr = _best_time(func, repeat=max(repeat, 5))
+            params = {'dims' : dims, 'array' : what, 'n' : n}
+            yield _record('extract', params, seconds, bytes_per_s=arr.nbytes/seconds)
+
+def bench_colors(sizes, repeat):
+    """Times computing the colours of every particle for each colour profile
+    and coloured quantity."""
+    for n in sizes:
+        agg = _aggregate(2, n)
+        for profile, color_by in itertools.product(clrpr.ColorProfile, clrpr.ColorBy):
+            seconds, _ = _best_time(
+                lambda: clrpr.particle_colors(agg, profile, color_by), repeat=max(repeat, 5))
+            params = {'profile' : profile.name, 'color_by' : color_by.name, 'n' : n}
+            yield _record('colors', params, seconds, particles_per_s=n/seconds)
+
+def bench_render(sizes, repeat):
+    """Times raster rendering of 2D aggregates and of both projections of 3D
+    aggregates."""
+    from droplet.plotting import rasterize_aggregate
+    for n in sizes:
+        for dims, projection in ((2, None), (3, 'depth'), (3, 'max')):
+            agg = _aggregate(dims, n)
+            kwargs = {'projection' : projection} if projection else {}
+            seconds, _ = _best_time(lambda: rasterize_aggregate(agg, **kwargs), repeat=repeat)
+            params = dict(kwargs, dims=dims, n=n)
+            yield _record('render', params, seconds, particles_per_s=n/seconds)
+
+def bench_import(sizes, repeat):
+    """Times importing droplet in fresh interpreters, see `import_time`."""
+    from benchmarks import import_time
+    seconds = min(import_time.sample()[0] for _ in range(max(repeat, 5)))/1e3
+    yield _record('import', {}, seconds)
+
+CASES = {
+    'generate' : bench_generate,
+    'engines' : bench_engines,
+    'stream' : bench_stream,
+    'extract' : bench_extract,
+    'colors' : bench_colors,
+    'render' : bench_render,
+    'import' : bench_import
+}
+
+def run(cases=None, sizes=(1000, 10000), repeat=3, verbose=True):
+    """Runs benchmark cases.
+
+    Parameters
+    ----------
+    *cases* :: iterable of `str`, optional, default = None
+
+        Names of the cases to run, see `CASES`, defaults to all of them.
+
+    *sizes* :: iterable of `int`, optional, default = (1000, 10000)
+
+        Particle counts to benchmark at.
+
+    *repeat* :: `int`, optional, default = 3
+
+        Number of timed repeats of each benchmark, the best of which is kept.
+
+    *verbose* :: `bool`, optional, default = True
+
+        Print each result as it completes.
+
+    Returns
+    -------
+    A `dict` of the environment `'meta'` data and the list of `'results'`,
+    each holding a case `'name'`, its `'params'`, the best time in `'seconds'`
+    and derived throughput `'metrics'`.
+    """
+    results = []
+    for name in (cases or CASES):
+        for result in CASES[name](tuple(sizes), repeat):
+            if verbose:
+                print("{:<9} {:<70} {:12.6f} s".format(
+                    name, format_params(result['params']), result['seconds']))
+            results.append(result)
+    meta = {
+        'python' : platform.python_version(),
+        'numpy' : np.__version__,
+        'platform' : platform.platform(),
+        'machine' : platform.machine(),
+        'time' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'sizes' : list(sizes),
+        'repeat' : repeat
+    }
+    return {'meta' : meta, 'results' : results}
+
+def format_params(params):
+    """Returns a compact string of benchmark parameters."""
+    return ' '.join('{}={}'.format(k, params[k]) for k in sorted(params))
+
+def result_key(result):
+    """Returns the key identifying a benchmark result across runs."""
+    return (result['name'], format_params(result['params']))
+
+def compare(baseline, current, threshold=0.1):
+    """Compares the results of two runs.
+
+    Parameters
+    ----------
+    *baseline* :: `dict`
+
+        Results of the reference run, see `run`.
+
+    *current* :: `dict`
+
+        Results of the run to check.
+
+    *threshold* :: `float`, optional, default = 0.1
+
+        Relative slow-down beyond which a benchmark is flagged as a regression.
+
+    Returns
+    -------
+    A list of `(key, baseline_seconds, current_seconds, ratio, regressed)`
+    tuples for every benchmark present in both runs.
+    """
+    reference = dict((result_key(r), r['seconds']) for r in baseline['results'])
+    rows = []
+    for result in current['results']:
+        key = result_key(result)
+        if key not in reference:
+            continue
+        ratio = result['seconds']/reference[key] if reference[key] > 0 else float('inf')
+        rows.append((key, reference[key], result['seconds'], ratio, ratio > 1 + threshold))
+    return rows
@@ -1,7 +1,27 @@
+import importlib
 from droplet.dla import LatticeType
 from droplet.dla import AttractorType
+from droplet.dla import SpawnType
+from droplet.dla import WalkEngine
+from droplet.dla import OccupancyType
+from droplet.dla import StopReason
 from droplet.dla import Aggregate2D
 from droplet.dla import Aggregate3D
 from droplet.colorprofiles import ColorProfile
-from droplet.realtime import RealTimeAggregate2D
-from droplet.realtime import RealTimeAggregate3D
+from droplet.colorprofiles import ColorBy
+
+# symbols whose modules import matplotlib are only imported on first use
+_LAZY_SYMBOLS = {
+    'RealTimeAggregate2D' : 'droplet.realtime',
+    'RealTimeAggregate3D' : 'droplet.realtime'
+}
+
+def __getattr__(name):
+    if name in _LAZY_SYMBOLS:
+        value = getattr(importlib.import_module(_LAZY_SYMBOLS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module 'droplet' has no attribute '{}'".format(name))
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_SYMBOLS))
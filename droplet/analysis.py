@@ -0,0 +1,315 @@
+"""Estimators of the fractal dimension and size of aggregates.
+
+Every function operates on an integer co-ordinate array of `shape=(n, 2)` or
+`shape=(n, 3)`, as returned by `as_ndarray()`, with rows in the order that
+particles stuck to the aggregate. Aggregates themselves are also accepted in
+place of such arrays. All estimators are vectorized over the particles.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+def _coordinates(aggregate):
+    """Returns the co-ordinate array of an aggregate, or `aggregate` itself if
+    it is already an array."""
+    if hasattr(aggregate, 'as_ndarray'):
+        return aggregate.as_ndarray(copy=False)
+    return np.asarray(aggregate)
+
+def _fit_slope(x, y):
+    """Returns the slope of the least-squares line through `(x, y)`."""
+    if len(x) < 2:
+        return np.nan
+    return np.polyfit(x, y, 1)[0]
+
+def _unique(keys):
+    """Returns the distinct values of an integer array, in sorted order. This is
+    considerably faster than `np.unique`, which does more work than required."""
+    keys = np.sort(keys)
+    if len(keys) == 0:
+        return keys
+    return keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+
+def radius_of_gyration(aggregate, center=None):
+    """Computes the radius of gyration of an aggregate.
+
+    Parameters
+    ----------
+    *aggregate* :: `np.ndarray` or aggregate
+
+        Particle co-ordinates, or an aggregate.
+
+    *center* :: array-like, optional, default = None
+
+        Point about which to compute the radius, defaults to the centre of mass.
+
+    Returns
+    -------
+    The root mean squared distance of the particles from `center`.
+    """
+    coords = _coordinates(aggregate).astype(float)
+    if center is None:
+        center = coords.mean(axis=0)
+    return np.sqrt(np.mean(np.sum((coords - center)**2, axis=1)))
+
+def gyration_dimension(aggregate, min_size=100):
+    """Estimates the fractal dimension of an aggregate from the scaling of its
+    radius of gyration with the number of particles, `Rg ~ N^(1/D)`, over the
+    growth history given by the order of the particles. The radius of gyration
+    of every prefix of the particles is computed from cumulative sums.
+
+    Parameters
+    ----------
+    *aggregate* :: `np.ndarray` or aggregate
+
+        Particle co-ordinates in order of sticking, or an aggregate.
+
+    *min_size* :: `int`, optional, default = 100
+
+        Smallest number of particles included in the fit, excluding the early
+        growth which is dominated by lattice effects.
+
+    Returns
+    -------
+    A tuple of the estimated dimension, the particle numbers at which the
+    radius of gyration was sampled and the corresponding radii.
+    """
+    coords = _coordinates(aggregate).astype(float)
+    nparticles = len(coords)
+    counts = np.arange(1, nparticles + 1)
+    mean_sqd = np.cumsum(np.sum(coords**2, axis=1))/counts
+    centroid = np.cumsum(coords, axis=0)/counts[:, None]
+    rg = np.sqrt(np.maximum(mean_sqd - np.sum(centroid**2, axis=1), 0.0))
+    # sample logarithmically spaced prefixes for an evenly weighted fit
+    lo = min(min_size, nparticles)
+    samples = np.unique(np.geomspace(lo, nparticles, num=50).astype(int)) - 1
+    sizes, radii = counts[samples], rg[samples]
+    valid = radii > 0.0
+    slope = _fit_slope(np.log(sizes[valid]), np.log(radii[valid]))
+    return 1.0/slope, sizes, radii
+
+def mass_radius_dimension(aggregate, origin=None, min_radius=2.0, max_fraction=0.5):
+    """Estimates the fractal dimension of an aggregate from the scaling of the
+    number of particles within a distance `r` of its origin, `N(r) ~ r^D`.
+
+    Parameters
+    ----------
+    *aggregate* :: `np.ndarray` or aggregate
+
+        Particle co-ordinates, or an aggregate.
+
+    *origin* :: array-like, optional, default = None
+
+        Centre of the mass-radius relation, defaults to the origin of the
+        lattice (the seed of a `POINT` attractor).
+
+    *min_radius* :: `float`, optional, default = 2.0
+
+        Smallest radius included in the fit.
+
+    *max_fraction* :: `float`, optional, default = 0.5
+
+        Largest radius included in the fit as a fraction of the spanning radius,
+        excluding the outer region where growth is still active.
+
+    Returns
+    -------
+    A tuple of the estimated dimension, the sampled radii and the number of
+    particles within each radius.
+    """
+    coords = _coordinates(aggregate).astype(float)
+    if origin is not None:
+        coords = coords - np.asarray(origin, dtype=float)
+    dists = np.sort(np.sqrt(np.sum(coords**2, axis=1)))
+    max_radius = max_fraction*dists[-1]
+    if max_radius <= min_radius:
+        return np.nan, np.array([]), np.array([])
+    radii = np.geomspace(min_radius, max_radius, num=30)
+    counts = np.searchsorted(dists, radii, side='right')
+    slope = _fit_slope(np.log(radii), np.log(counts))
+    return slope, radii, counts
+
+def box_counting_dimension(aggregate, min_size=2, max_fraction=0.25):
+    """Estimates the box-counting dimension of an aggregate from the scaling of
+    the number of occupied boxes with box size, `N(s) ~ s^-D`, for box sizes
+    which are powers of two. Occupied boxes at each size are found from those
+    at the previous size, so that only the finest size visits every particle.
+
+    Parameters
+    ----------
+    *aggregate* :: `np.ndarray` or aggregate
+
+        Particle co-ordinates, or an aggregate.
+
+    *min_size* :: `int`, optional, default = 2
+
+        Smallest box size included in the fit.
+
+    *max_fraction* :: `float`, optional, default = 0.25
+
+        Largest box size included in the fit as a fraction of the largest extent
+        of the aggregate.
+
+    Returns
+    -------
+    A tuple of the estimated dimension, the box sizes and the number of
+    occupied boxes of each size.
+
+    Exceptions
+    ----------
+    Raises `ValueError` if the extent of the aggregate exceeds the range of the
+    packed box keys, `2**21` sites in 3D.
+    """
+    coords = _coordinates(aggregate)
+    dims = coords.shape[1]
+    offsets = (coords - coords.min(axis=0)).astype(np.int64)
+    extent = int(offsets.max()) + 1
+    # pack the co-ordinates into bit fields of a single key, a box of twice the
+    # size is then obtained by shifting every field right by one bit
+    width = max(extent.bit_length(), 1)
+    if dims*width > 63:
+        raise ValueError("extent of aggregate too large for box counting.")
+    keys = offsets[:, 0].copy()
+    field_mask = (1 << (width - 1)) - 1
+    merge_mask = field_mask
+    for axis in range(1, dims):
+        keys |= offsets[:, axis] << (axis*width)
+        merge_mask |= field_mask << (axis*width)
+    keys = _unique(keys)
+    sizes, counts = [], []
+    size = 1
+    while size <= max(max_fraction*extent, 1):
+        if size >= min_size:
+            sizes.append(size)
+            counts.append(len(keys))
+        keys = _unique((keys >> 1) & merge_mask)
+        size *= 2
+    sizes, counts = np.array(sizes), np.array(counts)
+    slope = _fit_slope(np.log(sizes), np.log(counts))
+    return -slope, sizes, counts
+
+def _fft_size(n):
+    """Returns the smallest integer of at least `n` with no prime factors other
+    than 2, 3 and 5, for which FFTs are efficient."""
+    size = n
+    while True:
+        m = size
+        for p in (2, 3, 5):
+            while m % p == 0:
+                m //= p
+        if m == 1:
+            return size
+        size += 1
+
+def correlation_function(aggregate, max_radius=None, min_radius=2.0, max_fraction=0.25):
+    """Computes the radially averaged two-point density correlation function
+    `C(r)` of an aggregate and estimates its fractal dimension from the scaling
+    `C(r) ~ r^(D - d)`. The aggregate is rasterised onto its lattice, padded
+    against periodic wrap-around, and autocorrelated with FFTs in
+    `O(L^d log L)` time for a lattice of side `L`, independently of the number
+    of particles.
+
+    Parameters
+    ----------
+    *aggregate* :: `np.ndarray` or aggregate
+
+        Particle co-ordinates, or an aggregate.
+
+    *max_radius* :: `int`, optional, default = None
+
+        Largest separation at which `C(r)` is computed, defaults to the largest
+        extent of the aggregate multiplied by `max_fraction`.
+
+    *min_radius* :: `float`, optional, default = 2.0
+
+        Smallest separation included in the fit.
+
+    *max_fraction* :: `float`, optional, default = 0.25
+
+        Default `max_radius` as a fraction of the largest extent of the aggregate.
+
+    Returns
+    -------
+    A tuple of the estimated dimension, the separations `r = 0, 1, 2, ...` and
+    the correlation `C(r)`, the mean density of particles at a separation `r`
+    from a particle.
+    """
+    coords = _coordinates(aggregate)
+    dims = coords.shape[1]
+    offsets = (coords - coords.min(axis=0)).astype(np.intp)
+    shape = offsets.max(axis=0) + 1
+    if max_radius is None:
+        max_radius = max(int(max_fraction*shape.max()), 1)
+    max_radius = int(min(max_radius, shape.max() - 1))
+    # padding by max_radius keeps separations up to max_radius free of wrap-around
+    fft_shape = [_fft_size(int(n) + max_radius) for n in shape]
+    raster = np.zeros(fft_shape)
+    raster[tuple(offsets.T)] = 1.0
+    spectrum = np.fft.rfftn(raster)
+    autocorr = np.fft.irfftn(spectrum*np.conj(spectrum), s=fft_shape,
+                             axes=range(dims))
+    # gather separations within max_radius along each axis about zero
+    window = np.arange(-max_radius, max_radius + 1)
+    autocorr = autocorr[np.ix_(*[window % n for n in fft_shape])]
+    dist = np.sqrt(sum(np.meshgrid(*[window**2]*dims, indexing='ij')))
+    shells = np.rint(dist).astype(np.intp).ravel()
+    keep = shells <= max_radius
+    pairs = np.bincount(shells[keep], weights=autocorr.ravel()[keep],
+                        minlength=max_radius + 1)
+    sites = np.bincount(shells[keep], minlength=max_radius + 1)
+    radii = np.arange(max_radius + 1)
+    corr = pairs/(len(coords)*sites)
+    fit = (radii >= min_radius) & (corr > 0.0)
+    slope = _fit_slope(np.log(radii[fit]), np.log(corr[fit]))
+    return dims + slope, radii, corr
+
+def fractal_dimensions(aggregate):
+    """Computes every estimate of the fractal dimension of an aggregate with the
+    default parameters of each estimator.
+
+    Parameters
+    ----------
+    *aggregate* :: `np.ndarray` or aggregate
+
+        Particle co-ordinates, or an aggregate.
+
+    Returns
+    -------
+    A `dict` of the `'box_counting'`, `'mass_radius'`, `'gyration'` and
+    `'correlation'` dimensions along with the `'radius_of_gyration'` of the
+    aggregate.
+    """
+    coords = _coordinates(aggregate)
+    return {
+        'box_counting' : box_counting_dimension(coords)[0],
+        'correlation' : correlation_function(coords)[0],
+        'mass_radius' : mass_radius_dimension(coords)[0],
+        'gyration' : gyration_dimension(coords)[0],
+        'radius_of_gyration' : radius_of_gyration(coords)
+    }
+
+def analyze(aggregates, estimator=fractal_dimensions, max_workers=None):
+    """Applies an estimator to many aggregates concurrently in a pool of threads.
+    The estimators spend most of their time in NumPy routines which release the
+    interpreter lock, so that threads analyse aggregates in parallel.
+
+    Parameters
+    ----------
+    *aggregates* :: iterable of `np.ndarray` or aggregates
+
+        Particle co-ordinates, or aggregates, to analyse.
+
+    *estimator* :: callable, optional, default = `fractal_dimensions`
+
+        Function applied to each aggregate, e.g. `box_counting_dimension`.
+
+    *max_workers* :: `int`, optional, default = None
+
+        Maximum number of threads, see `concurrent.futures.ThreadPoolExecutor`.
+
+    Returns
+    -------
+    A list of the results of `estimator` in the order of `aggregates`.
+    """
+    arrays = [_coordinates(aggregate) for aggregate in aggregates]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(estimator, arrays))
@@ -0,0 +1,214 @@
+"""Binary checkpointing of aggregates.
+
+A checkpoint file consists of a fixed little-endian header, holding every
+scalar of the internal (C) aggregate structure together with its random
+number generator, walker and long jump state, followed by the raw contents of the
+particle, attractor, required steps and boundary collisions vectors and of
+the rings of the running statistics window. Each vector is stored at an 8-byte aligned offset so that it can be read straight
+out of a memory-mapped file.
+"""
+import os
+import struct
+from ctypes import c_bool, c_size_t, memmove, sizeof
+import numpy as np
+import droplet.dla as dla
+
+MAGIC = b'DRPL'
+VERSION = 4
+
+_PREAMBLE = struct.Struct('<4sII') # magic, version, dimensions
+_HEADER_V1 = (
+    '<4sII'     # magic, version, dimensions
+    'd7Q'       # stickiness, max_x, max_y, max_z, max_r_sqd, b_offset, spawn_diam, att_size
+    'iiidi'     # lattice type, attractor type, spawn type, kill ratio, engine
+    'Q4QQI'     # seed, generator state, bit buffer, bits remaining in buffer
+    'iiiQQI'    # walker position, steps, boundary collisions, spawned flag
+    '8Q')       # (size, element size) of aggregate, attractor, rsteps, bcolls vectors,
+                # element size zero for statistics which are not recorded
+_HEADERS = {
+    1 : struct.Struct(_HEADER_V1),
+    2 : struct.Struct(_HEADER_V1 + 'i'), # occupancy type
+    3 : struct.Struct(_HEADER_V1 + 'i' 'iiiIi'), # long jump cached block, valid flag, skip
+    4 : struct.Struct(_HEADER_V1 + 'i' 'iiiIi'
+                      '5Q') # statistics window, ring head, ring size, window sums
+}
+_HEADER = _HEADERS[VERSION]
+_ALIGNMENT = 8
+
+def _vectors(aggregate):
+    """Returns the internal vectors of `aggregate` in checkpoint order."""
+    this = aggregate._this
+    return (this._aggregate, this._attractor, this._rsteps, this._bcolls)
+
+def _rings(aggregate):
+    """Returns the ring buffers of the running statistics window of `aggregate`
+    in checkpoint order."""
+    rs = aggregate._this._stats.contents
+    return (rs.steps_ring, rs.bcolls_ring)
+
+def _padding(nbytes):
+    """Returns the number of bytes padding `nbytes` to the alignment."""
+    return -nbytes % _ALIGNMENT
+
+def save(aggregate, path):
+    """Writes the full state of an aggregate to a binary checkpoint file. The
+    file is written to a temporary path and then moved into place, so an
+    existing checkpoint at `path` is never left partially overwritten.
+
+    Parameters
+    ----------
+    *aggregate* :: `droplet.Aggregate2D` or `droplet.Aggregate3D`
+
+        The aggregate to checkpoint.
+
+    *path* :: `str`
+
+        Path of the checkpoint file.
+    """
+    this = aggregate._this
+    dims = 2 if isinstance(aggregate, dla.Aggregate2D) else 3
+    vecinfo = []
+    for idx, vecptr in enumerate(_vectors(aggregate)):
+        # statistics which are not recorded are marked by a zero element size
+        elemsize = vecptr.contents.elemsize if idx < 2 or this.record_stats else 0
+        vecinfo += [vecptr.contents.size, elemsize]
+    wlk = this._walker
+    jump = this.jump
+    rs = this._stats.contents
+    header = _HEADER.pack(
+        MAGIC, VERSION, dims,
+        this.stickiness, this.max_x, this.max_y, this.max_z, this.max_r_sqd,
+        this.b_offset, this.spawn_diam, this.att_size,
+        this.lt, this.at, this.st, this.kill_ratio, this.engine,
+        this.seed, this.rng.s[0], this.rng.s[1], this.rng.s[2], this.rng.s[3],
+        this.rng.bits, this.rng.nbits,
+        wlk.pos.x, wlk.pos.y, wlk.pos.z, wlk.steps, wlk.bcolls, int(wlk.spawned),
+        *(vecinfo + [this._occupancy.contents.type,
+                     jump.block.x, jump.block.y, jump.block.z, int(jump.valid), jump.skip,
+                     rs.window, rs.head, rs.nring, rs.window_steps, rs.window_bcolls]))
+    tmppath = path + '.tmp'
+    with open(tmppath, 'wb') as f:
+        f.write(header)
+        f.write(b'\0'*_padding(len(header)))
+        for vecptr in _vectors(aggregate):
+            vec = vecptr.contents
+            nbytes = vec.size*vec.elemsize
+            if nbytes:
+                f.write(memoryview((dla.c_ubyte*nbytes).from_address(
+                    dla.cast(vec.data, dla.c_void_p).value)))
+            f.write(b'\0'*_padding(nbytes))
+        for ring in _rings(aggregate):
+            f.write(memoryview((dla.c_ubyte*(rs.window*sizeof(c_size_t))).from_address(
+                dla.cast(ring, dla.c_void_p).value)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmppath, path)
+
+def load(cls, path):
+    """Restores an aggregate from a binary checkpoint file written by `save`.
+    The file is memory-mapped and each vector is copied in bulk into the
+    internal (C) structure, after which generation can continue exactly as if
+    it had never been interrupted.
+
+    Parameters
+    ----------
+    *cls* :: `type`
+
+        Aggregate class to construct, `droplet.Aggregate2D` or `droplet.Aggregate3D`.
+
+    *path* :: `str`
+
+        Path of the checkpoint file.
+
+    Returns
+    -------
+    The restored aggregate.
+
+    Exceptions
+    ----------
+    Raises `ValueError` if the file is not a checkpoint of a `cls` aggregate
+    in a supported format version, or is truncated.
+
+    Raises `MemoryError` if a vector allocation failure occurs.
+    """
+    mm = np.memmap(path, dtype=np.uint8, mode='r')
+    if len(mm) < _PREAMBLE.size:
+        raise ValueError("{} is not a droplet checkpoint file.".format(path))
+    magic, version, dims = _PREAMBLE.unpack_from(mm, 0)
+    if magic != MAGIC:
+        raise ValueError("{} is not a droplet checkpoint file.".format(path))
+    if version not in _HEADERS:
+        raise ValueError("unsupported checkpoint version {} in {}.".format(version, path))
+    header = _HEADERS[version]
+    if len(mm) < header.size:
+        raise ValueError("{} is truncated.".format(path))
+    fields = header.unpack_from(mm, 0)
+    if dims != (2 if cls is dla.Aggregate2D else 3):
+        raise ValueError("{} holds a {}D aggregate.".format(path, dims))
+    (stickiness, max_x, max_y, max_z, max_r_sqd, b_offset, spawn_diam, att_size,
+     lt, at, st, kill_ratio, engine,
+     seed, s0, s1, s2, s3, bits, nbits,
+     wx, wy, wz, wsteps, wbcolls, wspawned) = fields[3:29]
+    vecinfo = fields[29:37]
+    occupancy_type = dla.OccupancyType(fields[37] if version >= 2 else 0)
+    aggregate = cls(stickiness=stickiness, lattice_type=dla.LatticeType(lt),
+                    attractor_type=dla.AttractorType(at),
+                    spawn_type=dla.SpawnType(st), engine=dla.WalkEngine(engine),
+                    seed=seed, occupancy_type=occupancy_type)
+    this = aggregate._this
+    # storage modes are recovered from the element sizes of the vectors
+    stats_bytes = vecinfo[5]
+    compact = (vecinfo[1] == 2*dims)
+    if dla.LIBDRP.aggregate_set_storage(aggregate._handle, c_size_t(dims), c_bool(compact),
+                                        c_size_t(stats_bytes)) == -1:
+        raise ValueError("unsupported storage mode in {}.".format(path))
+    this.max_x, this.max_y, this.max_z = max_x, max_y, max_z
+    this.max_r_sqd, this.b_offset, this.spawn_diam = max_r_sqd, b_offset, spawn_diam
+    this.att_size, this.kill_ratio = att_size, kill_ratio
+    this.rng.s[0], this.rng.s[1], this.rng.s[2], this.rng.s[3] = s0, s1, s2, s3
+    this.rng.bits, this.rng.nbits = bits, nbits
+    wlk = this._walker
+    wlk.pos.x, wlk.pos.y, wlk.pos.z = wx, wy, wz
+    wlk.steps, wlk.bcolls, wlk.spawned = wsteps, wbcolls, bool(wspawned)
+    # the long jump cache is left reset for earlier versions
+    if version >= 3:
+        jx, jy, jz, jvalid, jskip = fields[38:43]
+        jump = this.jump
+        jump.block.x, jump.block.y, jump.block.z = jx, jy, jz
+        jump.valid, jump.skip = bool(jvalid), jskip
+    offset = header.size + _padding(header.size)
+    for idx, vecptr in enumerate(_vectors(aggregate)):
+        size, elemsize = vecinfo[2*idx], vecinfo[2*idx + 1]
+        if elemsize and elemsize != vecptr.contents.elemsize:
+            raise ValueError("element size mismatch in {}.".format(path))
+        nbytes = size*elemsize
+        if offset + nbytes > len(mm):
+            raise ValueError("{} is truncated.".format(path))
+        if dla.LIBDRP.vector_reserve(vecptr, c_size_t(size)) == -1:
+            raise MemoryError("vector allocation failure occurred in vector_reserve.")
+        if nbytes:
+            memmove(vecptr.contents.data, mm[offset:offset + nbytes].ctypes.data, nbytes)
+        vecptr.contents.size = size
+        offset += nbytes + _padding(nbytes)
+    if version >= 4:
+        window, head, nring, window_steps, window_bcolls = fields[43:48]
+        nbytes = window*sizeof(c_size_t)
+        if offset + 2*nbytes > len(mm):
+            raise ValueError("{} is truncated.".format(path))
+        aggregate.stats_window = window
+        rings = [mm[offset + i*nbytes:offset + (i + 1)*nbytes].copy() for i in range(2)]
+    del mm
+    rebuild = (dla.LIBDRP.aggregate_2d_rebuild_occupancy if dims == 2
+               else dla.LIBDRP.aggregate_3d_rebuild_occupancy)
+    if rebuild(aggregate._handle) == -1:
+        raise MemoryError("occupancy allocation failure occurred in rebuild_occupancy.")
+    dla.LIBDRP.aggregate_rebuild_stats(aggregate._handle, c_size_t(dims))
+    # the window is restored as saved, since it restarts whenever its length is
+    # set and holds particles whose statistics may not be recorded
+    if version >= 4:
+        for ring, data in zip(_rings(aggregate), rings):
+            memmove(ring, data.ctypes.data, nbytes)
+        rs = this._stats.contents
+        rs.head, rs.nring = head, nring
+        rs.window_steps, rs.window_bcolls = window_steps, window_bcolls
+    return aggregate
@@ -1,9 +1,45 @@
 from enum import Enum
+import numpy as np
 
 class ColorProfile(Enum):
     BLUETHROUGHRED = 1
     THERMAL = 2
 
+class ColorBy(Enum):
+    STICK_ORDER = 1
+    DISTANCE = 2
+    REQUIRED_STEPS = 3
+
+def _blue_through_red_map(values):
+    """Maps values in [0, 1] to colors on the gradient from pure blue, through
+    pure green, to pure red. Returns an array of `shape=(n, 3)`."""
+    ratio = 2*np.asarray(values, dtype=float)
+    blue = np.maximum(0, 1 - ratio)
+    red = np.maximum(0, ratio - 1)
+    green = 1 - blue - red
+    return np.stack((red, green, blue), axis=-1)
+
+def _thermal_map(values):
+    """Maps values in [0, 1] to colors on a thermal gradient from black, through
+    red and yellow, to white. Returns an array of `shape=(n, 3)`."""
+    ratio = 3*np.asarray(values, dtype=float)
+    red = np.clip(ratio, 0, 1)
+    green = np.clip(ratio - 1, 0, 1)
+    blue = np.clip(ratio - 2, 0, 1)
+    return np.stack((red, green, blue), axis=-1)
+
+_PROFILE_MAPS = {
+    ColorProfile.BLUETHROUGHRED : _blue_through_red_map,
+    ColorProfile.THERMAL : _thermal_map
+}
+
+def _fill(colors, cmap):
+    """Assigns the colors of `cmap` at evenly spaced values to every element of
+    `colors` in order."""
+    ncolors = len(colors)
+    colors[:] = cmap(np.arange(ncolors)/max(ncolors, 1))
+    return colors
+
 def blue_through_red(colors):
     """Takes an array/list where the data-type is a 3-tuple
     of float types and assigns each element an (r,g,b) value
@@ -18,11 +54,66 @@ def blue_through_red(colors):
     --------
     The modified `colors` container.
     """
-    ncolors = len(colors)
-    for idx in range(ncolors):
-        ratio = 2*idx/ncolors
-        blue = max(0, 1-ratio)
-        red = max(0, ratio-1)
-        green = 1 - blue - red
-        colors[idx] = red, green, blue
-    return colors
+    return _fill(colors, _blue_through_red_map)
+
+def thermal(colors):
+    """Takes an array/list where the data-type is a 3-tuple
+    of float types and assigns each element an (r,g,b) value
+    corresponding to the thermal gradient from black through
+    red and yellow to white.
+
+    Parameters:
+    -----------
+    colors -- A list or array where `dtype=(float, 3)`.
+
+    Returns:
+    --------
+    The modified `colors` container.
+    """
+    return _fill(colors, _thermal_map)
+
+def particle_colors(aggregate, profile=ColorProfile.BLUETHROUGHRED,
+                    color_by=ColorBy.STICK_ORDER, total=None):
+    """Computes the color of every particle of an aggregate, mapping a per-
+    particle quantity onto the gradient of a color profile.
+
+    Parameters:
+    -----------
+    aggregate -- Aggregate to color, `droplet.Aggregate2D` or `droplet.Aggregate3D`.
+    profile -- Color profile, a `ColorProfile`.
+    color_by -- Quantity mapped onto the profile, a `ColorBy`: the order in
+    which particles stuck, their distance from the seed (the lattice origin) or
+    the logarithm of the number of steps they required before sticking (zero
+    for particles of the attractor).
+    total -- Number of particles spanned by the gradient when coloring by stick
+    order, and the number of colors returned, defaults to the size of the
+    aggregate.
+
+    Returns:
+    --------
+    An array of `shape=(size, 3)`, or `shape=(total, 3)`, of (r,g,b) values.
+
+    Exceptions:
+    -----------
+    Raises `ValueError` if coloring by required steps an aggregate which does
+    not record them.
+    """
+    cmap = _PROFILE_MAPS[ColorProfile(profile)]
+    color_by = ColorBy(color_by)
+    size = aggregate.size
+    if color_by == ColorBy.STICK_ORDER:
+        total = size if total is None else total
+        values = np.arange(total)/max(total, 1)
+    elif color_by == ColorBy.DISTANCE:
+        coords = aggregate.as_ndarray(copy=False).astype(float)
+        values = np.sqrt(np.sum(coords**2, axis=1))
+    else:
+        if size and not aggregate.stats_bits:
+            raise ValueError("required steps of aggregate are not recorded.")
+        steps = aggregate.required_steps_as_ndarray(copy=False)
+        values = np.zeros(size)
+        values[size - len(steps):] = np.log1p(steps.astype(float))
+    if color_by != ColorBy.STICK_ORDER and size:
+        vmax = values.max()
+        values = values/vmax if vmax > 0 else values
+    return cmap(values)
@@ -1,32 +1,69 @@
 import os.path
-from ctypes import CDLL, Structure, POINTER, byref, cast, sizeof
-from ctypes import c_size_t, c_ubyte, c_double, c_int, c_bool
+import threading
+import time
+import weakref
+from ctypes import CDLL, CFUNCTYPE, Structure, POINTER, byref, cast, memset, sizeof
+from ctypes import c_size_t, c_ubyte, c_double, c_int, c_bool, c_void_p, c_uint64, c_uint
 from enum import Enum
 import numpy as np
-from numpy.random import rand
 import droplet.colorprofiles as clrpr
 import droplet.external.progressbar as pb
 
 LIBDROPLETNAME = "libdroplet.so"
 LIBDROPLETPATH = os.path.dirname(os.path.abspath(__file__)) + os.path.sep + LIBDROPLETNAME
-LIBDRP = CDLL(LIBDROPLETPATH)
 
-_C_SIZE_T_PTR_T = POINTER(c_size_t)
+class _LazyLibrary(object):
+    """Handle to the shared library which is loaded, and its function signatures
+    declared, on first attribute access rather than at import time. Functions
+    are called through `CDLL`, which releases the interpreter lock for the
+    duration of each call."""
+    def __init__(self, path):
+        self._path = path
+        self._lib = None
+        self._lock = threading.Lock()
+    def _load(self):
+        with self._lock:
+            if self._lib is None:
+                lib = CDLL(self._path)
+                for name, (restype, argtypes) in _signatures().items():
+                    func = getattr(lib, name)
+                    func.restype = restype
+                    func.argtypes = argtypes
+                self._lib = lib
+        return self._lib
+    @property
+    def loaded(self):
+        """Returns whether the shared library has been loaded."""
+        return self._lib is not None
+    def __getattr__(self, name):
+        lib = self._lib if self._lib is not None else self._load()
+        return getattr(lib, name)
+
+LIBDRP = _LazyLibrary(LIBDROPLETPATH)
+
+_AGGREGATE_JUMP_LEVELS = 7 # must match AGGREGATE_JUMP_LEVELS in aggregate.h
+_STATS_HIST_BINS = 64 # must match STATS_HIST_BINS in stats.h
+_PROFILE_PHASES = ('spawn', 'walk', 'boundary', 'collision', 'stick') # as enum profile_phase
+_PROFILE_COUNTERS = ('steps', 'jumps', 'spawns', 'reflections', 'rejected_sticks',
+                     'occupancy_tests', 'reallocations')
 
 class _IntPair(Structure):
     _fields_ = [
         ("x", c_int),
         ("y", c_int)]
 
-_INTPAIR_PTR_T = POINTER(_IntPair)
-
 class _IntTriplet(Structure):
     _fields_ = [
         ("x", c_int),
         ("y", c_int),
         ("z", c_int)]
 
-_INTTRIPLET_PTR_T = POINTER(_IntTriplet)
+class _WalkerWrapper(Structure):
+    _fields_ = [
+        ("pos", _IntTriplet),
+        ("steps", c_size_t),
+        ("bcolls", c_size_t),
+        ("spawned", c_bool)]
 
 class _VectorWrapper(Structure):
     _fields_ = [
@@ -35,12 +72,81 @@ class _VectorWrapper(Structure):
         ("elemsize", c_size_t),
         ("capacity", c_size_t)]
 
+class _OccupancyWrapper(Structure):
+    _fields_ = [
+        ("bits", POINTER(c_uint64)),
+        ("dims", c_size_t),
+        ("half", c_size_t),
+        ("side", c_size_t),
+        ("nwords", c_size_t),
+        ("type", c_int),
+        ("keys", POINTER(c_uint64)),
+        ("slots", POINTER(c_size_t)),
+        ("table_cap", c_size_t),
+        ("nbricks", c_size_t),
+        ("brick_cap", c_size_t),
+        ("brick_words", c_size_t)]
+
+class _RngWrapper(Structure):
+    _fields_ = [
+        ("s", c_uint64*4),
+        ("bits", c_uint64),
+        ("nbits", c_uint)]
+
+class _RunningStatsWrapper(Structure):
+    _fields_ = [
+        ("nsites", c_size_t),
+        ("sum", c_double*3),
+        ("sum_sqd", c_double),
+        ("nstuck", c_size_t),
+        ("steps_total", c_double),
+        ("bcolls_total", c_double),
+        ("max_steps", c_size_t),
+        ("window", c_size_t),
+        ("steps_ring", POINTER(c_size_t)),
+        ("bcolls_ring", POINTER(c_size_t)),
+        ("head", c_size_t),
+        ("nring", c_size_t),
+        ("window_steps", c_size_t),
+        ("window_bcolls", c_size_t),
+        ("steps_hist", c_size_t*_STATS_HIST_BINS)]
+
+class _ProfileWrapper(Structure):
+    _fields_ = [(name, c_size_t) for name in _PROFILE_COUNTERS] + [
+        ("ticks", c_uint64*len(_PROFILE_PHASES)),
+        ("tsc", c_bool)]
+
+_PROGRESS_FN = CFUNCTYPE(None, c_size_t, c_size_t, c_double, c_double, c_void_p)
+
+class _ProgressWrapper(Structure):
+    _fields_ = [
+        ("fn", c_void_p),
+        ("data", c_void_p),
+        ("every", c_size_t),
+        ("interval_ms", c_double)]
+
+class _StopWrapper(Structure):
+    _fields_ = [
+        ("max_r_sqd", c_double),
+        ("max_ms", c_double),
+        ("max_steps", c_double),
+        ("cancel", c_int),
+        ("reason", c_int)]
+
+class _JumpCacheWrapper(Structure):
+    _fields_ = [
+        ("block", _IntTriplet),
+        ("valid", c_bool),
+        ("skip", c_int)]
+
 class _AggregateWrapper(Structure):
     _fields_ = [
         ("_aggregate", POINTER(_VectorWrapper)),
         ("_attractor", POINTER(_VectorWrapper)),
         ("_bcolls", POINTER(_VectorWrapper)),
         ("_rsteps", POINTER(_VectorWrapper)),
+        ("_occupancy", POINTER(_OccupancyWrapper)),
+        ("_coarse", POINTER(_OccupancyWrapper)*_AGGREGATE_JUMP_LEVELS),
         ("stickiness", c_double),
         ("max_x", c_size_t),
         ("max_y", c_size_t),
@@ -50,7 +156,308 @@ class _AggregateWrapper(Structure):
         ("spawn_diam", c_size_t),
         ("att_size", c_size_t),
         ("lt", c_int),
-        ("at", c_int)]
+        ("at", c_int),
+        ("st", c_int),
+        ("kill_ratio", c_double),
+        ("engine", c_int),
+        ("seed", c_uint64),
+        ("rng", _RngWrapper),
+        ("_walker", _WalkerWrapper),
+        ("record_stats", c_bool),
+        ("_stats", POINTER(_RunningStatsWrapper)),
+        ("_profile", POINTER(_ProfileWrapper)),
+        ("progress", _ProgressWrapper),
+        ("stop", _StopWrapper),
+        ("jump", _JumpCacheWrapper)]
+
+def _signatures():
+    """Returns the `(restype, argtypes)` of every function of the shared library
+    called by droplet, keyed by name."""
+    agg = POINTER(_AggregateWrapper)
+    vec = POINTER(_VectorWrapper)
+    sigs = {
+        'aggregate_free_fields' : (None, [agg]),
+        'aggregate_seed' : (None, [agg, c_uint64]),
+        'aggregate_reserve' : (c_int, [agg, c_size_t]),
+        'aggregate_set_storage' : (c_int, [agg, c_size_t, c_bool, c_size_t]),
+        'aggregate_set_occupancy' : (c_int, [agg, c_size_t, c_int]),
+        'aggregate_rebuild_stats' : (None, [agg, c_size_t]),
+        'aggregate_set_progress' : (None, [agg, _PROGRESS_FN, c_void_p, c_size_t, c_double]),
+        'aggregate_set_stop' : (None, [agg, c_double, c_double, c_double]),
+        'aggregate_cancel' : (None, [agg]),
+        'vector_size' : (c_size_t, [vec]),
+        'vector_at' : (c_void_p, [vec, c_size_t]),
+        'vector_reserve' : (c_int, [vec, c_size_t]),
+        'occupancy_nbytes' : (c_size_t, [POINTER(_OccupancyWrapper)]),
+        'running_stats_set_window' : (c_int, [POINTER(_RunningStatsWrapper), c_size_t])
+    }
+    for dims in ('2d', '3d'):
+        prefix = 'aggregate_' + dims + '_'
+        sigs.update({
+            prefix + 'init' : (c_int, [agg, c_double, c_int, c_int]),
+            prefix + 'init_attractor' : (c_int, [agg, c_size_t]),
+            prefix + 'rebuild_occupancy' : (c_int, [agg]),
+            prefix + 'advance' : (c_int, [agg, c_size_t, c_size_t, POINTER(c_size_t)]),
+            prefix + 'generate' : (c_int, [agg, c_size_t, c_bool]),
+            prefix + 'generate_parallel' : (c_int, [agg, c_size_t, c_size_t, c_size_t,
+                                                    c_bool, c_bool])
+        })
+    return sigs
+
+def _vector_as_ndarray(owner, vecptr, kind, ncols=None, copy=True):
+    """Constructs a `np.ndarray` directly over the data buffer of an internal (C)
+    vector of integers, whose width is inferred from the vector element size.
+
+    Parameters
+    ----------
+    *owner* :: `object`
+
+        Aggregate owning the vector, kept alive for as long as the array exists.
+
+    *vecptr* :: `POINTER(_VectorWrapper)`
+
+        Pointer to the vector.
+
+    *kind* :: `str`
+
+        Kind of the vector integers, `'i'` for signed or `'u'` for unsigned.
+
+    *ncols* :: `int`, optional, default = None
+
+        If given, elements are structures of `ncols` integers and the array is
+        returned with `shape=(n, ncols)`.
+
+    *copy* :: `bool`, optional, default = True
+
+        If `True`, returns an independent `int` array copied in bulk from the
+        vector. Otherwise returns a read-only view of the vector memory, which
+        is registered with the owner so that it cannot grow, and reallocate the
+        memory, while the view or any array derived from it is alive.
+
+    Returns
+    -------
+    An instance of `np.ndarray` holding the vector elements.
+    """
+    vec = vecptr.contents
+    addr = cast(vec.data, c_void_p).value
+    buf = (c_ubyte*(vec.size*vec.elemsize)).from_address(addr)
+    buf._owner = owner # tie lifetime of the underlying memory to the owner
+    if not copy:
+        # arrays derived from the view reference `buf` as their base
+        owner._views[id(buf)] = buf
+    width = vec.elemsize//(ncols or 1)
+    ret = np.frombuffer(buf, dtype=np.dtype('<{}{}'.format(kind, width)))
+    if ncols is not None:
+        ret = ret.reshape(vec.size, ncols)
+    if copy:
+        return ret.astype(int)
+    ret.flags.writeable = False
+    return ret
+
+def _check_views(aggregate):
+    """Raises `RuntimeError` if views of the internal (C) memory of `aggregate`
+    are alive, since growing the aggregate may reallocate the memory they read."""
+    if len(aggregate._views):
+        raise RuntimeError("cannot grow the aggregate while arrays returned with "
+                           "copy=False, or derived from them, are alive.")
+
+def _memory_usage(this):
+    """Returns the allocated memory, in bytes, of each internal (C) buffer of an
+    aggregate structure `this`, see `Aggregate2D.memory_usage`."""
+    def vec_bytes(vecptr):
+        return vecptr.contents.capacity*vecptr.contents.elemsize
+    usage = {
+        'coordinates' : vec_bytes(this._aggregate),
+        'attractor' : vec_bytes(this._attractor),
+        'required_steps' : vec_bytes(this._rsteps) if this.record_stats else 0,
+        'boundary_collisions' : vec_bytes(this._bcolls) if this.record_stats else 0,
+        'occupancy' : sum(LIBDRP.occupancy_nbytes(occ)
+                          for occ in [this._occupancy] + list(this._coarse))
+    }
+    usage['total'] = sum(usage.values())
+    return usage
+
+def _running_stats(this, dims):
+    """Returns a snapshot of the running statistics of an aggregate structure
+    `this`, see `Aggregate2D.stats`."""
+    rs = this._stats.contents
+    nsites = max(rs.nsites, 1)
+    nstuck = max(rs.nstuck, 1)
+    nring = max(rs.nring, 1)
+    com = np.array(rs.sum[:dims])/nsites
+    mean_sqd = rs.sum_sqd/nsites
+    return {
+        'size' : rs.nsites,
+        'center_of_mass' : com,
+        'radius_of_gyration' : np.sqrt(max(mean_sqd - np.dot(com, com), 0.0)),
+        'count' : rs.nstuck,
+        'mean_steps' : rs.steps_total/nstuck,
+        'mean_boundary_collisions' : rs.bcolls_total/nstuck,
+        'max_steps' : rs.max_steps,
+        'window' : rs.nring,
+        'window_mean_steps' : rs.window_steps/nring,
+        'window_mean_boundary_collisions' : rs.window_bcolls/nring,
+        'steps_histogram' : np.ctypeslib.as_array(rs.steps_hist).copy()
+    }
+
+def _profile(this, reset):
+    """Returns the hot-path counters and timers of an aggregate structure
+    `this`, see `Aggregate2D.profile`."""
+    if not this._profile:
+        raise RuntimeError("droplet was built without profiling, rebuild with `make profile`.")
+    prof = this._profile.contents
+    ret = dict((name, getattr(prof, name)) for name in _PROFILE_COUNTERS)
+    ticks = list(prof.ticks)
+    total = max(sum(ticks), 1)
+    ret['ticks'] = dict(zip(_PROFILE_PHASES, ticks))
+    ret['fractions'] = dict((phase, t/total) for phase, t in zip(_PROFILE_PHASES, ticks))
+    ret['tick_unit'] = 'cycles' if prof.tsc else 'ns'
+    if reset:
+        tsc = prof.tsc
+        memset(this._profile, 0, sizeof(_ProfileWrapper))
+        prof.tsc = tsc
+    return ret
+
+class _ProgressReporter(object):
+    """Receives progress reports of the internal (C) generator through a ctypes
+    callback, forwarding them to a terminal progress bar and/or a user callback.
+    An exception raised by the user callback is kept and re-raised by `check`
+    once the generator returns, since it cannot propagate through C."""
+    def __init__(self, total, display_progress, callback, every, interval):
+        self.total = total
+        self.offset = 0
+        self.callback = callback
+        self.every = every or 0
+        self.interval = interval or 0.0
+        self.error = None
+        self.pbar = pb.ProgressBar(maxval=total).start() if display_progress else None
+        self.cfunc = _PROGRESS_FN(self._report)
+    def _report(self, count, _, radius, steps, __):
+        count += self.offset
+        if self.pbar is not None:
+            self.pbar.update(count)
+        if self.callback is not None and self.error is None:
+            try:
+                self.callback(count, self.total, radius, steps)
+            except BaseException as exc: # pylint: disable=broad-except
+                self.error = exc
+    def attach(self, this):
+        """Installs the reporter on an aggregate structure `this`."""
+        LIBDRP.aggregate_set_progress(byref(this), self.cfunc, None, c_size_t(self.every),
+                                      c_double(1e3*self.interval))
+    @staticmethod
+    def detach(this):
+        """Removes any reporter from an aggregate structure `this`."""
+        LIBDRP.aggregate_set_progress(byref(this), _PROGRESS_FN(), None, c_size_t(0),
+                                      c_double(0.0))
+    def check(self):
+        """Re-raises an exception raised by the user callback."""
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+    def finish(self):
+        if self.pbar is not None:
+            self.pbar.finish()
+
+def _steps_taken(this):
+    """Returns the lattice steps taken by all stuck particles of an aggregate
+    structure `this` and by its current walker."""
+    return this._stats.contents.steps_total + this._walker.steps
+
+class _StopLimits(object):
+    """Limits of a single call to `generate`, converted to the units of the
+    internal (C) generator and tracked across the chunks of a checkpointed
+    generation, each of which is bounded by the budget remaining."""
+    def __init__(self, this, max_radius, max_time, max_steps):
+        self.this = this
+        self.max_r_sqd = max_radius**2 if max_radius is not None else 0.0
+        self.max_time = max_time
+        self.max_steps = max_steps
+        self.start = time.perf_counter()
+        self.start_steps = _steps_taken(this)
+    def exhausted(self):
+        """Returns the `StopReason` of a budget which is already used up, or
+        `StopReason.NONE` if generation may continue."""
+        if self.max_time is not None and time.perf_counter() - self.start >= self.max_time:
+            return StopReason.TIME
+        if (self.max_steps is not None and
+                _steps_taken(self.this) - self.start_steps >= self.max_steps):
+            return StopReason.STEPS
+        return StopReason.NONE
+    def attach(self):
+        """Installs the remaining limits on the aggregate structure."""
+        max_ms = 0.0
+        if self.max_time is not None:
+            # a non-positive budget would disable the limit
+            max_ms = max(1e3*(self.max_time - (time.perf_counter() - self.start)), 1e-6)
+        max_steps = 0.0
+        if self.max_steps is not None:
+            max_steps = self.max_steps - (_steps_taken(self.this) - self.start_steps)
+        LIBDRP.aggregate_set_stop(byref(self.this), c_double(self.max_r_sqd),
+                                  c_double(max_ms), c_double(max_steps))
+    @staticmethod
+    def detach(this):
+        """Removes every limit from an aggregate structure `this`."""
+        LIBDRP.aggregate_set_stop(byref(this), c_double(0.0), c_double(0.0), c_double(0.0))
+
+async def _stream_batches(aggregate, dims, nparticles, batch, maxsize, executor):
+    """Implementation of `Aggregate2D.agenerate_stream`. A producer running in
+    `executor` advances the aggregate by `batch` particles at a time and hands
+    a copy of the co-ordinates of each batch to the event loop through a queue
+    of `maxsize` batches, blocking while the queue is full."""
+    import asyncio
+    if batch < 1:
+        raise ValueError("batch must be at least one.")
+    prefix = 'aggregate_{}d_'.format(dims)
+    _check_views(aggregate)
+    if LIBDRP.aggregate_reserve(aggregate._handle, c_size_t(nparticles)) == -1:
+        raise MemoryError("vector reallocation failure occurred in aggregate_reserve.")
+    init_attractor = getattr(LIBDRP, prefix + 'init_attractor')
+    if init_attractor(aggregate._handle, c_size_t(nparticles)) == -1:
+        raise MemoryError("vector reallocation failure occurred in {}init_attractor."
+                          .format(prefix))
+    advance = getattr(LIBDRP, prefix + 'advance')
+    aggregate._colors = None
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=maxsize)
+    closing = threading.Event()
+    def put(item):
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+    def produce():
+        try:
+            count = 0
+            start = aggregate.size
+            nstuck = c_size_t(0)
+            while count < nparticles and not closing.is_set():
+                _check_views(aggregate)
+                if advance(aggregate._handle, c_size_t(min(batch, nparticles - count)),
+                           c_size_t(0), byref(nstuck)) == -1:
+                    raise MemoryError("vector reallocation failure occurred in {}advance."
+                                      .format(prefix))
+                size = start + count + nstuck.value
+                coords = aggregate.as_ndarray(copy=False)[start + count:size].copy()
+                count += nstuck.value
+                put((coords, count))
+        finally:
+            if not closing.is_set():
+                put(None) # end of stream, also sent on failure
+    producer = loop.run_in_executor(executor, produce)
+    # an abandoned consumer never awaits the producer, so mark its outcome retrieved
+    producer.add_done_callback(lambda fut: fut.cancelled() or fut.exception())
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            yield item
+        await producer # re-raises an exception of the producer
+    finally:
+        # release a producer blocked on the full queue and wait for it to exit
+        closing.set()
+        while not producer.done():
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.wait({producer}, timeout=0.01)
 
 class LatticeType(Enum):
     """The geometry of a lattice."""
@@ -65,11 +472,68 @@ class AttractorType(Enum):
     LINE = 3
     PLANE = 4
 
+class SpawnType(Enum):
+    """The spawning scheme for random-walking particles of an aggregate.
+
+    `BOX` spawns particles on the boundary of a square/cube enclosing the
+    aggregate and reflects them off of it. `LAUNCH` spawns particles on a
+    circle/sphere just outside of the aggregate and re-injects any particle
+    which passes the kill radius back onto the launch circle/sphere, using the
+    analytic first-passage distribution. `LAUNCH` applies to `POINT` attractors
+    only, other attractor types always use `BOX` spawning.
+    """
+    BOX = 0
+    LAUNCH = 1
+
+class WalkEngine(Enum):
+    """The engine used to advance random-walking particles of an aggregate.
+
+    `UNIT_STEP` moves particles a single lattice site per update. `LONG_JUMP`
+    consults a multi-resolution map of occupied blocks and moves particles
+    which are far from the aggregate in a single jump of up to that distance,
+    falling back to unit steps near the aggregate surface. Each jump is
+    recorded in `required_steps` as its equivalent number of lattice steps.
+    Jumps are also kept clear of the reflecting boundary of `BOX` spawning,
+    such that `LONG_JUMP` gains most in 2D and with `LAUNCH` spawning.
+    """
+    UNIT_STEP = 0
+    LONG_JUMP = 1
+
+class OccupancyType(Enum):
+    """The storage scheme of the lattices of occupied sites of an aggregate.
+
+    `DENSE` stores one bit for every site of the bounding box of the aggregate,
+    giving the fastest lookups. `SPARSE` stores a hash table of bit-packed
+    bricks of sites, allocated only where sites are occupied, so that memory
+    scales with the number of particles rather than the bounding box volume,
+    at the cost of slightly slower lookups. `SPARSE` suits large 3D aggregates.
+    """
+    DENSE = 0
+    SPARSE = 1
+
+class StopReason(Enum):
+    """The condition which stopped the most recent generation of an aggregate.
+
+    `COUNT` when the requested number of particles stuck, `RADIUS`, `TIME` or
+    `STEPS` when the corresponding limit of `generate` was reached, and
+    `CANCELLED` when generation was cancelled with `cancel`. `NONE` before any
+    generation.
+    """
+    NONE = 0
+    COUNT = 1
+    RADIUS = 2
+    TIME = 3
+    STEPS = 4
+    CANCELLED = 5
+
 class Aggregate2D(object):
     """A two-dimensional Diffusion Limited Aggregate."""
     def __init__(self, stickiness=1.0, lattice_type=LatticeType.SQUARE,
                  attractor_type=AttractorType.POINT,
-                 color_profile=clrpr.ColorProfile.BLUETHROUGHRED):
+                 color_profile=clrpr.ColorProfile.BLUETHROUGHRED,
+                 spawn_type=SpawnType.BOX, engine=WalkEngine.UNIT_STEP, seed=None,
+                 compact=False, stats_bits=64, occupancy_type=OccupancyType.DENSE,
+                 color_by=clrpr.ColorBy.STICK_ORDER):
         """Initialises the aggregate with the specified properties.
 
         Parameters
@@ -91,23 +555,195 @@ class Aggregate2D(object):
 
             Color profile of aggregate structure.
 
+        *spawn_type* :: `droplet.SpawnType`, optional, default = `BOX`
+
+            Spawning scheme for random-walking particles.
+
+        *engine* :: `droplet.WalkEngine`, optional, default = `UNIT_STEP`
+
+            Engine used to advance random-walking particles.
+
+        *seed* :: `int`, optional, default = None
+
+            Seed of the aggregate's pseudo-random number generator, must be in
+            [0, 2**64). If `None`, a seed is derived from the current time and
+            the aggregate's address. Each aggregate draws from its own stream.
+
+        *compact* :: `bool`, optional, default = False
+
+            Store particle co-ordinates as 16-bit integers, halving their memory.
+            Storage is promoted to 32-bit integers automatically once a particle
+            lies outside of the 16-bit range.
+
+        *stats_bits* :: `int`, optional, default = 64
+
+            Width of the stored required steps and boundary collisions of each
+            particle, 64 or 32 (saturating at 2**32 - 1), or 0 to not record them.
+
+        *occupancy_type* :: `droplet.OccupancyType`, optional, default = `DENSE`
+
+            Storage scheme of the lattices of occupied sites.
+
+        *color_by* :: `droplet.colorprofiles.ColorBy`, optional, default = `STICK_ORDER`
+
+            Quantity of each particle mapped onto the color profile.
+
         Exceptions
         ----------
         Raises `MemoryError` if a vector allocation failure occurs.
+
+        Raises `ValueError` if `seed` not in [0, 2**64) or `stats_bits` not one
+        of 64, 32 or 0.
         """
         self._this = _AggregateWrapper()
         self._handle = byref(self._this)
+        if seed is not None and (seed < 0 or seed >= 2**64):
+            raise ValueError("Seed of aggregate must be in [0, 2**64).")
+        if stats_bits not in (64, 32, 0):
+            raise ValueError("stats_bits of aggregate must be one of 64, 32 or 0.")
         retval = LIBDRP.aggregate_2d_init(self._handle, c_double(stickiness),
                                           c_int(lattice_type.value),
                                           c_int(attractor_type.value))
         if retval == -1:
             raise MemoryError("vector allocation failure occurred in aggregate_2d_init.")
+        if compact or stats_bits != 64:
+            retval = LIBDRP.aggregate_set_storage(self._handle, c_size_t(2), c_bool(compact),
+                                                  c_size_t(stats_bits//8))
+            if retval == -1:
+                raise MemoryError("vector allocation failure occurred in aggregate_set_storage.")
+        if occupancy_type != OccupancyType.DENSE:
+            self.occupancy_type = occupancy_type
+        self._this.st = c_int(spawn_type.value)
+        self._this.engine = c_int(engine.value)
+        if seed is not None:
+            LIBDRP.aggregate_seed(self._handle, c_uint64(seed))
         self.color_profile = color_profile
-        self.colors = np.array(0)
+        self.color_by = color_by
+        self._colors = None
+        self._colors_key = None
+        self._views = weakref.WeakValueDictionary()
         self.__aggregate = np.array(0)
     def __del__(self):
         LIBDRP.aggregate_free_fields(self._handle)
     @property
+    def seed(self):
+        """Returns the seed of the aggregate's pseudo-random number generator.
+        Constructing an aggregate with this seed reproduces its generation.
+
+        Returns
+        -------
+        The seed of the aggregate.
+        """
+        return self._this.seed
+    @property
+    def compact(self):
+        """Returns whether particle co-ordinates are currently stored as 16-bit
+        integers. This becomes `False` once storage has been promoted.
+
+        Returns
+        -------
+        `True` if co-ordinates are in compact storage, `False` otherwise.
+        """
+        return self._this._aggregate.contents.elemsize == 2*2
+    @property
+    def stats_bits(self):
+        """Returns the width of the stored statistics of each particle.
+
+        Returns
+        -------
+        64 or 32, or 0 if statistics are not recorded.
+        """
+        if not self._this.record_stats:
+            return 0
+        return 8*self._this._rsteps.contents.elemsize
+    @property
+    def memory_usage(self):
+        """Returns the memory allocated to each internal (C) buffer of the
+        aggregate.
+
+        Returns
+        -------
+        A `dict` mapping `'coordinates'`, `'attractor'`, `'required_steps'`,
+        `'boundary_collisions'` and `'occupancy'` (the fine and coarse occupancy
+        lattices) to their size in bytes, along with their `'total'`.
+        """
+        return _memory_usage(self._this)
+    @property
+    def stats(self):
+        """Returns a snapshot of the statistics maintained incrementally by the
+        internal (C) generator as particles stick, in time independent of the
+        size of the aggregate. These remain available with `stats_bits=0`.
+
+        Returns
+        -------
+        A `dict` of:
+
+        - `'size'`, `'center_of_mass'` and `'radius_of_gyration'` of all
+          particles of the aggregate, including the attractor,
+        - `'count'`, the number of stuck particles, with their `'mean_steps'`,
+          `'mean_boundary_collisions'` and `'max_steps'`,
+        - `'window_mean_steps'` and `'window_mean_boundary_collisions'` over the
+          most recent `'window'` stuck particles, see `stats_window`,
+        - `'steps_histogram'`, the number of stuck particles whose required
+          steps lie in `[2**(k-1), 2**k)` for each bin `k > 0`, bin 0 counting
+          particles which required no steps.
+        """
+        return _running_stats(self._this, 2)
+    def profile(self, reset=False):
+        """Returns the counters and per-phase timers of the hot paths of the
+        internal (C) generator, accumulated over all generation since the
+        aggregate was created or last reset. These are only available if the
+        shared library was built with profiling (`make profile` in `src/`), and
+        are gathered by the single-threaded engine only.
+
+        Parameters
+        ----------
+        *reset* :: `bool`, optional, default = False
+
+            Reset the counters and timers after reading them.
+
+        Returns
+        -------
+        A `dict` of the counts of walker `'steps'` (of which `'jumps'` were long
+        jumps), `'spawns'`, boundary `'reflections'` (including re-injections),
+        contacts with the aggregate rejected by stickiness (`'rejected_sticks'`),
+        `'occupancy_tests'` and vector `'reallocations'`, along with the time
+        spent in each phase in `'ticks'` (in `'tick_unit'`, CPU `'cycles'` or
+        `'ns'`) and as `'fractions'` of the total.
+
+        Exceptions
+        ----------
+        Raises `RuntimeError` if the shared library was built without profiling.
+        """
+        return _profile(self._this, reset)
+    @property
+    def stats_window(self):
+        """Returns the number of most recent particles in the windowed means of
+        `stats`.
+
+        Returns
+        -------
+        The window length of the running statistics.
+        """
+        return self._this._stats.contents.window
+    @stats_window.setter
+    def stats_window(self, value):
+        """Sets the number of most recent particles in the windowed means of
+        `stats`, restarting the window.
+
+        Parameters
+        ----------
+        *value* :: `int`
+
+            Window length to set, at least one.
+
+        Exceptions
+        ----------
+        Raises `MemoryError` if an allocation failure occurs.
+        """
+        if LIBDRP.running_stats_set_window(self._this._stats, c_size_t(value)) == -1:
+            raise MemoryError("allocation failure occurred in running_stats_set_window.")
+    @property
     def stickiness(self):
         """Returns the stickiness property of the aggregate. This describes
         the probability of a particle sticking to the aggregate upon collision.
@@ -157,6 +793,105 @@ class Aggregate2D(object):
         """
         self._this.att_size = c_size_t(value)
     @property
+    def spawn_type(self):
+        """Returns the spawning scheme used for random-walking particles.
+
+        Returns
+        -------
+        The spawning scheme of the aggregate.
+        """
+        return SpawnType(self._this.st)
+    @spawn_type.setter
+    def spawn_type(self, value):
+        """Sets the spawning scheme used for random-walking particles.
+
+        Parameters
+        ----------
+        *value* :: `droplet.SpawnType`
+
+            Spawning scheme to set.
+        """
+        self._this.st = c_int(value.value)
+    @property
+    def engine(self):
+        """Returns the engine used to advance random-walking particles.
+
+        Returns
+        -------
+        The random walk engine of the aggregate.
+        """
+        return WalkEngine(self._this.engine)
+    @engine.setter
+    def engine(self, value):
+        """Sets the engine used to advance random-walking particles.
+
+        Parameters
+        ----------
+        *value* :: `droplet.WalkEngine`
+
+            Random walk engine to set.
+        """
+        self._this.engine = c_int(value.value)
+    @property
+    def occupancy_type(self):
+        """Returns the storage scheme of the lattices of occupied sites.
+
+        Returns
+        -------
+        The occupancy type of the aggregate.
+        """
+        return OccupancyType(self._this._occupancy.contents.type)
+    @occupancy_type.setter
+    def occupancy_type(self, value):
+        """Sets the storage scheme of the lattices of occupied sites, converting
+        the lattices of any existing particles.
+
+        Parameters
+        ----------
+        *value* :: `droplet.OccupancyType`
+
+            Occupancy type to set.
+
+        Exceptions
+        ----------
+        Raises `MemoryError` if an occupancy allocation failure occurs.
+        """
+        retval = LIBDRP.aggregate_set_occupancy(self._handle, c_size_t(2), c_int(value.value))
+        if retval == -1:
+            raise MemoryError("occupancy allocation failure occurred in aggregate_set_occupancy.")
+    @property
+    def kill_ratio(self):
+        """Returns the ratio of the kill radius to the launch radius used by
+        `LAUNCH` spawning. Particles which wander beyond the kill radius are
+        re-injected onto the launch circle/sphere. As re-injection follows the
+        exact first-passage distribution, a kill radius close to the launch
+        radius wastes the fewest steps, the default ratio being 1.01, with the
+        kill radius kept at least two sites beyond the launch radius.
+
+        Returns
+        -------
+        Ratio of kill radius to launch radius.
+        """
+        return self._this.kill_ratio
+    @kill_ratio.setter
+    def kill_ratio(self, value):
+        """Sets the ratio of the kill radius to the launch radius used by
+        `LAUNCH` spawning.
+
+        Parameters
+        ----------
+        *value* :: `float`
+
+            Ratio of kill radius to launch radius to set.
+
+        Exceptions
+        ----------
+        Raises `ValueError` if `value` is not greater than 1.
+        """
+        if value <= 1.0:
+            raise ValueError("Kill ratio of aggregate must be greater than 1.")
+        self._this.kill_ratio = c_double(value)
+    @property
     def required_steps(self):
         """Returns the number of lattice steps required for each particle to stick
         to the aggregate.
@@ -166,12 +901,7 @@ class Aggregate2D(object):
         The number of steps on the lattice each particle was required to complete
         before sticking to the aggregate.
         """
-        aggsize = LIBDRP.vector_size(self._this._rsteps)
-        ret = np.zeros(aggsize, dtype=int)
-        for idx in np.arange(aggsize):
-            addr = LIBDRP.vector_at(self._this._rsteps, c_size_t(idx))
-            ret[idx] = cast(addr, _C_SIZE_T_PTR_T).contents.value
-        return ret
+        return self.required_steps_as_ndarray()
     @property
     def boundary_collisions(self):
         """Returns the number of boundary collisions each random-walking particle
@@ -181,12 +911,40 @@ class Aggregate2D(object):
         -------
         Number of boundary collisions experienced by each particle.
         """
-        aggsize = LIBDRP.vector_size(self._this._bcolls)
-        ret = np.zeros(aggsize, dtype=int)
-        for idx in np.arange(aggsize):
-            addr = LIBDRP.vector_at(self._this._bcolls, c_size_t(idx))
-            ret[idx] = cast(addr, _C_SIZE_T_PTR_T).contents.value
-        return ret
+        return self.boundary_collisions_as_ndarray()
+    def required_steps_as_ndarray(self, copy=True):
+        """Returns the number of lattice steps required for each particle to stick
+        to the aggregate as a `np.ndarray`.
+
+        Parameters
+        ----------
+        *copy* :: `bool`, optional, default = True
+
+            If `False`, returns a read-only view of the internal (C) memory
+            rather than a copy. The aggregate cannot grow while the view is alive.
+
+        Returns
+        -------
+        The number of steps on the lattice each particle was required to complete
+        before sticking to the aggregate.
+        """
+        return _vector_as_ndarray(self, self._this._rsteps, 'u', copy=copy)
+    def boundary_collisions_as_ndarray(self, copy=True):
+        """Returns the number of boundary collisions each random-walking particle
+        experienced before sticking to the aggregate as a `np.ndarray`.
+
+        Parameters
+        ----------
+        *copy* :: `bool`, optional, default = True
+
+            If `False`, returns a read-only view of the internal (C) memory
+            rather than a copy. The aggregate cannot grow while the view is alive.
+
+        Returns
+        -------
+        Number of boundary collisions experienced by each particle.
+        """
+        return _vector_as_ndarray(self, self._this._bcolls, 'u', copy=copy)
     @property
     def max_x(self):
         """Obtains the maximum x co-ordinate value of the aggregate.
@@ -216,6 +974,36 @@ class Aggregate2D(object):
         """
         return np.sqrt(self._this.max_r_sqd)
     @property
+    def colors(self):
+        """Returns the colors of the particles of the aggregate, an array of
+        `shape=(size, 3)` of (r,g,b) values determined by `color_profile` and
+        `color_by`. The colors are computed on first access and cached until
+        the aggregate, or either of these attributes, changes.
+
+        Exceptions
+        ----------
+        Raises `ValueError` if coloring by required steps an aggregate which
+        does not record them.
+        """
+        key = (self.size, self.color_profile, self.color_by)
+        if self._colors is None or self._colors_key != key:
+            self._colors = clrpr.particle_colors(self, self.color_profile, self.color_by)
+            self._colors_key = key
+        return self._colors
+    @colors.setter
+    def colors(self, value):
+        """Sets custom colors of the particles of the aggregate, which are kept
+        until the aggregate changes.
+
+        Parameters
+        ----------
+        *value* :: array-like
+
+            Colors of the particles with `shape=(size, 3)`.
+        """
+        self._colors = np.asarray(value, dtype=float)
+        self._colors_key = (self.size, self.color_profile, self.color_by)
+    @property
     def size(self):
         """Returns the size of the aggregate in terms of the total number
         of particles - including the initial attractor seed.
@@ -233,40 +1021,84 @@ class Aggregate2D(object):
         Dimension of the aggregate fractal.
         """
         return np.log(self.size)/np.log(self.radius)
-    def as_ndarray(self):
-        """Copies the internal (C) aggregate structure to a `np.ndarray`
+    def as_ndarray(self, copy=True):
+        """Returns the internal (C) aggregate structure as a `np.ndarray`
         with `shape=(n, 2)` where `n` is the size of the aggregate.
 
+        Parameters
+        ----------
+        *copy* :: `bool`, optional, default = True
+
+            If `False`, returns a read-only view of the internal (C) memory
+            rather than a copy. The aggregate cannot grow while the view is alive.
+
         Returns
         -------
         An instance of `np.ndarray` containing aggregate particle co-ordinates.
         """
-        aggsize = LIBDRP.vector_size(self._this._aggregate)
-        ret = np.zeros((aggsize, 2), dtype=int)
-        for idx in np.arange(aggsize):
-            addr = LIBDRP.vector_at(self._this._aggregate, c_size_t(idx))
-            aggp = cast(addr, _INTPAIR_PTR_T).contents
-            ret[idx][0] = aggp.x
-            ret[idx][1] = aggp.y
-        return ret
-    def attractor_as_ndarray(self):
-        """Copies the internal (C) attractor structure to a `np.ndarray`
+        return _vector_as_ndarray(self, self._this._aggregate, 'i', 2, copy)
+    def attractor_as_ndarray(self, copy=True):
+        """Returns the internal (C) attractor structure as a `np.ndarray`
         with `shape=(n, 2)` where `n` is the size of the attractor.
 
+        Parameters
+        ----------
+        *copy* :: `bool`, optional, default = True
+
+            If `False`, returns a read-only view of the internal (C) memory
+            rather than a copy. The aggregate cannot grow while the view is alive.
+
         Returns
         -------
         An instance of `np.ndarray` containing the attractor particle co-ordinates.
         """
-        attsize = LIBDRP.vector_size(self._this._attractor)
-        ret = np.zeros((attsize, 2), dtype=int)
-        for idx in np.arange(attsize):
-            addr = LIBDRP.vector_at(self._this._attractor, c_size_t(idx))
-            attp = cast(addr, _INTPAIR_PTR_T).contents
-            ret[idx][0] = attp.x
-            ret[idx][1] = attp.y
-        return ret
-    def generate(self, nparticles, display_progress=True):
-        """Generates an aggregate consisting of `nparticles`.
+        return _vector_as_ndarray(self, self._this._attractor, 'i', 2, copy)
+    def _generate(self, nparticles, reporter, threads, walkers, deterministic, limits):
+        """Adds up to `nparticles` to the aggregate using the single or multi-
+        threaded engine, reporting progress to `reporter` if given and stopping
+        at `limits`, see `generate`. Returns the `StopReason`."""
+        if threads < 1:
+            raise ValueError("threads must be at least one.")
+        _check_views(self)
+        self._colors = None
+        if reporter is not None:
+            reporter.attach(self._this)
+        limits.attach()
+        try:
+            if threads == 1 and walkers is None:
+                retval = LIBDRP.aggregate_2d_generate(self._handle,
+                                                      c_size_t(nparticles),
+                                                      c_bool(False))
+                fname = "aggregate_2d_generate"
+            else:
+                retval = LIBDRP.aggregate_2d_generate_parallel(
+                    self._handle, c_size_t(nparticles), c_size_t(threads),
+                    c_size_t(threads if walkers is None else walkers),
+                    c_bool(deterministic), c_bool(False))
+                fname = "aggregate_2d_generate_parallel"
+        finally:
+            _StopLimits.detach(self._this)
+            if reporter is not None:
+                _ProgressReporter.detach(self._this)
+        if retval == -1:
+            raise MemoryError("vector reallocation failure occurred in {}.".format(fname))
+        if reporter is not None:
+            reporter.check()
+        return self.stop_reason
+    def generate(self, nparticles, display_progress=True, checkpoint_path=None,
+                 checkpoint_every=None, threads=1, walkers=None, deterministic=False,
+                 progress=None, progress_every=None, progress_interval=0.1,
+                 max_radius=None, max_time=None, max_steps=None):
+        """Generates an aggregate consisting of `nparticles`. If the aggregate has
+        already been generated, `nparticles` further particles are added to it
+        as for `grow`.
+
+        Generation stops early, leaving a consistent aggregate of the particles
+        stuck so far which may be grown further, once any of `max_radius`,
+        `max_time` or `max_steps` is reached or when `cancel` is called from
+        another thread. The interpreter lock is released while particles are
+        generated, so that generation may run in a worker thread, e.g. with
+        `asyncio.to_thread`, alongside an event loop which calls `cancel`.
 
         Parameters
         ----------
@@ -278,127 +1110,612 @@ class Aggregate2D(object):
 
             Print progress bar to terminal.
 
+        *checkpoint_path* :: `str`, optional, default = None
+
+            Path of a checkpoint file to write, see `save`.
+
+        *checkpoint_every* :: `int`, optional, default = None
+
+            If given along with `checkpoint_path`, the aggregate is checkpointed
+            each time this many further particles have stuck, and once more at
+            the end of generation. Otherwise a `checkpoint_path` is written only
+            at the end of generation.
+
+        *threads* :: `int`, optional, default = 1
+
+            Number of threads. If greater than one, or if `walkers` is given,
+            many particles random-walk concurrently against the shared aggregate
+            and sticking events are committed one at a time with exclusive access
+            to it. Particles which find their sticking site already claimed by
+            another commit are re-spawned. The interpreter lock is released for
+            the whole call.
+
+        *walkers* :: `int`, optional, default = None
+
+            Number of concurrently random-walking particles, defaults to `threads`.
+
+        *deterministic* :: `bool`, optional, default = False
+
+            If `True`, concurrent walkers advance in lock-step and sticking events
+            are committed in order of walker index, so that the aggregate depends
+            only on the seed and number of `walkers`, independently of `threads`
+            and of scheduling. Otherwise events are committed in order of arrival,
+            which is faster but not reproducible.
+
+        *progress* :: callable, optional, default = None
+
+            Function called as `progress(count, total, radius, steps)` with the
+            number of particles stuck so far, `nparticles`, the spanning radius
+            of the aggregate and the total lattice steps taken by all of its
+            stuck particles, e.g. to forward progress to a logger. An exception
+            raised by `progress` is re-raised once generation completes.
+
+        *progress_every* :: `int`, optional, default = None
+
+            Report progress each time this many further particles have stuck.
+
+        *progress_interval* :: `float`, optional, default = 0.1
+
+            Report progress at most this many seconds apart, or `None` to report
+            only according to `progress_every`. Progress is only checked by the
+            internal (C) generator, with negligible overhead, if `display_progress`
+            or `progress` is given.
+
+        *max_radius* :: `float`, optional, default = None
+
+            Stop once the spanning radius of the aggregate, see `radius`,
+            reaches this value.
+
+        *max_time* :: `float`, optional, default = None
+
+            Stop once this many seconds of wall-clock time have elapsed.
+
+        *max_steps* :: `float`, optional, default = None
+
+            Stop once this many lattice steps have been taken by the particles
+            generated in this call. The multi-threaded engine counts only the
+            steps of particles which stuck.
+
+        Returns
+        -------
+        The `StopReason` of the condition which stopped generation.
+
         Exceptions
         ----------
         Raises `MemoryError` if a vector reallocation failure occurs.
+
+        Raises `RuntimeError` if views of the aggregate returned with `copy=False`
+        are alive, see `as_ndarray`.
         """
-        retval = LIBDRP.aggregate_2d_generate(self._handle,
-                                              c_size_t(nparticles),
-                                              c_bool(display_progress))
-        if retval == -1:
-            raise MemoryError("vector reallocation failure occurred in aggregate_2d_generate.")
-        # initialise colors for each particle in aggregate
-        self.colors = np.zeros(nparticles+self._this.att_size, dtype=(float, 3))
-        clrpr.blue_through_red(self.colors)
-    def generate_stream(self, nparticles, display_progress=False):
-        """Generator function for streaming aggregate data to a real-time plot.
+        reporter = None
+        if display_progress or progress is not None:
+            reporter = _ProgressReporter(nparticles, display_progress, progress,
+                                         progress_every, progress_interval)
+        limits = _StopLimits(self._this, max_radius, max_time, max_steps)
+        if checkpoint_path is None or checkpoint_every is None:
+            reason = self._generate(nparticles, reporter, threads, walkers,
+                                    deterministic, limits)
+            if checkpoint_path is not None:
+                self.save(checkpoint_path)
+        else:
+            count = 0
+            reason = StopReason.COUNT
+            while count < nparticles:
+                reason = limits.exhausted()
+                if reason != StopReason.NONE:
+                    break
+                chunk = min(checkpoint_every, nparticles - count)
+                if reporter is not None:
+                    reporter.offset = count
+                nstuck = self._this._stats.contents.nstuck
+                reason = self._generate(chunk, reporter, threads, walkers,
+                                        deterministic, limits)
+                count += self._this._stats.contents.nstuck - nstuck
+                self.save(checkpoint_path)
+                if reason != StopReason.COUNT:
+                    break
+        if reporter is not None:
+            reporter.finish()
+        return reason
+    def grow(self, nparticles, display_progress=True, checkpoint_path=None,
+             checkpoint_every=None, threads=1, walkers=None, deterministic=False,
+             progress=None, progress_every=None, progress_interval=0.1,
+             max_radius=None, max_time=None, max_steps=None):
+        """Grows the aggregate by a further `nparticles`, continuing from its
+        current state. The attractor is seeded only if the aggregate is empty,
+        while the spawning region, random number stream and statistics of
+        previously stuck particles are all retained.
 
         Parameters
         ----------
         *nparticles* :: `int`
 
-            Size of aggregate to generate.
+            Number of particles to add to the aggregate.
 
-        *display_progress* :: `bool`, optional, default = False
+        *display_progress* :: `bool`, optional, default = True
 
             Print progress bar to terminal.
 
+        *checkpoint_path* :: `str`, optional, default = None
+
+            Path of a checkpoint file to write, see `generate`.
+
+        *checkpoint_every* :: `int`, optional, default = None
+
+            Number of particles between checkpoints, see `generate`.
+
+        *threads*, *walkers*, *deterministic* ::
+
+            Multi-threaded generation options, see `generate`.
+
+        *progress*, *progress_every*, *progress_interval* ::
+
+            Progress reporting options, see `generate`.
+
+        *max_radius*, *max_time*, *max_steps* ::
+
+            Stop conditions, see `generate`.
+
+        Returns
+        -------
+        The `StopReason` of the condition which stopped generation.
+
         Exceptions
         ----------
         Raises `MemoryError` if a vector reallocation failure occurs.
-        """
-        LIBDRP.aggregate_2d_lattice_collision.restype = c_bool
-        LIBDRP.aggregate_2d_collision.restype = c_bool
-        rv_res = LIBDRP.aggregate_reserve(self._handle, c_size_t(nparticles))
-        if rv_res == -1:
-            raise MemoryError("vector reallocation failure occurred in aggregate_2d_reserve.")
-        rv_ia = LIBDRP.aggregate_2d_init_attractor(self._handle, c_size_t(nparticles))
-        if rv_ia == -1:
-            raise MemoryError("""vector reallocation failure occurred in
-            aggregate_2d_init_attractor.""")
-        self.__aggregate = np.zeros((nparticles + self._this.att_size, 2), dtype=int)
-        # initialise colors for each particle in aggregate
-        self.colors = np.zeros(2*(nparticles+self._this.att_size), dtype=(float, 3))
-        clrpr.blue_through_red(self.colors)
-        curr = _IntPair()
-        prev = _IntPair()
-        has_next_spawned = False
-        rsteps = c_size_t(0) # required steps to stick
-        bcolls = c_size_t(0) # lattice boundary collisions before stick
-        count = 0
-        if display_progress:
-            pbar = pb.ProgressBar(maxval=nparticles).start()
-        while count < nparticles:
-            if not has_next_spawned:
-                LIBDRP.aggregate_2d_spawn_bp(self._handle, byref(curr))
-                has_next_spawned = True
-            prev.x = curr.x
-            prev.y = curr.y
-            LIBDRP.aggregate_2d_update_bp(self._handle, byref(curr))
-            if LIBDRP.aggregate_2d_lattice_collision(self._handle, byref(curr), byref(prev)):
-                bcolls = c_size_t(bcolls.value + 1)
-            rsteps = c_size_t(rsteps.value + 1)
-            if LIBDRP.aggregate_2d_collision(self._handle, byref(curr), byref(prev)):
-                addr_rec = LIBDRP.vector_at(self._this._aggregate,
-                                            c_size_t(count + self._this.att_size))
-                aggp_rec = cast(addr_rec, _INTPAIR_PTR_T).contents
-                self.__aggregate[count+self._this.att_size][0] = aggp_rec.x
-                self.__aggregate[count+self._this.att_size][1] = aggp_rec.y
-                LIBDRP.vector_push_back(self._this._rsteps, byref(rsteps), sizeof(c_size_t))
-                LIBDRP.vector_push_back(self._this._bcolls, byref(bcolls), sizeof(c_size_t))
-                rsteps = c_size_t(0)
-                bcolls = c_size_t(0)
-                count += 1
-                has_next_spawned = False
-                if display_progress:
-                    pbar.update(count)
-                yield self.__aggregate, self.colors, count
-        if display_progress:
-            pbar.finish()
 
-class Aggregate3D(object):
-    """A three-dimensional Diffusion Limited Aggregate."""
-    def __init__(self, stickiness=1.0, lattice_type=LatticeType.SQUARE,
-                 attractor_type=AttractorType.POINT,
-                 color_profile=clrpr.ColorProfile.BLUETHROUGHRED):
-        """Initialises the aggregate with the specified properties.
+        Raises `RuntimeError` if views of the aggregate returned with `copy=False`
+        are alive, see `as_ndarray`.
+        """
+        return self.generate(nparticles, display_progress, checkpoint_path,
+                             checkpoint_every, threads, walkers, deterministic, progress,
+                             progress_every, progress_interval, max_radius, max_time,
+                             max_steps)
+    def extend_to(self, nparticles, display_progress=True, checkpoint_path=None,
+                  checkpoint_every=None, threads=1, walkers=None, deterministic=False,
+                  progress=None, progress_every=None, progress_interval=0.1,
+                  max_radius=None, max_time=None, max_steps=None):
+        """Grows the aggregate, continuing from its current state, until it holds
+        `nparticles` particles in addition to the attractor seed. Does nothing
+        if the aggregate already holds at least this many particles. Combined
+        with `load`, this resumes an interrupted, checkpointed generation.
 
         Parameters
         ----------
-        *stickiness* :: `float`, optional, default = 1.0
+        *nparticles* :: `int`
 
-            Probability of a particle sticking to the aggregate.
+            Number of particles, excluding the attractor, to grow to.
 
-        *lattice_type* :: `droplet.LatticeType`, optional, default = `SQUARE`
+        *display_progress* :: `bool`, optional, default = True
 
-            Type of lattice to generate aggregate upon.
+            Print progress bar to terminal.
 
-        *attractor_type* :: `droplet.AttractorType`, optional, default = `POINT`
+        *checkpoint_path* :: `str`, optional, default = None
 
-            Type of initial attractor geometry.
+            Path of a checkpoint file to write, see `generate`.
 
-        *color_profile* :: `droplet.colorprofiles.ColorProfile`, optional,
-        default = `BLUETHROUGHRED`
+        *checkpoint_every* :: `int`, optional, default = None
 
-            Color profile of aggregate structure.
+            Number of particles between checkpoints, see `generate`.
+
+        *threads*, *walkers*, *deterministic* ::
+
+            Multi-threaded generation options, see `generate`.
+
+        *progress*, *progress_every*, *progress_interval* ::
+
+            Progress reporting options, see `generate`.
+
+        *max_radius*, *max_time*, *max_steps* ::
+
+            Stop conditions, see `generate`.
+
+        Returns
+        -------
+        The `StopReason` of the condition which stopped generation, `COUNT` if
+        the aggregate already held `nparticles`.
 
         Exceptions
         ----------
-        Raises `MemoryError` if a vector allocation failure occurs.
+        Raises `MemoryError` if a vector reallocation failure occurs.
+
+        Raises `RuntimeError` if views of the aggregate returned with `copy=False`
+        are alive, see `as_ndarray`.
+        """
+        # counted from the co-ordinates, as statistics may not be recorded
+        nstuck = (LIBDRP.vector_size(self._this._aggregate) -
+                  LIBDRP.vector_size(self._this._attractor))
+        if nparticles <= nstuck:
+            return StopReason.COUNT
+        return self.grow(nparticles - nstuck, display_progress, checkpoint_path,
+                         checkpoint_every, threads, walkers, deterministic, progress,
+                         progress_every, progress_interval, max_radius, max_time,
+                         max_steps)
+    def cancel(self):
+        """Requests that generation of the aggregate stops as soon as possible,
+        with the particles stuck so far, and returns immediately. Safe to call
+        from any thread while `generate` runs in another. A request made while
+        no generation is running stops the next generation before any particle
+        is added.
+        """
+        LIBDRP.aggregate_cancel(self._handle)
+    @property
+    def stop_reason(self):
+        """Returns the condition which stopped the most recent generation.
+
+        Returns
+        -------
+        A `StopReason`.
+        """
+        return StopReason(self._this.stop.reason)
+    def save(self, path):
+        """Writes the full state of the aggregate - particle co-ordinates, statistics,
+        all generation parameters and the random number generator state - to a
+        compact, versioned binary checkpoint file.
+
+        Parameters
+        ----------
+        *path* :: `str`
+
+            Path of the checkpoint file.
+        """
+        from droplet import checkpoint
+        checkpoint.save(self, path)
+    @classmethod
+    def load(cls, path):
+        """Restores an aggregate from a checkpoint file written by `save`. The
+        restored aggregate continues generation exactly where it was saved.
+
+        Parameters
+        ----------
+        *path* :: `str`
+
+            Path of the checkpoint file.
+
+        Returns
+        -------
+        The restored aggregate.
+
+        Exceptions
+        ----------
+        Raises `ValueError` if `path` is not a checkpoint of this aggregate type,
+        or is truncated.
+
+        Raises `MemoryError` if a vector allocation failure occurs.
+        """
+        from droplet import checkpoint
+        return checkpoint.load(cls, path)
+    def generate_stream(self, nparticles, display_progress=False, batch=1):
+        """Generator function for streaming aggregate data to a real-time plot.
+
+        Parameters
+        ----------
+        *nparticles* :: `int`
+
+            Size of aggregate to generate.
+
+        *display_progress* :: `bool`, optional, default = False
+
+            Print progress bar to terminal.
+
+        *batch* :: `int`, optional, default = 1
+
+            Number of particles stuck to the aggregate, entirely within the
+            C library, between successive yields.
+
+        Yields
+        ------
+        A tuple of the aggregate co-ordinates, the particle colors and the
+        number of particles generated so far.
+
+        Exceptions
+        ----------
+        Raises `MemoryError` if a vector reallocation failure occurs.
+
+        Raises `RuntimeError` if views of the aggregate returned with `copy=False`
+        are alive, see `as_ndarray`.
+        """
+        _check_views(self)
+        rv_res = LIBDRP.aggregate_reserve(self._handle, c_size_t(nparticles))
+        if rv_res == -1:
+            raise MemoryError("vector reallocation failure occurred in aggregate_reserve.")
+        rv_ia = LIBDRP.aggregate_2d_init_attractor(self._handle, c_size_t(nparticles))
+        if rv_ia == -1:
+            raise MemoryError("""vector reallocation failure occurred in
+            aggregate_2d_init_attractor.""")
+        self._colors = None
+        start = self.size
+        self.__aggregate = np.zeros((start + nparticles, 2), dtype=int)
+        self.__aggregate[:start] = self.as_ndarray(copy=False)
+        # the stick order gradient spans the final size, other colorings are
+        # recomputed as the aggregate grows
+        order = self.color_by == clrpr.ColorBy.STICK_ORDER
+        if order:
+            colors = clrpr.particle_colors(self, self.color_profile, self.color_by,
+                                           total=start + nparticles)
+        nstuck = c_size_t(0)
+        count = 0
+        if display_progress:
+            pbar = pb.ProgressBar(maxval=nparticles).start()
+        while count < nparticles:
+            _check_views(self)
+            retval = LIBDRP.aggregate_2d_advance(self._handle,
+                                                c_size_t(min(batch, nparticles - count)),
+                                                c_size_t(0), byref(nstuck))
+            if retval == -1:
+                raise MemoryError("vector reallocation failure occurred in aggregate_2d_advance.")
+            size = start + count + nstuck.value
+            self.__aggregate[start+count:size] = self.as_ndarray(copy=False)[start+count:size]
+            count += nstuck.value
+            if display_progress:
+                pbar.update(count)
+            yield self.__aggregate, (colors if order else self.colors), count
+        if display_progress:
+            pbar.finish()
+    def agenerate_stream(self, nparticles, batch=1, maxsize=4, executor=None):
+        """Asynchronous generator function streaming the growth of the aggregate
+        to an event loop, e.g. `async for coords, count in agg.agenerate_stream(n)`.
+        Particles are generated in `executor`, with the interpreter lock released,
+        so that the event loop keeps serving other tasks. Generation runs at
+        most `maxsize` batches ahead of the consumer, pausing until a slow
+        consumer catches up, and stops once the generator is closed, e.g. by
+        `contextlib.aclosing` on breaking out of iteration. The aggregate must
+        not be otherwise accessed until iteration ends.
+
+        Parameters
+        ----------
+        *nparticles* :: `int`
+
+            Number of particles to add to the aggregate.
+
+        *batch* :: `int`, optional, default = 1
+
+            Number of particles stuck to the aggregate, entirely within the
+            C library, between successive yields.
+
+        *maxsize* :: `int`, optional, default = 4
+
+            Number of generated batches held for the consumer before generation
+            pauses.
+
+        *executor* :: `concurrent.futures.Executor`, optional, default = None
+
+            Executor running the generation, the default executor of the event
+            loop if `None`. Must be a thread pool, as the aggregate is shared.
+
+        Yields
+        ------
+        A tuple of the co-ordinates of the newly stuck particles, an array of
+        `shape=(k, 2)` with `k` at most `batch`, and the number of particles
+        generated so far.
+
+        Exceptions
+        ----------
+        Raises `MemoryError` if a vector reallocation failure occurs.
+
+        Raises `RuntimeError` if views of the aggregate returned with `copy=False`
+        are alive, see `as_ndarray`.
+        """
+        return _stream_batches(self, 2, nparticles, batch, maxsize, executor)
+
+class Aggregate3D(object):
+    """A three-dimensional Diffusion Limited Aggregate."""
+    def __init__(self, stickiness=1.0, lattice_type=LatticeType.SQUARE,
+                 attractor_type=AttractorType.POINT,
+                 color_profile=clrpr.ColorProfile.BLUETHROUGHRED,
+                 spawn_type=SpawnType.BOX, engine=WalkEngine.UNIT_STEP, seed=None,
+                 compact=False, stats_bits=64, occupancy_type=OccupancyType.DENSE,
+                 color_by=clrpr.ColorBy.STICK_ORDER):
+        """Initialises the aggregate with the specified properties.
+
+        Parameters
+        ----------
+        *stickiness* :: `float`, optional, default = 1.0
+
+            Probability of a particle sticking to the aggregate.
+
+        *lattice_type* :: `droplet.LatticeType`, optional, default = `SQUARE`
+
+            Type of lattice to generate aggregate upon.
+
+        *attractor_type* :: `droplet.AttractorType`, optional, default = `POINT`
+
+            Type of initial attractor geometry.
+
+        *color_profile* :: `droplet.colorprofiles.ColorProfile`, optional,
+        default = `BLUETHROUGHRED`
+
+            Color profile of aggregate structure.
+
+        *spawn_type* :: `droplet.SpawnType`, optional, default = `BOX`
+
+            Spawning scheme for random-walking particles.
+
+        *engine* :: `droplet.WalkEngine`, optional, default = `UNIT_STEP`
+
+            Engine used to advance random-walking particles.
+
+        *seed* :: `int`, optional, default = None
+
+            Seed of the aggregate's pseudo-random number generator, must be in
+            [0, 2**64). If `None`, a seed is derived from the current time and
+            the aggregate's address. Each aggregate draws from its own stream.
+
+        *compact* :: `bool`, optional, default = False
+
+            Store particle co-ordinates as 16-bit integers, halving their memory.
+            Storage is promoted to 32-bit integers automatically once a particle
+            lies outside of the 16-bit range.
+
+        *stats_bits* :: `int`, optional, default = 64
+
+            Width of the stored required steps and boundary collisions of each
+            particle, 64 or 32 (saturating at 2**32 - 1), or 0 to not record them.
+
+        *occupancy_type* :: `droplet.OccupancyType`, optional, default = `DENSE`
+
+            Storage scheme of the lattices of occupied sites.
+
+        *color_by* :: `droplet.colorprofiles.ColorBy`, optional, default = `STICK_ORDER`
+
+            Quantity of each particle mapped onto the color profile.
+
+        Exceptions
+        ----------
+        Raises `MemoryError` if a vector allocation failure occurs.
+
+        Raises `ValueError` if `seed` not in [0, 2**64) or `stats_bits` not one
+        of 64, 32 or 0.
         """
         self._this = _AggregateWrapper()
         self._handle = byref(self._this)
+        if seed is not None and (seed < 0 or seed >= 2**64):
+            raise ValueError("Seed of aggregate must be in [0, 2**64).")
+        if stats_bits not in (64, 32, 0):
+            raise ValueError("stats_bits of aggregate must be one of 64, 32 or 0.")
         retval = LIBDRP.aggregate_3d_init(self._handle, c_double(stickiness),
                                           c_int(lattice_type.value),
                                           c_int(attractor_type.value))
         if retval == -1:
             raise MemoryError("vector allocation failure occurred in aggregate_3d_init.")
+        if compact or stats_bits != 64:
+            retval = LIBDRP.aggregate_set_storage(self._handle, c_size_t(3), c_bool(compact),
+                                                  c_size_t(stats_bits//8))
+            if retval == -1:
+                raise MemoryError("vector allocation failure occurred in aggregate_set_storage.")
+        if occupancy_type != OccupancyType.DENSE:
+            self.occupancy_type = occupancy_type
+        self._this.st = c_int(spawn_type.value)
+        self._this.engine = c_int(engine.value)
+        if seed is not None:
+            LIBDRP.aggregate_seed(self._handle, c_uint64(seed))
         self.color_profile = color_profile
-        self.colors = np.array(0)
+        self.color_by = color_by
+        self._colors = None
+        self._colors_key = None
+        self._views = weakref.WeakValueDictionary()
         self.__aggregate = np.array(0)
     def __del__(self):
         LIBDRP.aggregate_free_fields(self._handle)
     @property
+    def seed(self):
+        """Returns the seed of the aggregate's pseudo-random number generator.
+        Constructing an aggregate with this seed reproduces its generation.
+
+        Returns
+        -------
+        The seed of the aggregate.
+        """
+        return self._this.seed
+    @property
+    def compact(self):
+        """Returns whether particle co-ordinates are currently stored as 16-bit
+        integers. This becomes `False` once storage has been promoted.
+
+        Returns
+        -------
+        `True` if co-ordinates are in compact storage, `False` otherwise.
+        """
+        return self._this._aggregate.contents.elemsize == 3*2
+    @property
+    def stats_bits(self):
+        """Returns the width of the stored statistics of each particle.
+
+        Returns
+        -------
+        64 or 32, or 0 if statistics are not recorded.
+        """
+        if not self._this.record_stats:
+            return 0
+        return 8*self._this._rsteps.contents.elemsize
+    @property
+    def memory_usage(self):
+        """Returns the memory allocated to each internal (C) buffer of the
+        aggregate.
+
+        Returns
+        -------
+        A `dict` mapping `'coordinates'`, `'attractor'`, `'required_steps'`,
+        `'boundary_collisions'` and `'occupancy'` (the fine and coarse occupancy
+        lattices) to their size in bytes, along with their `'total'`.
+        """
+        return _memory_usage(self._this)
+    @property
+    def stats(self):
+        """Returns a snapshot of the statistics maintained incrementally by the
+        internal (C) generator as particles stick, in time independent of the
+        size of the aggregate. These remain available with `stats_bits=0`.
+
+        Returns
+        -------
+        A `dict` of:
+
+        - `'size'`, `'center_of_mass'` and `'radius_of_gyration'` of all
+          particles of the aggregate, including the attractor,
+        - `'count'`, the number of stuck particles, with their `'mean_steps'`,
+          `'mean_boundary_collisions'` and `'max_steps'`,
+        - `'window_mean_steps'` and `'window_mean_boundary_collisions'` over the
+          most recent `'window'` stuck particles, see `stats_window`,
+        - `'steps_histogram'`, the number of stuck particles whose required
+          steps lie in `[2**(k-1), 2**k)` for each bin `k > 0`, bin 0 counting
+          particles which required no steps.
+        """
+        return _running_stats(self._this, 3)
+    def profile(self, reset=False):
+        """Returns the counters and per-phase timers of the hot paths of the
+        internal (C) generator, accumulated over all generation since the
+        aggregate was created or last reset. These are only available if the
+        shared library was built with profiling (`make profile` in `src/`), and
+        are gathered by the single-threaded engine only.
+
+        Parameters
+        ----------
+        *reset* :: `bool`, optional, default = False
+
+            Reset the counters and timers after reading them.
+
+        Returns
+        -------
+        A `dict` of the counts of walker `'steps'` (of which `'jumps'` were long
+        jumps), `'spawns'`, boundary `'reflections'` (including re-injections),
+        contacts with the aggregate rejected by stickiness (`'rejected_sticks'`),
+        `'occupancy_tests'` and vector `'reallocations'`, along with the time
+        spent in each phase in `'ticks'` (in `'tick_unit'`, CPU `'cycles'` or
+        `'ns'`) and as `'fractions'` of the total.
+
+        Exceptions
+        ----------
+        Raises `RuntimeError` if the shared library was built without profiling.
+        """
+        return _profile(self._this, reset)
+    @property
+    def stats_window(self):
+        """Returns the number of most recent particles in the windowed means of
+        `stats`.
+
+        Returns
+        -------
+        The window length of the running statistics.
+        """
+        return self._this._stats.contents.window
+    @stats_window.setter
+    def stats_window(self, value):
+        """Sets the number of most recent particles in the windowed means of
+        `stats`, restarting the window.
+
+        Parameters
+        ----------
+        *value* :: `int`
+
+            Window length to set, at least one.
+
+        Exceptions
+        ----------
+        Raises `MemoryError` if an allocation failure occurs.
+        """
+        if LIBDRP.running_stats_set_window(self._this._stats, c_size_t(value)) == -1:
+            raise MemoryError("allocation failure occurred in running_stats_set_window.")
+    @property
     def stickiness(self):
         """Returns the stickiness property of the aggregate. This describes
         the probability of a particle sticking to the aggregate upon collision.
@@ -447,6 +1764,105 @@ class Aggregate3D(object):
         """
         self._this.att_size = c_size_t(value)
     @property
+    def spawn_type(self):
+        """Returns the spawning scheme used for random-walking particles.
+
+        Returns
+        -------
+        The spawning scheme of the aggregate.
+        """
+        return SpawnType(self._this.st)
+    @spawn_type.setter
+    def spawn_type(self, value):
+        """Sets the spawning scheme used for random-walking particles.
+
+        Parameters
+        ----------
+        *value* :: `droplet.SpawnType`
+
+            Spawning scheme to set.
+        """
+        self._this.st = c_int(value.value)
+    @property
+    def engine(self):
+        """Returns the engine used to advance random-walking particles.
+
+        Returns
+        -------
+        The random walk engine of the aggregate.
+        """
+        return WalkEngine(self._this.engine)
+    @engine.setter
+    def engine(self, value):
+        """Sets the engine used to advance random-walking particles.
+
+        Parameters
+        ----------
+        *value* :: `droplet.WalkEngine`
+
+            Random walk engine to set.
+        """
+        self._this.engine = c_int(value.value)
+    @property
+    def occupancy_type(self):
+        """Returns the storage scheme of the lattices of occupied sites.
+
+        Returns
+        -------
+        The occupancy type of the aggregate.
+        """
+        return OccupancyType(self._this._occupancy.contents.type)
+    @occupancy_type.setter
+    def occupancy_type(self, value):
+        """Sets the storage scheme of the lattices of occupied sites, converting
+        the lattices of any existing particles.
+
+        Parameters
+        ----------
+        *value* :: `droplet.OccupancyType`
+
+            Occupancy type to set.
+
+        Exceptions
+        ----------
+        Raises `MemoryError` if an occupancy allocation failure occurs.
+        """
+        retval = LIBDRP.aggregate_set_occupancy(self._handle, c_size_t(3), c_int(value.value))
+        if retval == -1:
+            raise MemoryError("occupancy allocation failure occurred in aggregate_set_occupancy.")
+    @property
+    def kill_ratio(self):
+        """Returns the ratio of the kill radius to the launch radius used by
+        `LAUNCH` spawning. Particles which wander beyond the kill radius are
+        re-injected onto the launch circle/sphere. As re-injection follows the
+        exact first-passage distribution, a kill radius close to the launch
+        radius wastes the fewest steps, the default ratio being 1.01, with the
+        kill radius kept at least two sites beyond the launch radius.
+
+        Returns
+        -------
+        Ratio of kill radius to launch radius.
+        """
+        return self._this.kill_ratio
+    @kill_ratio.setter
+    def kill_ratio(self, value):
+        """Sets the ratio of the kill radius to the launch radius used by
+        `LAUNCH` spawning.
+
+        Parameters
+        ----------
+        *value* :: `float`
+
+            Ratio of kill radius to launch radius to set.
+
+        Exceptions
+        ----------
+        Raises `ValueError` if `value` is not greater than 1.
+        """
+        if value <= 1.0:
+            raise ValueError("Kill ratio of aggregate must be greater than 1.")
+        self._this.kill_ratio = c_double(value)
+    @property
     def required_steps(self):
         """Returns the number of lattice steps required for each particle to stick
         to the aggregate.
@@ -456,12 +1872,7 @@ class Aggregate3D(object):
         The number of steps on the lattice each particle was required to complete
         before sticking to the aggregate.
         """
-        aggsize = LIBDRP.vector_size(self._this._rsteps)
-        ret = np.zeros(aggsize, dtype=int)
-        for idx in np.arange(aggsize):
-            addr = LIBDRP.vector_at(self._this._rsteps, c_size_t(idx))
-            ret[idx] = cast(addr, _C_SIZE_T_PTR_T).contents.value
-        return ret
+        return self.required_steps_as_ndarray()
     @property
     def boundary_collisions(self):
         """Returns the number of boundary collisions each random-walking particle
@@ -471,12 +1882,40 @@ class Aggregate3D(object):
         -------
         Number of boundary collisions experienced by each particle.
         """
-        aggsize = LIBDRP.vector_size(self._this._bcolls)
-        ret = np.zeros(aggsize, dtype=int)
-        for idx in np.arange(aggsize):
-            addr = LIBDRP.vector_at(self._this._bcolls, c_size_t(idx))
-            ret[idx] = cast(addr, _C_SIZE_T_PTR_T).contents.value
-        return ret
+        return self.boundary_collisions_as_ndarray()
+    def required_steps_as_ndarray(self, copy=True):
+        """Returns the number of lattice steps required for each particle to stick
+        to the aggregate as a `np.ndarray`.
+
+        Parameters
+        ----------
+        *copy* :: `bool`, optional, default = True
+
+            If `False`, returns a read-only view of the internal (C) memory
+            rather than a copy. The aggregate cannot grow while the view is alive.
+
+        Returns
+        -------
+        The number of steps on the lattice each particle was required to complete
+        before sticking to the aggregate.
+        """
+        return _vector_as_ndarray(self, self._this._rsteps, 'u', copy=copy)
+    def boundary_collisions_as_ndarray(self, copy=True):
+        """Returns the number of boundary collisions each random-walking particle
+        experienced before sticking to the aggregate as a `np.ndarray`.
+
+        Parameters
+        ----------
+        *copy* :: `bool`, optional, default = True
+
+            If `False`, returns a read-only view of the internal (C) memory
+            rather than a copy. The aggregate cannot grow while the view is alive.
+
+        Returns
+        -------
+        Number of boundary collisions experienced by each particle.
+        """
+        return _vector_as_ndarray(self, self._this._bcolls, 'u', copy=copy)
     @property
     def max_x(self):
         """Obtains the maximum x co-ordinate value of the aggregate.
@@ -515,6 +1954,36 @@ class Aggregate3D(object):
         """
         return np.sqrt(self._this.max_r_sqd)
     @property
+    def colors(self):
+        """Returns the colors of the particles of the aggregate, an array of
+        `shape=(size, 3)` of (r,g,b) values determined by `color_profile` and
+        `color_by`. The colors are computed on first access and cached until
+        the aggregate, or either of these attributes, changes.
+
+        Exceptions
+        ----------
+        Raises `ValueError` if coloring by required steps an aggregate which
+        does not record them.
+        """
+        key = (self.size, self.color_profile, self.color_by)
+        if self._colors is None or self._colors_key != key:
+            self._colors = clrpr.particle_colors(self, self.color_profile, self.color_by)
+            self._colors_key = key
+        return self._colors
+    @colors.setter
+    def colors(self, value):
+        """Sets custom colors of the particles of the aggregate, which are kept
+        until the aggregate changes.
+
+        Parameters
+        ----------
+        *value* :: array-like
+
+            Colors of the particles with `shape=(size, 3)`.
+        """
+        self._colors = np.asarray(value, dtype=float)
+        self._colors_key = (self.size, self.color_profile, self.color_by)
+    @property
     def size(self):
         """Returns the size of the aggregate in terms of the total number
         of particles - including the initial attractor seed.
@@ -532,41 +2001,84 @@ class Aggregate3D(object):
         Dimension of the aggregate fractal.
         """
         return np.log(self.size)/np.log(self.radius)
-    def as_ndarray(self):
-        """Copies the internal (C) aggregate structure to a `np.ndarray`
+    def as_ndarray(self, copy=True):
+        """Returns the internal (C) aggregate structure as a `np.ndarray`
         with `shape=(n, 3)` where `n` is the size of the aggregate.
 
+        Parameters
+        ----------
+        *copy* :: `bool`, optional, default = True
+
+            If `False`, returns a read-only view of the internal (C) memory
+            rather than a copy. The aggregate cannot grow while the view is alive.
+
         Returns
         -------
         An instance of `np.ndarray` containing aggregate particle co-ordinates.
         """
-        aggsize = LIBDRP.vector_size(self._this._aggregate)
-        ret = np.zeros((aggsize, 3), dtype=int)
-        for idx in np.arange(aggsize):
-            addr = LIBDRP.vector_at(self._this._aggregate, c_size_t(idx))
-            aggp = cast(addr, _INTTRIPLET_PTR_T).contents
-            ret[idx][0] = aggp.x
-            ret[idx][1] = aggp.y
-            ret[idx][2] = aggp.z
-        return ret
-    def attractor_as_ndarray(self):
-        """Copies the internal (C) attractor structure to a `np.ndarray`
+        return _vector_as_ndarray(self, self._this._aggregate, 'i', 3, copy)
+    def attractor_as_ndarray(self, copy=True):
+        """Returns the internal (C) attractor structure as a `np.ndarray`
         with `shape=(n, 3)` where `n` is the size of the attractor.
 
+        Parameters
+        ----------
+        *copy* :: `bool`, optional, default = True
+
+            If `False`, returns a read-only view of the internal (C) memory
+            rather than a copy. The aggregate cannot grow while the view is alive.
+
         Returns
         -------
         An instance of `np.ndarray` containing the attractor particle co-ordinates.
         """
-        attsize = LIBDRP.vector_size(self._this._attractor)
-        ret = np.zeros((attsize, 3), dtype=int)
-        for idx in np.arange(attsize):
-            addr = LIBDRP.vector_at(self._this._attractor, c_size_t(idx))
-            attp = cast(addr, _INTTRIPLET_PTR_T).contents
-            ret[idx][0] = attp.x
-            ret[idx][1] = attp.y
-        return ret
-    def generate(self, nparticles, display_progress=True):
-        """Generates an aggregate consisting of `nparticles`.
+        return _vector_as_ndarray(self, self._this._attractor, 'i', 3, copy)
+    def _generate(self, nparticles, reporter, threads, walkers, deterministic, limits):
+        """Adds up to `nparticles` to the aggregate using the single or multi-
+        threaded engine, reporting progress to `reporter` if given and stopping
+        at `limits`, see `generate`. Returns the `StopReason`."""
+        if threads < 1:
+            raise ValueError("threads must be at least one.")
+        _check_views(self)
+        self._colors = None
+        if reporter is not None:
+            reporter.attach(self._this)
+        limits.attach()
+        try:
+            if threads == 1 and walkers is None:
+                retval = LIBDRP.aggregate_3d_generate(self._handle,
+                                                      c_size_t(nparticles),
+                                                      c_bool(False))
+                fname = "aggregate_3d_generate"
+            else:
+                retval = LIBDRP.aggregate_3d_generate_parallel(
+                    self._handle, c_size_t(nparticles), c_size_t(threads),
+                    c_size_t(threads if walkers is None else walkers),
+                    c_bool(deterministic), c_bool(False))
+                fname = "aggregate_3d_generate_parallel"
+        finally:
+            _StopLimits.detach(self._this)
+            if reporter is not None:
+                _ProgressReporter.detach(self._this)
+        if retval == -1:
+            raise MemoryError("vector reallocation failure occurred in {}.".format(fname))
+        if reporter is not None:
+            reporter.check()
+        return self.stop_reason
+    def generate(self, nparticles, display_progress=True, checkpoint_path=None,
+                 checkpoint_every=None, threads=1, walkers=None, deterministic=False,
+                 progress=None, progress_every=None, progress_interval=0.1,
+                 max_radius=None, max_time=None, max_steps=None):
+        """Generates an aggregate consisting of `nparticles`. If the aggregate has
+        already been generated, `nparticles` further particles are added to it
+        as for `grow`.
+
+        Generation stops early, leaving a consistent aggregate of the particles
+        stuck so far which may be grown further, once any of `max_radius`,
+        `max_time` or `max_steps` is reached or when `cancel` is called from
+        another thread. The interpreter lock is released while particles are
+        generated, so that generation may run in a worker thread, e.g. with
+        `asyncio.to_thread`, alongside an event loop which calls `cancel`.
 
         Parameters
         ----------
@@ -578,19 +2090,282 @@ class Aggregate3D(object):
 
             Print progress bar to terminal.
 
+        *checkpoint_path* :: `str`, optional, default = None
+
+            Path of a checkpoint file to write, see `save`.
+
+        *checkpoint_every* :: `int`, optional, default = None
+
+            If given along with `checkpoint_path`, the aggregate is checkpointed
+            each time this many further particles have stuck, and once more at
+            the end of generation. Otherwise a `checkpoint_path` is written only
+            at the end of generation.
+
+        *threads* :: `int`, optional, default = 1
+
+            Number of threads. If greater than one, or if `walkers` is given,
+            many particles random-walk concurrently against the shared aggregate
+            and sticking events are committed one at a time with exclusive access
+            to it. Particles which find their sticking site already claimed by
+            another commit are re-spawned. The interpreter lock is released for
+            the whole call.
+
+        *walkers* :: `int`, optional, default = None
+
+            Number of concurrently random-walking particles, defaults to `threads`.
+
+        *deterministic* :: `bool`, optional, default = False
+
+            If `True`, concurrent walkers advance in lock-step and sticking events
+            are committed in order of walker index, so that the aggregate depends
+            only on the seed and number of `walkers`, independently of `threads`
+            and of scheduling. Otherwise events are committed in order of arrival,
+            which is faster but not reproducible.
+
+        *progress* :: callable, optional, default = None
+
+            Function called as `progress(count, total, radius, steps)` with the
+            number of particles stuck so far, `nparticles`, the spanning radius
+            of the aggregate and the total lattice steps taken by all of its
+            stuck particles, e.g. to forward progress to a logger. An exception
+            raised by `progress` is re-raised once generation completes.
+
+        *progress_every* :: `int`, optional, default = None
+
+            Report progress each time this many further particles have stuck.
+
+        *progress_interval* :: `float`, optional, default = 0.1
+
+            Report progress at most this many seconds apart, or `None` to report
+            only according to `progress_every`. Progress is only checked by the
+            internal (C) generator, with negligible overhead, if `display_progress`
+            or `progress` is given.
+
+        *max_radius* :: `float`, optional, default = None
+
+            Stop once the spanning radius of the aggregate, see `radius`,
+            reaches this value.
+
+        *max_time* :: `float`, optional, default = None
+
+            Stop once this many seconds of wall-clock time have elapsed.
+
+        *max_steps* :: `float`, optional, default = None
+
+            Stop once this many lattice steps have been taken by the particles
+            generated in this call. The multi-threaded engine counts only the
+            steps of particles which stuck.
+
+        Returns
+        -------
+        The `StopReason` of the condition which stopped generation.
+
         Exceptions
         ----------
         Raises `MemoryError` if a vector reallocation failure occurs.
+
+        Raises `RuntimeError` if views of the aggregate returned with `copy=False`
+        are alive, see `as_ndarray`.
         """
-        retval = LIBDRP.aggregate_3d_generate(self._handle,
-                                              c_size_t(nparticles),
-                                              c_bool(display_progress))
-        if retval == -1:
-            raise MemoryError("vector reallocation failure occurred in aggregate_3d_generate.")
-        # initialise colors for each particle in aggregate
-        self.colors = np.zeros(nparticles+self._this.att_size, dtype=(float, 3))
-        clrpr.blue_through_red(self.colors)
-    def generate_stream(self, nparticles, display_progress=False):
+        reporter = None
+        if display_progress or progress is not None:
+            reporter = _ProgressReporter(nparticles, display_progress, progress,
+                                         progress_every, progress_interval)
+        limits = _StopLimits(self._this, max_radius, max_time, max_steps)
+        if checkpoint_path is None or checkpoint_every is None:
+            reason = self._generate(nparticles, reporter, threads, walkers,
+                                    deterministic, limits)
+            if checkpoint_path is not None:
+                self.save(checkpoint_path)
+        else:
+            count = 0
+            reason = StopReason.COUNT
+            while count < nparticles:
+                reason = limits.exhausted()
+                if reason != StopReason.NONE:
+                    break
+                chunk = min(checkpoint_every, nparticles - count)
+                if reporter is not None:
+                    reporter.offset = count
+                nstuck = self._this._stats.contents.nstuck
+                reason = self._generate(chunk, reporter, threads, walkers,
+                                        deterministic, limits)
+                count += self._this._stats.contents.nstuck - nstuck
+                self.save(checkpoint_path)
+                if reason != StopReason.COUNT:
+                    break
+        if reporter is not None:
+            reporter.finish()
+        return reason
+    def grow(self, nparticles, display_progress=True, checkpoint_path=None,
+             checkpoint_every=None, threads=1, walkers=None, deterministic=False,
+             progress=None, progress_every=None, progress_interval=0.1,
+             max_radius=None, max_time=None, max_steps=None):
+        """Grows the aggregate by a further `nparticles`, continuing from its
+        current state. The attractor is seeded only if the aggregate is empty,
+        while the spawning region, random number stream and statistics of
+        previously stuck particles are all retained.
+
+        Parameters
+        ----------
+        *nparticles* :: `int`
+
+            Number of particles to add to the aggregate.
+
+        *display_progress* :: `bool`, optional, default = True
+
+            Print progress bar to terminal.
+
+        *checkpoint_path* :: `str`, optional, default = None
+
+            Path of a checkpoint file to write, see `generate`.
+
+        *checkpoint_every* :: `int`, optional, default = None
+
+            Number of particles between checkpoints, see `generate`.
+
+        *threads*, *walkers*, *deterministic* ::
+
+            Multi-threaded generation options, see `generate`.
+
+        *progress*, *progress_every*, *progress_interval* ::
+
+            Progress reporting options, see `generate`.
+
+        *max_radius*, *max_time*, *max_steps* ::
+
+            Stop conditions, see `generate`.
+
+        Returns
+        -------
+        The `StopReason` of the condition which stopped generation.
+
+        Exceptions
+        ----------
+        Raises `MemoryError` if a vector reallocation failure occurs.
+
+        Raises `RuntimeError` if views of the aggregate returned with `copy=False`
+        are alive, see `as_ndarray`.
+        """
+        return self.generate(nparticles, display_progress, checkpoint_path,
+                             checkpoint_every, threads, walkers, deterministic, progress,
+                             progress_every, progress_interval, max_radius, max_time,
+                             max_steps)
+    def extend_to(self, nparticles, display_progress=True, checkpoint_path=None,
+                  checkpoint_every=None, threads=1, walkers=None, deterministic=False,
+                  progress=None, progress_every=None, progress_interval=0.1,
+                  max_radius=None, max_time=None, max_steps=None):
+        """Grows the aggregate, continuing from its current state, until it holds
+        `nparticles` particles in addition to the attractor seed. Does nothing
+        if the aggregate already holds at least this many particles. Combined
+        with `load`, this resumes an interrupted, checkpointed generation.
+
+        Parameters
+        ----------
+        *nparticles* :: `int`
+
+            Number of particles, excluding the attractor, to grow to.
+
+        *display_progress* :: `bool`, optional, default = True
+
+            Print progress bar to terminal.
+
+        *checkpoint_path* :: `str`, optional, default = None
+
+            Path of a checkpoint file to write, see `generate`.
+
+        *checkpoint_every* :: `int`, optional, default = None
+
+            Number of particles between checkpoints, see `generate`.
+
+        *threads*, *walkers*, *deterministic* ::
+
+            Multi-threaded generation options, see `generate`.
+
+        *progress*, *progress_every*, *progress_interval* ::
+
+            Progress reporting options, see `generate`.
+
+        *max_radius*, *max_time*, *max_steps* ::
+
+            Stop conditions, see `generate`.
+
+        Returns
+        -------
+        The `StopReason` of the condition which stopped generation, `COUNT` if
+        the aggregate already held `nparticles`.
+
+        Exceptions
+        ----------
+        Raises `MemoryError` if a vector reallocation failure occurs.
+
+        Raises `RuntimeError` if views of the aggregate returned with `copy=False`
+        are alive, see `as_ndarray`.
+        """
+        # counted from the co-ordinates, as statistics may not be recorded
+        nstuck = (LIBDRP.vector_size(self._this._aggregate) -
+                  LIBDRP.vector_size(self._this._attractor))
+        if nparticles <= nstuck:
+            return StopReason.COUNT
+        return self.grow(nparticles - nstuck, display_progress, checkpoint_path,
+                         checkpoint_every, threads, walkers, deterministic, progress,
+                         progress_every, progress_interval, max_radius, max_time,
+                         max_steps)
+    def cancel(self):
+        """Requests that generation of the aggregate stops as soon as possible,
+        with the particles stuck so far, and returns immediately. Safe to call
+        from any thread while `generate` runs in another. A request made while
+        no generation is running stops the next generation before any particle
+        is added.
+        """
+        LIBDRP.aggregate_cancel(self._handle)
+    @property
+    def stop_reason(self):
+        """Returns the condition which stopped the most recent generation.
+
+        Returns
+        -------
+        A `StopReason`.
+        """
+        return StopReason(self._this.stop.reason)
+    def save(self, path):
+        """Writes the full state of the aggregate - particle co-ordinates, statistics,
+        all generation parameters and the random number generator state - to a
+        compact, versioned binary checkpoint file.
+
+        Parameters
+        ----------
+        *path* :: `str`
+
+            Path of the checkpoint file.
+        """
+        from droplet import checkpoint
+        checkpoint.save(self, path)
+    @classmethod
+    def load(cls, path):
+        """Restores an aggregate from a checkpoint file written by `save`. The
+        restored aggregate continues generation exactly where it was saved.
+
+        Parameters
+        ----------
+        *path* :: `str`
+
+            Path of the checkpoint file.
+
+        Returns
+        -------
+        The restored aggregate.
+
+        Exceptions
+        ----------
+        Raises `ValueError` if `path` is not a checkpoint of this aggregate type,
+        or is truncated.
+
+        Raises `MemoryError` if a vector allocation failure occurs.
+        """
+        from droplet import checkpoint
+        return checkpoint.load(cls, path)
+    def generate_stream(self, nparticles, display_progress=False, batch=1):
         """Generator function for streaming aggregate data to a real-time plot.
 
         Parameters
@@ -603,12 +2378,24 @@ class Aggregate3D(object):
 
             Print progress bar to terminal.
 
+        *batch* :: `int`, optional, default = 1
+
+            Number of particles stuck to the aggregate, entirely within the
+            C library, between successive yields.
+
+        Yields
+        ------
+        A tuple of the aggregate co-ordinates, the particle colors and the
+        number of particles generated so far.
+
         Exceptions
         ----------
         Raises `MemoryError` if a vector reallocation failure occurs.
+
+        Raises `RuntimeError` if views of the aggregate returned with `copy=False`
+        are alive, see `as_ndarray`.
         """
-        LIBDRP.aggregate_3d_lattice_collision.restype = c_bool
-        LIBDRP.aggregate_3d_collision.restype = c_bool
+        _check_views(self)
         rv_res = LIBDRP.aggregate_reserve(self._handle, c_size_t(nparticles))
         if rv_res == -1:
             raise MemoryError("vector reallocation failure occurred in aggregate_reserve.")
@@ -616,44 +2403,77 @@ class Aggregate3D(object):
         if rv_ia == -1:
             raise MemoryError("""vector reallocation failure occurred in
             aggregate_3d_init_attractor.""")
-        self.__aggregate = np.zeros((nparticles + self._this.att_size, 3), dtype=int)
-        # initialise colors for each particle in aggregate
-        self.colors = np.zeros(2*(nparticles+self._this.att_size), dtype=(float, 3))
-        clrpr.blue_through_red(self.colors)
-        curr = _IntTriplet()
-        prev = _IntTriplet()
-        has_next_spawned = False
-        rsteps = c_size_t(0)
-        bcolls = c_size_t(0)
+        self._colors = None
+        start = self.size
+        self.__aggregate = np.zeros((start + nparticles, 3), dtype=int)
+        self.__aggregate[:start] = self.as_ndarray(copy=False)
+        # the stick order gradient spans the final size, other colorings are
+        # recomputed as the aggregate grows
+        order = self.color_by == clrpr.ColorBy.STICK_ORDER
+        if order:
+            colors = clrpr.particle_colors(self, self.color_profile, self.color_by,
+                                           total=start + nparticles)
+        nstuck = c_size_t(0)
         count = 0
         if display_progress:
             pbar = pb.ProgressBar(maxval=nparticles).start()
         while count < nparticles:
-            if not has_next_spawned:
-                LIBDRP.aggregate_3d_spawn_bp(self._handle, byref(curr))
-                has_next_spawned = True
-            prev.x = curr.x
-            prev.y = curr.y
-            prev.z = curr.z
-            LIBDRP.aggregate_3d_update_bp(self._handle, byref(curr))
-            if LIBDRP.aggregate_3d_lattice_collision(self._handle, byref(curr), byref(prev)):
-                bcolls = c_size_t(bcolls.value + 1)
-            rsteps = c_size_t(rsteps.value + 1)
-            if LIBDRP.aggregate_3d_collision(self._handle, byref(curr), byref(prev)):
-                addr_rec = LIBDRP.vector_at(self._this._aggregate,
-                                            c_size_t(count + self._this.att_size))
-                aggp_rec = cast(addr_rec, _INTTRIPLET_PTR_T).contents
-                self.__aggregate[count+self._this.att_size][0] = aggp_rec.x
-                self.__aggregate[count+self._this.att_size][1] = aggp_rec.y
-                self.__aggregate[count+self._this.att_size][2] = aggp_rec.z
-                LIBDRP.vector_push_back(self._this._rsteps, byref(rsteps), sizeof(c_size_t))
-                LIBDRP.vector_push_back(self._this._bcolls, byref(bcolls), sizeof(c_size_t))
-                rsteps = c_size_t(0)
-                bcolls = c_size_t(0)
-                count += 1
-                has_next_spawned = False
-                if display_progress:
-                    pbar.update(count)
-                yield self.__aggregate, self.colors, count
+            _check_views(self)
+            retval = LIBDRP.aggregate_3d_advance(self._handle,
+                                                c_size_t(min(batch, nparticles - count)),
+                                                c_size_t(0), byref(nstuck))
+            if retval == -1:
+                raise MemoryError("vector reallocation failure occurred in aggregate_3d_advance.")
+            size = start + count + nstuck.value
+            self.__aggregate[start+count:size] = self.as_ndarray(copy=False)[start+count:size]
+            count += nstuck.value
+            if display_progress:
+                pbar.update(count)
+            yield self.__aggregate, (colors if order else self.colors), count
         if display_progress:
             pbar.finish()
+    def agenerate_stream(self, nparticles, batch=1, maxsize=4, executor=None):
+        """Asynchronous generator function streaming the growth of the aggregate
+        to an event loop, e.g. `async for coords, count in agg.agenerate_stream(n)`.
+        Particles are generated in `executor`, with the interpreter lock released,
+        so that the event loop keeps serving other tasks. Generation runs at
+        most `maxsize` batches ahead of the consumer, pausing until a slow
+        consumer catches up, and stops once the generator is closed, e.g. by
+        `contextlib.aclosing` on breaking out of iteration. The aggregate must
+        not be otherwise accessed until iteration ends.
+
+        Parameters
+        ----------
+        *nparticles* :: `int`
+
+            Number of particles to add to the aggregate.
+
+        *batch* :: `int`, optional, default = 1
+
+            Number of particles stuck to the aggregate, entirely within the
+            C library, between successive yields.
+
+        *maxsize* :: `int`, optional, default = 4
+
+            Number of generated batches held for the consumer before generation
+            pauses.
+
+        *executor* :: `concurrent.futures.Executor`, optional, default = None
+
+            Executor running the generation, the default executor of the event
+            loop if `None`. Must be a thread pool, as the aggregate is shared.
+
+        Yields
+        ------
+        A tuple of the co-ordinates of the newly stuck particles, an array of
+        `shape=(k, 3)` with `k` at most `batch`, and the number of particles
+        generated so far.
+
+        Exceptions
+        ----------
+        Raises `MemoryError` if a vector reallocation failure occurs.
+
+        Raises `RuntimeError` if views of the aggregate returned with `copy=False`
+        are alive, see `as_ndarray`.
+        """
+        return _stream_batches(self, 3, nparticles, batch, maxsize, executor)
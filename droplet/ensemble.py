@@ -0,0 +1,300 @@
+"""Parallel generation of ensembles of independent aggregates.
+
+Each configuration of an ensemble is generated in a separate worker process
+of a `concurrent.futures.ProcessPoolExecutor`. Workers write the particle
+co-ordinates, unless discarded, and per-particle statistics of their aggregate into a block of
+shared memory, so that only a short description of the block (rather than
+the pickled arrays) is sent back to the parent process.
+"""
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+import droplet.dla as dla
+
+_ALIGNMENT = 8
+_PARAM_KEYS = ('dims', 'stickiness', 'lattice_type', 'attractor_type',
+              'spawn_type', 'engine')
+
+class EnsembleResult(object):
+    """A single generated member of an ensemble.
+
+    Attributes
+    ----------
+    *config* :: `dict`
+
+        Configuration the aggregate was generated with, including the seed.
+
+    *coordinates* :: `np.ndarray` or `None`
+
+        Particle co-ordinates with `shape=(n, dims)`, `None` if co-ordinates
+        were not kept.
+
+    *required_steps* :: `np.ndarray`
+
+        Number of lattice steps each particle required before sticking.
+
+    *boundary_collisions* :: `np.ndarray`
+
+        Number of boundary collisions each particle made before sticking.
+
+    *radius* :: `float`
+
+        Spanning radius of the aggregate.
+
+    *size* :: `int`
+
+        Number of particles in the aggregate, including the attractor.
+
+    *fractal_dimension* :: `float`
+
+        Fractal dimension of the aggregate.
+    """
+    def __init__(self, config, coordinates, required_steps, boundary_collisions,
+                 radius, size):
+        self.config = config
+        self.coordinates = coordinates
+        self.required_steps = required_steps
+        self.boundary_collisions = boundary_collisions
+        self.radius = radius
+        self.size = size
+        self.fractal_dimension = np.log(size)/np.log(radius)
+
+def sweep(stickiness=(1.0,), lattice_types=(dla.LatticeType.SQUARE,),
+          attractor_types=(dla.AttractorType.POINT,), dims=2, nseeds=1, **kwargs):
+    """Constructs the configurations of a parameter sweep, the Cartesian product
+    of the given parameter values repeated for `nseeds` independent seeds.
+
+    Parameters
+    ----------
+    *stickiness* :: iterable of `float`, optional, default = (1.0,)
+
+        Stickiness values to sweep over.
+
+    *lattice_types* :: iterable of `LatticeType`, optional, default = (LatticeType.SQUARE,)
+
+        Lattice types to sweep over.
+
+    *attractor_types* :: iterable of `AttractorType`, optional, default = (AttractorType.POINT,)
+
+        Attractor types to sweep over.
+
+    *dims* :: `int`, optional, default = 2
+
+        Dimensionality of the aggregates, 2 or 3.
+
+    *nseeds* :: `int`, optional, default = 1
+
+        Number of independently seeded repeats of each parameter combination.
+
+    *kwargs* ::
+
+        Further keyword arguments common to every configuration, e.g.
+        `spawn_type` or `engine`.
+
+    Returns
+    -------
+    A list of configuration `dict` instances to pass to `run`.
+    """
+    configs = []
+    for stk, ltt, att in itertools.product(stickiness, lattice_types, attractor_types):
+        for _ in range(nseeds):
+            config = dict(kwargs, dims=dims, stickiness=stk, lattice_type=ltt,
+                          attractor_type=att)
+            configs.append(config)
+    return configs
+
+def _seeded(configs, seed):
+    """Returns copies of `configs` in which every configuration without an
+    explicit seed is assigned an independent seed spawned from `seed`."""
+    seeds = np.random.SeedSequence(seed).spawn(len(configs))
+    ret = []
+    for config, seq in zip(configs, seeds):
+        config = dict(config)
+        if config.get('seed') is None:
+            config['seed'] = int(seq.generate_state(1, np.uint64)[0])
+        ret.append(config)
+    return ret
+
+def _create_block(size):
+    """Creates a shared memory block of `size` bytes which is not tracked by
+    the calling worker process, as ownership of the block passes to the parent
+    process which unlinks it."""
+    try:
+        return shared_memory.SharedMemory(create=True, size=size, track=False)
+    except TypeError: # `track` was added in Python 3.13
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        if os.name == 'posix': # blocks are tracked by their POSIX name
+            resource_tracker.unregister('/' + shm.name, 'shared_memory')
+        return shm
+
+def _release(name):
+    """Unlinks the shared memory block of a worker result which is discarded."""
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+def _generate(config, nparticles, keep_coordinates):
+    """Generates a single aggregate in a worker process, copying its arrays into
+    a new shared memory block, leaving out the co-ordinates unless
+    `keep_coordinates`. Returns the name of the block along with the layout and
+    scalar properties required to reconstruct the result."""
+    kwargs = dict((key, value) for key, value in config.items()
+                  if key not in ('dims',))
+    cls = dla.Aggregate3D if config.get('dims', 2) == 3 else dla.Aggregate2D
+    agg = cls(**kwargs)
+    agg.generate(nparticles, display_progress=False)
+    arrays = (agg.required_steps_as_ndarray(copy=False),
+              agg.boundary_collisions_as_ndarray(copy=False))
+    if keep_coordinates:
+        arrays = (agg.as_ndarray(copy=False),) + arrays
+    layout = []
+    offset = 0
+    for arr in arrays:
+        layout.append((offset, arr.shape, arr.dtype.str))
+        offset += arr.nbytes + (-arr.nbytes % _ALIGNMENT)
+    shm = _create_block(max(offset, 1))
+    for arr, (offset, shape, dtype) in zip(arrays, layout):
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)[...] = arr
+    name = shm.name
+    shm.close()
+    return name, layout, agg.radius, agg.size
+
+def _collect(config, name, layout, radius, size, keep_coordinates):
+    """Copies the arrays of a worker result out of its shared memory block,
+    releasing the block, and constructs the corresponding `EnsembleResult`."""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        arrays = [np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset).copy()
+                  for offset, shape, dtype in layout]
+    finally:
+        shm.close()
+        shm.unlink()
+    coords = arrays.pop(0) if keep_coordinates else None
+    return EnsembleResult(config, coords, arrays[0], arrays[1], radius, size)
+
+def imap(configs, nparticles, max_workers=None, seed=None, keep_coordinates=True):
+    """Generates an aggregate of `nparticles` for each configuration in parallel,
+    yielding results as soon as they complete.
+
+    Parameters
+    ----------
+    *configs* :: iterable of `dict`
+
+        Configurations of the aggregates, each holding keyword arguments of the
+        aggregate constructor along with `dims` (2 or 3), see `sweep`.
+
+    *nparticles* :: `int`
+
+        Number of particles to generate in each aggregate.
+
+    *max_workers* :: `int`, optional, default = None
+
+        Maximum number of worker processes, defaults to the number of processors.
+
+    *seed* :: `int`, optional, default = None
+
+        Root seed from which independent seeds are spawned for configurations
+        without an explicit `seed`. If `None` the ensemble is not reproducible.
+
+    *keep_coordinates* :: `bool`, optional, default = True
+
+        If `False`, particle co-ordinates are discarded as results arrive and
+        only the statistics are kept.
+
+    Returns
+    -------
+    A generator of `EnsembleResult` instances in order of completion.
+    """
+    for _, result in _imap(configs, nparticles, max_workers, seed, keep_coordinates):
+        yield result
+
+def _imap(configs, nparticles, max_workers, seed, keep_coordinates):
+    """Implementation of `imap`, yielding each result along with the index of
+    its configuration."""
+    configs = _seeded(list(configs), seed)
+    futures = {}
+    collected = set()
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                for idx, config in enumerate(configs):
+                    futures[executor.submit(_generate, config, nparticles,
+                                            keep_coordinates)] = idx
+                for future in as_completed(futures):
+                    idx = futures[future]
+                    collected.add(future)
+                    yield idx, _collect(configs[idx], *future.result(),
+                                        keep_coordinates=keep_coordinates)
+            finally:
+                # on early exit, or failure of any worker, discard pending work
+                for future in futures:
+                    future.cancel()
+    finally:
+        # the executor has shut down, so every future not cancelled is done,
+        # release the blocks of those results which were never collected
+        for future in futures:
+            if (future not in collected and not future.cancelled() and
+                    future.exception() is None):
+                _release(future.result()[0])
+
+def run(configs, nparticles, max_workers=None, seed=None, keep_coordinates=True):
+    """Generates an aggregate of `nparticles` for each configuration in parallel.
+
+    Parameters
+    ----------
+    See `imap`.
+
+    Returns
+    -------
+    A list of `EnsembleResult` instances in the order of `configs`.
+    """
+    configs = list(configs)
+    results = [None]*len(configs)
+    for idx, result in _imap(configs, nparticles, max_workers, seed, keep_coordinates):
+        results[idx] = result
+    return results
+
+def summarize(results):
+    """Aggregates the statistics of ensemble results over the seeds of each
+    parameter combination.
+
+    Parameters
+    ----------
+    *results* :: iterable of `EnsembleResult`
+
+        Results of an ensemble, see `run`.
+
+    Returns
+    -------
+    A `dict` mapping each parameter combination, a tuple of
+    `(dims, stickiness, lattice_type, attractor_type, spawn_type, engine)`, to
+    a `dict` of statistics: the number of members `count`, and the mean and
+    standard error of `fractal_dimension`, `radius` and `mean_steps` (the mean
+    number of steps required per particle) keyed as e.g. `fractal_dimension`
+    and `fractal_dimension_err`.
+    """
+    groups = {}
+    for result in results:
+        key = tuple(result.config.get(k) for k in _PARAM_KEYS)
+        groups.setdefault(key, []).append(result)
+    summary = {}
+    for key, members in groups.items():
+        stats = {'count' : len(members)}
+        values = {
+            'fractal_dimension' : [m.fractal_dimension for m in members],
+            'radius' : [m.radius for m in members],
+            'mean_steps' : [np.mean(m.required_steps) if len(m.required_steps) else 0.0
+                            for m in members]
+        }
+        for name, vals in values.items():
+            vals = np.asarray(vals, dtype=float)
+            stats[name] = float(vals.mean())
+            stats[name + '_err'] = (float(vals.std(ddof=1)/np.sqrt(len(vals)))
+                                    if len(vals) > 1 else 0.0)
+        summary[key] = stats
+    return summary
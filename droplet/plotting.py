@@ -140,3 +140,156 @@ def plot_aggregate(aggregate, prad=2, edgecolors='none', alpha=1.0,
                                 edgecolors=edgecolors,
                                 alpha=alpha,
                                 scalefactor=scalefactor)
+
+def _raster_colors(aggregate, coords, colors):
+    """Returns the particle colors used for rasterising, an array of
+    `shape=(n, 3)`, defaulting to the colors of the aggregate or to black."""
+    if colors is None:
+        colors = getattr(aggregate, 'colors', None)
+    colors = np.asarray(colors if colors is not None else 0.0, dtype=float)
+    if colors.ndim != 2 or len(colors) != len(coords):
+        colors = np.zeros((len(coords), 3))
+    return colors[:, :3]
+
+def rasterize_aggregate(aggregate, lod=None, max_size=4096, colors=None,
+                        background=(1.0, 1.0, 1.0), projection='depth', axis=2,
+                        bounds=None):
+    """Renders a Diffusion Limited Aggregate directly into an RGB image array,
+    without creating a matplotlib artist per particle. Each pixel covers a
+    square of `lod` lattice sites per side, such that multi-million particle
+    aggregates are rendered in a few vectorized passes.
+
+    Two-dimensional aggregates are rendered as an occupancy image, each pixel
+    taking the mean color of the particles within it. Three-dimensional
+    aggregates are rendered as an orthographic projection along `axis`, either
+    depth-shaded (the particle nearest the viewer, darkened with distance) or
+    as a maximum intensity projection of the particle colors.
+
+    Parameters
+    ----------
+    *aggregate* :: `droplet.Aggregate2D`, `droplet.Aggregate3D` or `np.ndarray`
+
+        The aggregate, or particle co-ordinates, to render.
+
+    *lod* :: `int`, optional, default = None
+
+        Level of detail, the number of lattice sites per pixel side. Defaults
+        to the smallest level such that neither side exceeds `max_size`.
+
+    *max_size* :: `int`, optional, default = 4096
+
+        Maximum number of pixels per side when `lod` is not given.
+
+    *colors* :: array-like, optional, default = None
+
+        Colors of the particles with `shape=(n, 3)`, defaults to the colors of
+        the aggregate.
+
+    *background* :: `color`, optional, default = (1.0, 1.0, 1.0)
+
+        RGB color of empty pixels.
+
+    *projection* :: `str`, optional, default = 'depth'
+
+        Projection of three-dimensional aggregates, `'depth'` or `'max'`.
+
+    *axis* :: `int`, optional, default = 2
+
+        Viewing axis of three-dimensional aggregates, the image is rendered as
+        seen from the positive end of this axis.
+
+    *bounds* :: tuple, optional, default = None
+
+        Lower and upper (inclusive) co-ordinates `(lo, hi)` of the rendered
+        region in the image plane, each a scalar or a pair. Particles outside
+        the region are dropped. Defaults to the extent of the aggregate.
+
+    Returns
+    -------
+    An image array of `shape=(height, width, 3)` with row zero at the bottom,
+    i.e. the minimum y co-ordinate, of the rendered region.
+
+    Exceptions
+    ----------
+    Raises `ValueError` if `projection` or `axis` is invalid.
+    """
+    if hasattr(aggregate, 'as_ndarray'):
+        coords = aggregate.as_ndarray(copy=False)
+    else:
+        coords = np.asarray(aggregate)
+    colors = _raster_colors(aggregate, coords, colors)
+    dims = coords.shape[1]
+    if dims == 3:
+        if axis not in (0, 1, 2):
+            raise ValueError("axis must be 0, 1 or 2.")
+        if projection not in ('depth', 'max'):
+            raise ValueError("projection must be 'depth' or 'max'.")
+        plane = [ax for ax in range(3) if ax != axis]
+        depth = coords[:, axis].astype(float)
+        coords = coords[:, plane]
+    if bounds is None:
+        lo = coords.min(axis=0)
+        extent = coords.max(axis=0) - lo + 1
+    else:
+        lo = np.broadcast_to(np.asarray(bounds[0], dtype=np.intp), (2,))
+        extent = np.broadcast_to(np.asarray(bounds[1], dtype=np.intp), (2,)) - lo + 1
+        inside = np.all((coords >= lo) & (coords < lo + extent), axis=1)
+        coords, colors = coords[inside], colors[inside]
+        if dims == 3:
+            depth = depth[inside]
+    offsets = (coords - lo).astype(np.intp)
+    if lod is None:
+        lod = max(1, -(-int(extent.max())//max_size))
+    lod = max(int(lod), 1)
+    width, height = (int(n) for n in -(-extent//lod))
+    pixels = (offsets[:, 1]//lod)*width + offsets[:, 0]//lod
+    npixels = width*height
+    image = np.empty((npixels, 3))
+    image[:] = background
+    if dims == 2 or projection == 'max':
+        if dims == 2:
+            counts = np.bincount(pixels, minlength=npixels)
+            filled = counts > 0
+            for c in range(3):
+                image[filled, c] = np.bincount(pixels, weights=colors[:, c],
+                                               minlength=npixels)[filled]/counts[filled]
+        else:
+            filled = np.bincount(pixels, minlength=npixels) > 0
+            image[filled] = 0.0
+            for c in range(3):
+                np.maximum.at(image[:, c], pixels, colors[:, c])
+    else:
+        # keep the particle nearest the viewer in each pixel, shaded by depth
+        nearest = np.full(npixels, -np.inf)
+        np.maximum.at(nearest, pixels, depth)
+        front = depth == nearest[pixels]
+        span = depth.max() - depth.min() if len(depth) else 0.0
+        shade = 1.0 - 0.7*(depth.max() - depth[front])/span if span else 1.0
+        image[pixels[front]] = colors[front]*np.reshape(shade, (-1, 1))
+    return image.reshape(height, width, 3)
+
+def save_aggregate_image(aggregate, path, **kwargs):
+    """Renders a Diffusion Limited Aggregate with `rasterize_aggregate` and
+    writes the image to a file, e.g. a PNG, via `matplotlib.pyplot.imsave`.
+
+    Parameters
+    ----------
+    *aggregate* :: `droplet.Aggregate2D`, `droplet.Aggregate3D` or `np.ndarray`
+
+        The aggregate, or particle co-ordinates, to render.
+
+    *path* :: `str`
+
+        Path of the image file, the format is deduced from its extension.
+
+    *kwargs* ::
+
+        Keyword arguments of `rasterize_aggregate`.
+
+    Returns
+    -------
+    The rendered image array.
+    """
+    image = rasterize_aggregate(aggregate, **kwargs)
+    plt.imsave(path, np.clip(image, 0.0, 1.0), origin='lower')
+    return image
@@ -2,15 +2,65 @@ import numpy as np
 from mpl_toolkits.mplot3d import Axes3D
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from droplet.dla import Aggregate2D
 from droplet.dla import Aggregate3D
+from droplet.plotting import rasterize_aggregate
+
+def _frame_batch(nparticles, particles_per_frame, frames):
+    """Returns the number of particles generated per frame and the resulting
+    number of frames, given either a batch size or a target frame count."""
+    if particles_per_frame is None:
+        particles_per_frame = -(-nparticles//frames) if frames else 1
+    particles_per_frame = max(int(particles_per_frame), 1)
+    return particles_per_frame, -(-nparticles//particles_per_frame)
+
+def _filled(agg, nparticles, count):
+    """Returns the number of filled rows of the co-ordinates yielded by a stream
+    of `nparticles`, which hold the attractor and any earlier particles ahead
+    of the `count` particles generated so far."""
+    return len(agg) - nparticles + count
+
+def _save_raster(stream, nparticles, filename, writer, axlims, frame_size, fps,
+                 **kwargs):
+    """Renders each batch of an aggregate stream off-screen as a raster image
+    of the square region `[-axlims, axlims]` and streams the frames to an
+    animation writer. A single, non-pyplot, figure holding one image is used
+    for every frame and is released once the movie has been written."""
+    bounds = (-int(axlims), int(axlims))
+    lod = max(1, -(-(2*int(axlims) + 1)//frame_size))
+    def render(agg, col, count):
+        filled = _filled(agg, nparticles, count)
+        image = rasterize_aggregate(agg[:filled], colors=col[:filled], lod=lod,
+                                    bounds=bounds, **kwargs)
+        return np.clip(image, 0.0, 1.0)
+    first = next(stream, None)
+    if first is None:
+        return
+    image = render(*first)
+    dpi = 100
+    fig = Figure(figsize=(image.shape[1]/dpi, image.shape[0]/dpi), dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_axis_off()
+    frame = ax.imshow(image, origin='lower', interpolation='nearest')
+    if isinstance(writer, str):
+        writer = animation.writers[writer](fps=fps)
+    with writer.saving(fig, filename, dpi):
+        writer.grab_frame()
+        for args in stream:
+            frame.set_data(render(*args))
+            writer.grab_frame()
 
 class RealTimeAggregate2D(object):
     """A real-time scatter plot of a two-dimensional Diffusion Limited
     Aggregate rendered using `matplotlib.animation.FuncAnimation`.
     """
     def __init__(self, aggregate, nparticles, blitting=True, save=False,
-                 filename=None, writer='imagemagick', prad=2):
+                 filename=None, writer='imagemagick', prad=2,
+                 particles_per_frame=None, frames=None, raster=False,
+                 frame_size=512, fps=20):
         """Creates a `RealTimeAggregate2D` instance from an existing
         `DiffusionLimitedAggregate2D` object.
 
@@ -27,23 +77,38 @@ class RealTimeAggregate2D(object):
         filename -- Name, and extension, of file to write to if `save == True`.
         writer -- Type of writer to user for saving if `save == True`, defaults
         to `imagemagick`.
+        particles_per_frame -- Number of particles generated between frames,
+        defaults to one unless `frames` is given.
+        frames -- Target number of frames, used to determine the number of
+        particles per frame if `particles_per_frame` is not given.
+        raster -- If `True` and `save == True`, renders frames off-screen as raster
+        images rather than matplotlib scatter plots, see
+        `droplet.plotting.rasterize_aggregate`.
+        frame_size -- Maximum number of pixels per side of raster frames.
+        fps -- Frame rate of raster movies.
         """
         assert isinstance(aggregate, Aggregate2D)
         self.numparticles = nparticles
         self.prad = prad
-        self.stream = aggregate.generate_stream(nparticles)
+        batch, nframes = _frame_batch(nparticles, particles_per_frame, frames)
+        self.stream = aggregate.generate_stream(nparticles, batch=batch)
+        if save and raster:
+            axlims = max(nparticles/10, 30)
+            _save_raster(self.stream, nparticles, filename, writer, axlims, frame_size, fps)
+            return
         self.fig, self.ax = plt.subplots()
         if save:
             agg, col, count = next(self.stream)
+            filled = _filled(agg, self.numparticles, count)
             area = np.pi*(self.prad*self.prad)
-            self.scat = self.ax.scatter(agg[:count, 0], agg[:count, 1],
-                                        c=col, s=area, animated=True)
+            self.scat = self.ax.scatter(agg[:filled, 0], agg[:filled, 1],
+                                        c=col[:filled], s=area, animated=True)
             axlims = nparticles/10
             if axlims < 30:
                 axlims = 30
             self.ax.axis([-axlims, axlims, -axlims, axlims])
             self.sim = animation.FuncAnimation(self.fig, self.update_plot, interval=50,
-                                               blit=False, frames=nparticles)
+                                               blit=False, frames=nframes)
             self.sim.save(filename, writer)
         else:
             self.scat = None
@@ -61,9 +126,10 @@ class RealTimeAggregate2D(object):
         """
         try:
             agg, col, count = next(self.stream)
+            filled = _filled(agg, self.numparticles, count)
             area = np.pi*(self.prad*self.prad)
-            self.scat = self.ax.scatter(agg[:count, 0], agg[:count, 1],
-                                        c=col, s=area, animated=True)
+            self.scat = self.ax.scatter(agg[:filled, 0], agg[:filled, 1],
+                                        c=col[:filled], s=area, animated=True)
             axlims = self.numparticles/20
             if axlims < 30:
                 axlims = 30
@@ -82,8 +148,9 @@ class RealTimeAggregate2D(object):
         """
         try:
             agg, col, count = next(self.stream)
-            data = np.hstack((agg[:count, np.newaxis], agg[:count, np.newaxis]))
-            self.scat.set_offsets(data)
+            filled = _filled(agg, self.numparticles, count)
+            self.scat.set_offsets(agg[:filled])
+            self.scat.set_facecolor(col[:filled])
         except StopIteration:
             pass
         finally:
@@ -94,7 +161,9 @@ class RealTimeAggregate3D(object):
     Aggregate rendered using `matplotlib.animation.FuncAnimation`.
     """
     def __init__(self, aggregate, nparticles, blitting=True, save=False,
-                 filename=None, writer='imagemagick', prad=2, autorotate=False):
+                 filename=None, writer='imagemagick', prad=2, autorotate=False,
+                 particles_per_frame=None, frames=None, raster=False,
+                 frame_size=512, fps=20, projection='depth'):
         """Creates a `RealTimeAggregate3D` instance from an existing
         `DiffusionLimitedAggregate3D` object.
 
@@ -110,20 +179,37 @@ class RealTimeAggregate3D(object):
         in real-time to the screen.
         filename -- Name, and extension, of file to write to if `save == True`.
         writer -- Type of writer to use for saving, defaults to `imagemagick`.
+        particles_per_frame -- Number of particles generated between frames,
+        defaults to one unless `frames` is given.
+        frames -- Target number of frames, used to determine the number of
+        particles per frame if `particles_per_frame` is not given.
+        raster -- If `True` and `save == True`, renders frames off-screen as raster
+        projections rather than matplotlib scatter plots, see
+        `droplet.plotting.rasterize_aggregate`.
+        frame_size -- Maximum number of pixels per side of raster frames.
+        fps -- Frame rate of raster movies.
+        projection -- Projection of raster frames, `'depth'` or `'max'`.
         """
         assert isinstance(aggregate, Aggregate3D)
         self.numparticles = nparticles
         self.prad = prad
         self.angle = 0
         self.autorotate = autorotate
-        self.stream = aggregate.generate_stream(nparticles)
+        batch, nframes = _frame_batch(nparticles, particles_per_frame, frames)
+        self.stream = aggregate.generate_stream(nparticles, batch=batch)
+        if save and raster:
+            axlims = max(nparticles/25, 10)
+            _save_raster(self.stream, nparticles, filename, writer, axlims, frame_size, fps,
+                         projection=projection)
+            return
         self.fig = plt.figure()
         self.ax = self.fig.add_subplot(111, projection='3d')
         if save:
             agg, col, count = next(self.stream)
+            filled = _filled(agg, self.numparticles, count)
             area = np.pi*(self.prad*self.prad)
-            self.scat = self.ax.scatter(agg[:count, 0], agg[:count, 1], agg[:count, 2],
-                                        c=col, s=area, animated=True)
+            self.scat = self.ax.scatter(agg[:filled, 0], agg[:filled, 1], agg[:filled, 2],
+                                        c=col[:filled], s=area, animated=True)
             axlims = self.numparticles/25
             if axlims < 10:
                 axlims = 10
@@ -131,7 +217,7 @@ class RealTimeAggregate3D(object):
             self.ax.set_ylim(-axlims, axlims)
             self.ax.set_zlim(-axlims, axlims)
             self.sim = animation.FuncAnimation(self.fig, self.update_plot, interval=50,
-                                               blit=False, frames=nparticles)
+                                               blit=False, frames=nframes)
             self.sim.save(filename, writer)
         else:
             self.scat = None
@@ -148,9 +234,10 @@ class RealTimeAggregate3D(object):
         """
         try:
             agg, col, count = next(self.stream)
+            filled = _filled(agg, self.numparticles, count)
             area = np.pi*(self.prad*self.prad)
-            self.scat = self.ax.scatter(agg[:count, 0], agg[:count, 1], agg[:count, 2],
-                                        c=col, s=area, animated=True)
+            self.scat = self.ax.scatter(agg[:filled, 0], agg[:filled, 1], agg[:filled, 2],
+                                        c=col[:filled], s=area, animated=True)
             axlims = self.numparticles/25
             if axlims < 10:
                 axlims = 10
@@ -171,8 +258,9 @@ class RealTimeAggregate3D(object):
         """
         try:
             agg, col, count = next(self.stream)
-            self.scat._offsets3d = (agg[:count, 0], agg[:count, 1], agg[:count, 2])
-            self.scat.set_facecolor(col)
+            filled = _filled(agg, self.numparticles, count)
+            self.scat._offsets3d = (agg[:filled, 0], agg[:filled, 1], agg[:filled, 2])
+            self.scat.set_facecolor(col[:filled])
             if self.autorotate:
                 self.angle = (self.angle + 2)%360
                 self.ax.view_init(30+self.angle, self.angle)
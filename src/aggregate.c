@@ -1,6 +1,105 @@
 #include "aggregate.h"
 
-static inline double prand() { return (double)rand()/(double)RAND_MAX; }
+static inline double prand(struct aggregate* agg) { return rng_uniform(&agg->rng); }
+
+/**
+ * \brief Mean squared length of a single lattice step for each lattice type,
+ *        indexed as `[dims - 2][lt]`. Used to convert a jump of radius `d` into
+ *        the equivalent number of lattice steps, `d*d/msl`.
+ */
+static const double mean_sqd_step[2][2] = {{1.0, 10.0/6.0}, {1.0, 1.5}};
+
+/**
+ * \brief Lattice offsets of a single random-walk step for each dimension and
+ *        lattice type. A step is drawn as an index into these tables.
+ */
+static const int moves_2d_square[4][2] = {{1, 0}, {-1, 0}, {0, 1}, {0, -1}};
+static const int moves_2d_triangle[6][2] = {
+    {1, 0}, {-1, 0}, {1, 1}, {1, -1}, {-1, 1}, {-1, -1}
+};
+static const int moves_3d_square[6][3] = {
+    {1, 0, 0}, {-1, 0, 0}, {0, 1, 0}, {0, -1, 0}, {0, 0, 1}, {0, 0, -1}
+};
+static const int moves_3d_triangle[8][3] = {
+    {1, 1, 0}, {1, -1, 0}, {-1, -1, 0}, {-1, 1, 0},
+    {1, 0, 0}, {-1, 0, 0}, {0, 0, 1}, {0, 0, -1}
+};
+
+/**
+ * \brief Radius of the circle/sphere on which particles are launched under
+ *        `LAUNCH` spawning, lying just outside of the aggregate.
+ */
+static inline double launch_radius(const struct aggregate* agg) {
+    return sqrt((double)agg->max_r_sqd) + 0.5*agg->b_offset;
+}
+
+/**
+ * \brief Radius beyond which walkers are re-injected onto the launch
+ *        circle/sphere under `LAUNCH` spawning, `kill_ratio` times the launch
+ *        radius `r_launch` but at least `AGGREGATE_KILL_MIN_MARGIN` sites
+ *        beyond it.
+ */
+static inline double kill_radius(const struct aggregate* agg, double r_launch) {
+    const double r_kill = agg->kill_ratio*r_launch;
+    const double r_min = r_launch + AGGREGATE_KILL_MIN_MARGIN;
+    return r_kill > r_min ? r_kill : r_min;
+}
+
+/**
+ * \brief Number of sites a walker at `pos` can move along one axis while
+ *        staying within the neighbourhood of the finest coarse block `block`,
+ *        negative if it already lies outside of it.
+ */
+static inline int jump_block_margin(int pos, int block) {
+    const int size = 1 << AGGREGATE_JUMP_MIN_SHIFT;
+    const int below = pos - (block - 1)*size;
+    const int above = (block + 2)*size - 1 - pos;
+    return below < above ? below : above;
+}
+
+/**
+ * \brief Walker updates skipped before probing again for a jump, once a jump
+ *        is ruled out until the walker has moved `dist` sites along an axis.
+ *        Each update moves a walker by one site along one of `dims` axes, so
+ *        that moving `dist` sites along a given axis typically takes
+ *        `dims*dist*dist` updates. The skip is a heuristic rather than a
+ *        bound, a walker can get further in fewer updates, such that a jump is
+ *        at most deferred, never taken where it would be invalid.
+ */
+static inline int jump_skip(int dist, size_t dims) {
+    return (int)dims*dist*dist;
+}
+
+/**
+ * \brief Determines whether the distance of a walker to the reflecting
+ *        boundary, which caps any jump at `max_radius`, rules out a jump, in
+ *        which case the updates to skip are recorded in the cache.
+ */
+static inline bool jump_capped(struct jump_cache* jc, int max_radius, size_t dims) {
+    const int min_radius = (1 << AGGREGATE_JUMP_MIN_SHIFT) - 1;
+    if (max_radius >= min_radius) return false;
+    jc->skip = jump_skip(min_radius - max_radius, dims);
+    return true;
+}
+
+/**
+ * \brief Determines whether the cached occupied block rules out a jump of a
+ *        walker at `(x, y, z)`, in which case the updates to skip are recorded
+ *        in the cache.
+ */
+static inline bool jump_cache_hit(struct jump_cache* jc, int x, int y, int z, size_t dims) {
+    if (!jc->valid) return false;
+    int margin = jump_block_margin(x, jc->block.x);
+    const int my = jump_block_margin(y, jc->block.y);
+    if (my < margin) margin = my;
+    if (dims == 3U) {
+        const int mz = jump_block_margin(z, jc->block.z);
+        if (mz < margin) margin = mz;
+    }
+    if (margin < 0) return false;
+    jc->skip = jump_skip(margin + 1, dims);
+    return true;
+}
 
 struct aggregate* aggregate_alloc(void) {
     return malloc(sizeof(struct aggregate));
@@ -16,12 +115,310 @@ void aggregate_free_fields(struct aggregate* agg) {
     if (agg->_attractor) vector_free(agg->_attractor);
     if (agg->_rsteps) vector_free(agg->_rsteps);
     if (agg->_bcolls) vector_free(agg->_bcolls);
+    if (agg->_occupancy) occupancy_free(agg->_occupancy);
+    for (size_t l = 0U; l < AGGREGATE_JUMP_LEVELS; ++l)
+        if (agg->_coarse[l]) occupancy_free(agg->_coarse[l]);
+    if (agg->_stats) running_stats_free(agg->_stats);
+    free(agg->_profile);
+}
+
+/**
+ * \brief Allocates the fine occupancy lattice and every coarse level of an
+ *        aggregate of dimension `dims`, using storage scheme `type`.
+ */
+static int aggregate_alloc_occupancy(struct aggregate* agg, size_t dims,
+                                     enum occupancy_type type) {
+    agg->_occupancy = (type == SPARSE) ? occupancy_alloc_sparse(dims)
+        : occupancy_alloc(dims, agg->spawn_diam);
+    if (!(agg->_occupancy)) return -1;
+    for (size_t l = 0U; l < AGGREGATE_JUMP_LEVELS; ++l) {
+        agg->_coarse[l] = (type == SPARSE) ? occupancy_alloc_sparse(dims)
+            : occupancy_alloc(dims, 1U);
+        if (!(agg->_coarse[l])) return -1;
+    }
+    return 0;
+}
+
+/**
+ * \brief Marks the site `(x, y, z)` as occupied in the fine occupancy lattice
+ *        and in the containing block of every coarse level.
+ */
+static int aggregate_occupy(struct aggregate* agg, int x, int y, int z) {
+    if (occupancy_set(agg->_occupancy, x, y, z) == -1) return -1;
+    for (size_t l = 0U; l < AGGREGATE_JUMP_LEVELS; ++l) {
+        const int shift = AGGREGATE_JUMP_MIN_SHIFT + (int)l;
+        if (occupancy_set(agg->_coarse[l], x >> shift, y >> shift, z >> shift) == -1)
+            return -1;
+    }
+    return 0;
+}
+
+void aggregate_seed(struct aggregate* agg, uint64_t seed) {
+    agg->seed = seed;
+    rng_seed(&agg->rng, seed);
+}
+
+/**
+ * \brief Default seed for an aggregate, mixing the wall-clock time with the
+ *        aggregate address so that aggregates created together differ.
+ */
+static uint64_t aggregate_default_seed(const struct aggregate* agg) {
+    struct timespec ts;
+    clock_gettime(CLOCK_REALTIME, &ts);
+    return ((uint64_t)ts.tv_sec*1000000000U + (uint64_t)ts.tv_nsec)
+        ^ ((uint64_t)(uintptr_t)agg << 16);
+}
+
+/**
+ * \brief Changes the element size of an empty vector, reallocating its storage
+ *        for the current capacity if required.
+ */
+static int aggregate_retype_vector(struct vector* vec, size_t elemsize) {
+    if (vec->elemsize == elemsize) return 0;
+    if (elemsize > vec->elemsize) {
+        unsigned char* data = realloc(vec->data, vec->capacity*elemsize);
+        if (!data) return -1;
+        vec->data = data;
+    }
+    vec->elemsize = elemsize;
+    return 0;
+}
+
+// selects compact (16-bit) or full (32-bit) particle co-ordinates and 8, 4 or
+// 0 (not recorded) bytes per statistic, only valid before any particle exists
+int aggregate_set_storage(struct aggregate* agg, size_t dims, bool compact,
+                          size_t stat_bytes) {
+    if (!vector_empty(agg->_aggregate) || !vector_empty(agg->_attractor) ||
+        !vector_empty(agg->_rsteps) || !vector_empty(agg->_bcolls)) return -1;
+    if (stat_bytes != 0U && stat_bytes != sizeof(uint32_t) &&
+        stat_bytes != sizeof(size_t)) return -1;
+    const size_t coord_size = dims*(compact ? sizeof(int16_t) : sizeof(int));
+    if (aggregate_retype_vector(agg->_aggregate, coord_size) == -1 ||
+        aggregate_retype_vector(agg->_attractor, coord_size) == -1) return -1;
+    agg->record_stats = (stat_bytes != 0U);
+    if (agg->record_stats &&
+        (aggregate_retype_vector(agg->_rsteps, stat_bytes) == -1 ||
+         aggregate_retype_vector(agg->_bcolls, stat_bytes) == -1)) return -1;
+    return 0;
+}
+
+/**
+ * \brief Widens a vector of compact (16-bit) co-ordinates, in place, to full
+ *        (32-bit) co-ordinates.
+ */
+static int aggregate_widen_coords(struct vector* vec, size_t dims) {
+    unsigned char* data = malloc(vec->capacity*dims*sizeof(int));
+    if (!data) return -1;
+    const int16_t* src = (int16_t*)vec->data;
+    int* dst = (int*)data;
+    for (size_t i = 0U; i < vec->size*dims; ++i) dst[i] = src[i];
+    free(vec->data);
+    vec->data = data;
+    vec->elemsize = dims*sizeof(int);
+    return 0;
+}
+
+// appends to a particle or statistics vector, counting reallocations
+static inline int aggregate_vector_push(struct aggregate* agg, struct vector* vec,
+                                        void* value) {
+    PROFILE_COUNT(agg, reallocations, vec->size == vec->capacity);
+    (void)agg;
+    return vector_push_back(vec, value, vec->elemsize);
 }
 
+/**
+ * \brief Appends the site `(x, y, z)` to a co-ordinate vector of an aggregate of
+ *        dimension `dims`, promoting both co-ordinate vectors to full storage
+ *        if the site does not fit in compact storage.
+ */
+static int aggregate_push_site(struct aggregate* agg, struct vector* vec,
+                               size_t dims, int x, int y, int z) {
+    if (vec->elemsize == dims*sizeof(int16_t)) {
+        if (x < INT16_MIN || x > INT16_MAX || y < INT16_MIN || y > INT16_MAX ||
+            z < INT16_MIN || z > INT16_MAX) {
+            if (aggregate_widen_coords(agg->_aggregate, dims) == -1 ||
+                aggregate_widen_coords(agg->_attractor, dims) == -1) return -1;
+        }
+        else {
+            int16_t site[3] = {(int16_t)x, (int16_t)y, (int16_t)z};
+            if (aggregate_vector_push(agg, vec, site) == -1) return -1;
+            if (vec == agg->_aggregate) running_stats_add_site(agg->_stats, x, y, z);
+            return 0;
+        }
+    }
+    int site[3] = {x, y, z};
+    if (aggregate_vector_push(agg, vec, site) == -1) return -1;
+    if (vec == agg->_aggregate) running_stats_add_site(agg->_stats, x, y, z);
+    return 0;
+}
+
+/**
+ * \brief Reads the site at `index` of a co-ordinate vector of an aggregate of
+ *        dimension `dims`, in either compact or full storage.
+ */
+static void aggregate_site_at(const struct vector* vec, size_t dims, size_t index,
+                              int* x, int* y, int* z) {
+    const void* elem = vector_at(vec, index);
+    if (vec->elemsize == dims*sizeof(int16_t)) {
+        const int16_t* site = (const int16_t*)elem;
+        *x = site[0]; *y = site[1]; *z = (dims == 3U) ? site[2] : 0;
+    }
+    else {
+        const int* site = (const int*)elem;
+        *x = site[0]; *y = site[1]; *z = (dims == 3U) ? site[2] : 0;
+    }
+}
+
+// records the statistics of a stuck particle, saturating in 32-bit storage
+int aggregate_push_stats(struct aggregate* agg, size_t steps, size_t bcolls) {
+    running_stats_add_particle(agg->_stats, steps, bcolls);
+    if (!agg->record_stats) return 0;
+    if (agg->_rsteps->elemsize == sizeof(uint32_t)) {
+        uint32_t s = (steps > UINT32_MAX) ? UINT32_MAX : (uint32_t)steps;
+        uint32_t b = (bcolls > UINT32_MAX) ? UINT32_MAX : (uint32_t)bcolls;
+        if (aggregate_vector_push(agg, agg->_rsteps, &s) == -1 ||
+            aggregate_vector_push(agg, agg->_bcolls, &b) == -1) return -1;
+        return 0;
+    }
+    if (aggregate_vector_push(agg, agg->_rsteps, &steps) == -1 ||
+        aggregate_vector_push(agg, agg->_bcolls, &bcolls) == -1) return -1;
+    return 0;
+}
+
+// replaces the occupancy lattices with lattices of storage scheme `type`,
+// re-populated from the particles already in the aggregate
+int aggregate_set_occupancy(struct aggregate* agg, size_t dims,
+                            enum occupancy_type type) {
+    struct occupancy* occupancy = agg->_occupancy;
+    struct occupancy* coarse[AGGREGATE_JUMP_LEVELS];
+    memcpy(coarse, agg->_coarse, sizeof coarse);
+    agg->_occupancy = (struct occupancy*)NULL;
+    for (size_t l = 0U; l < AGGREGATE_JUMP_LEVELS; ++l)
+        agg->_coarse[l] = (struct occupancy*)NULL;
+    int retval = aggregate_alloc_occupancy(agg, dims, type);
+    if (retval == 0) {
+        retval = (dims == 2U) ? aggregate_2d_rebuild_occupancy(agg)
+            : aggregate_3d_rebuild_occupancy(agg);
+    }
+    // on failure restore the original lattices
+    struct occupancy* release = (retval == 0) ? occupancy : agg->_occupancy;
+    if (release) occupancy_free(release);
+    if (retval != 0) agg->_occupancy = occupancy;
+    for (size_t l = 0U; l < AGGREGATE_JUMP_LEVELS; ++l) {
+        release = (retval == 0) ? coarse[l] : agg->_coarse[l];
+        if (release) occupancy_free(release);
+        if (retval != 0) agg->_coarse[l] = coarse[l];
+    }
+    return retval;
+}
+
+// re-computes the running statistics from the particle and statistics vectors,
+// the walk statistics restart from empty if they are not recorded
+void aggregate_rebuild_stats(struct aggregate* agg, size_t dims) {
+    struct running_stats* rs = agg->_stats;
+    running_stats_clear(rs);
+    for (size_t i = 0U; i < vector_size(agg->_aggregate); ++i) {
+        int x, y, z;
+        aggregate_site_at(agg->_aggregate, dims, i, &x, &y, &z);
+        running_stats_add_site(rs, x, y, z);
+    }
+    if (!agg->record_stats) return;
+    const bool wide = (agg->_rsteps->elemsize == sizeof(size_t));
+    for (size_t i = 0U; i < vector_size(agg->_rsteps); ++i) {
+        const void* steps = vector_at(agg->_rsteps, i);
+        const void* bcolls = vector_at(agg->_bcolls, i);
+        running_stats_add_particle(rs, wide ? *(const size_t*)steps : *(const uint32_t*)steps,
+                                   wide ? *(const size_t*)bcolls : *(const uint32_t*)bcolls);
+    }
+}
+
+void aggregate_set_progress(struct aggregate* agg, progress_fn fn, void* data,
+                            size_t every, double interval_ms) {
+    agg->progress.fn = fn;
+    agg->progress.data = data;
+    agg->progress.every = every;
+    agg->progress.interval_ms = interval_ms;
+}
+
+// reports progress to the callback, or prints it if there is none, when due
+void aggregate_report_progress(struct aggregate* agg, struct progress_state* st,
+                               size_t count) {
+    if (!progress_due(st, count)) return;
+    st->last_count = count;
+    st->last_ms = progress_clock_ms();
+    if (agg->progress.fn) {
+        agg->progress.fn(count, st->total, sqrt((double)agg->max_r_sqd),
+                         agg->_stats->steps_total, agg->progress.data);
+        return;
+    }
+    printf("\rProgress: %d%%", (int)(100*(double)count/(double)st->total));
+    fflush(stdout);
+}
+
+void aggregate_set_stop(struct aggregate* agg, double max_r_sqd, double max_ms,
+                        double max_steps) {
+    agg->stop.max_r_sqd = max_r_sqd;
+    agg->stop.max_ms = max_ms;
+    agg->stop.max_steps = max_steps;
+}
+
+// requests that generation stops, may be called from any thread at any time
+void aggregate_cancel(struct aggregate* agg) {
+    __atomic_store_n(&agg->stop.cancel, 1, __ATOMIC_RELAXED);
+}
+
+// lattice steps taken by stuck particles and the current walker
+double aggregate_steps_taken(const struct aggregate* agg) {
+    return agg->_stats->steps_total + (double)agg->_walker.steps;
+}
+
+// records why generation stopped, consuming a cancellation request
+void aggregate_finish_stop(struct aggregate* agg, enum stop_reason reason) {
+    agg->stop.reason = reason;
+    if (reason == STOP_CANCELLED) __atomic_store_n(&agg->stop.cancel, 0, __ATOMIC_RELAXED);
+}
+
+/**
+ * \brief Advances an aggregate by up to `n` particles with `advance`, in
+ *        batches of particles or of walker updates between which progress is
+ *        reported and stop conditions are checked.
+ */
+static int aggregate_generate_controlled(struct aggregate* agg, size_t n, bool disp_prog,
+                                         int (*advance)(struct aggregate*, size_t,
+                                                        size_t, size_t*)) {
+    const bool report = disp_prog || agg->progress.fn;
+    struct progress_state pst;
+    if (report) progress_start(&pst, &agg->progress, n);
+    struct stop_state sst;
+    stop_start(&sst, aggregate_steps_taken(agg));
+    enum stop_reason reason = STOP_NONE;
+    size_t count = 0U;
+    for (;;) {
+        if (count >= n) {
+            reason = STOP_COUNT;
+            break;
+        }
+        const double steps = aggregate_steps_taken(agg);
+        reason = stop_check(&agg->stop, &sst, (double)agg->max_r_sqd, steps);
+        if (reason != STOP_NONE) break;
+        size_t k = report ? progress_batch(&pst, count, n - count) : n - count;
+        if (agg->stop.max_r_sqd > 0.0) k = 1U; // radius changes only on sticking
+        const size_t max_updates = stop_updates(&agg->stop, &sst, steps, PROGRESS_CHUNK_STEPS);
+        size_t nstuck = 0U;
+        if (advance(agg, k, max_updates, &nstuck) == -1) return -1;
+        count += nstuck;
+        if (report) aggregate_report_progress(agg, &pst, count);
+    }
+    aggregate_finish_stop(agg, reason);
+    return 0;
+}
+
+// reserves statistics storage for `n` particles beyond those already stuck
 int aggregate_reserve(struct aggregate* agg, size_t n) {
-    const int ec1 = vector_reserve(agg->_rsteps, n);
+    if (!agg->record_stats) return 0;
+    const int ec1 = vector_reserve(agg->_rsteps, vector_size(agg->_rsteps) + n);
     if (ec1 == VECTOR_REALLOC_FAILURE) return -1;
-    const int ec2 = vector_reserve(agg->_bcolls, n);
+    const int ec2 = vector_reserve(agg->_bcolls, vector_size(agg->_bcolls) + n);
     if (ec2 == VECTOR_REALLOC_FAILURE) return -1;
     return 0;
 }
@@ -36,6 +433,16 @@ int aggregate_2d_init(struct aggregate* agg,
     agg->_attractor = (struct vector*)NULL;
     agg->_rsteps = (struct vector*)NULL;
     agg->_bcolls = (struct vector*)NULL;
+    agg->_occupancy = (struct occupancy*)NULL;
+    for (size_t l = 0U; l < AGGREGATE_JUMP_LEVELS; ++l)
+        agg->_coarse[l] = (struct occupancy*)NULL;
+    agg->_stats = (struct running_stats*)NULL;
+    agg->_profile = profile_alloc();
+    aggregate_set_progress(agg, (progress_fn)NULL, NULL, 0U, 0.0);
+    aggregate_set_stop(agg, 0.0, 0.0, 0.0);
+    agg->stop.cancel = 0;
+    agg->stop.reason = STOP_NONE;
+    memset(&agg->jump, 0, sizeof agg->jump);
     // try to allocate vectors
     agg->_aggregate = vector_alloc(sizeof(struct int_pair));
     if (!(agg->_aggregate)) goto errorcleanup;
@@ -45,6 +452,8 @@ int aggregate_2d_init(struct aggregate* agg,
     if (!(agg->_rsteps)) goto errorcleanup;
     agg->_bcolls = vector_alloc(sizeof(size_t));
     if (!(agg->_bcolls)) goto errorcleanup;
+    agg->_stats = running_stats_alloc(STATS_DEFAULT_WINDOW);
+    if (!(agg->_stats)) goto errorcleanup;
     agg->stickiness = stickiness;
     agg->max_x = 0U;
     agg->max_y = 0U;
@@ -55,14 +464,35 @@ int aggregate_2d_init(struct aggregate* agg,
     agg->att_size = 1U;
     agg->lt = lt;
     agg->at = at;
-    srand(time(NULL)); // seed PRNG
+    agg->st = BOX;
+    agg->kill_ratio = 1.01;
+    agg->engine = UNIT_STEP;
+    memset(&agg->_walker, 0, sizeof agg->_walker);
+    agg->record_stats = true;
+    if (aggregate_alloc_occupancy(agg, 2U, DENSE) == -1) goto errorcleanup;
+    aggregate_seed(agg, aggregate_default_seed(agg));
     return 0;
     errorcleanup: // clean-up if memory allocation fails
         aggregate_free_fields(agg);
         return -1;
 }
 
+// re-populates the occupancy lattices from the particle vector, used after
+// the particle vector has been filled externally (e.g. checkpoint restore)
+int aggregate_2d_rebuild_occupancy(struct aggregate* agg) {
+    for (size_t i = 0U; i < vector_size(agg->_aggregate); ++i) {
+        int x, y, z;
+        aggregate_site_at(agg->_aggregate, 2U, i, &x, &y, &z);
+        if (aggregate_occupy(agg, x, y, z) == -1) return -1;
+    }
+    return 0;
+}
+
 int aggregate_2d_init_attractor(struct aggregate* agg, size_t n) {
+    if (!vector_empty(agg->_attractor)) { // already seeded, continue growth
+        const int ec = vector_reserve(agg->_aggregate, vector_size(agg->_aggregate) + n);
+        return (ec == VECTOR_REALLOC_FAILURE) ? -1 : 0;
+    }
     if (agg->at == POINT) { // set origin point
         struct int_pair origin;
         origin.x = 0; origin.y = 0;
@@ -70,8 +500,10 @@ int aggregate_2d_init_attractor(struct aggregate* agg, size_t n) {
         if (ec1 == VECTOR_REALLOC_FAILURE) return -1;
         const int ec2 = vector_reserve(agg->_aggregate, n + agg->att_size);
         if (ec2 == VECTOR_REALLOC_FAILURE) return -1;
-        vector_push_back(agg->_attractor, &origin, sizeof origin);
-        vector_push_back(agg->_aggregate, &origin, sizeof origin);
+        if (aggregate_push_site(agg, agg->_attractor, 2U, origin.x, origin.y, 0) == -1 ||
+            aggregate_push_site(agg, agg->_aggregate, 2U, origin.x, origin.y, 0) == -1)
+            return -1;
+        if (aggregate_occupy(agg, origin.x, origin.y, 0) == -1) return -1;
     }
     else if (agg->at == LINE) { // set (x=[-att_size/2, att_size/2], y=0)
         const int ec1 = vector_reserve(agg->_attractor, agg->att_size);
@@ -82,8 +514,10 @@ int aggregate_2d_init_attractor(struct aggregate* agg, size_t n) {
             struct int_pair attp;
             attp.x = i - (int)(0.5*agg->att_size);
             attp.y = 0;
-            vector_push_back(agg->_attractor, &attp, sizeof attp);
-            vector_push_back(agg->_aggregate, &attp, sizeof attp);
+            if (aggregate_push_site(agg, agg->_attractor, 2U, attp.x, attp.y, 0) == -1 ||
+                aggregate_push_site(agg, agg->_aggregate, 2U, attp.x, attp.y, 0) == -1)
+                return -1;
+            if (aggregate_occupy(agg, attp.x, attp.y, 0) == -1) return -1;
         }
     }
     else if (agg->at == CIRCLE) { // set circle with r = att_size
@@ -97,72 +531,137 @@ int aggregate_2d_init_attractor(struct aggregate* agg, size_t n) {
             struct int_pair attp;
             attp.x = (int)(agg->att_size*cos(theta));
             attp.y = (int)(agg->att_size*sin(theta));
-            vector_push_back(agg->_attractor, &attp, sizeof attp);
-            vector_push_back(agg->_aggregate, &attp, sizeof attp);
+            if (aggregate_push_site(agg, agg->_attractor, 2U, attp.x, attp.y, 0) == -1 ||
+                aggregate_push_site(agg, agg->_aggregate, 2U, attp.x, attp.y, 0) == -1)
+                return -1;
+            if (aggregate_occupy(agg, attp.x, attp.y, 0) == -1) return -1;
         }
     }
     return 0;
 }
 
-void aggregate_2d_spawn_bp(const struct aggregate* agg,
+void aggregate_2d_spawn_bp(struct aggregate* agg,
                            struct int_pair* curr) {
-    const double ppr = prand();
+    agg->jump.skip = 0; // the walker is moved away from the cached block
+    if (agg->at == POINT && agg->st == LAUNCH) { // uniformly on launch circle
+        const double r = launch_radius(agg);
+        const double theta = 2.0*M_PI*prand(agg);
+        curr->x = (int)lround(r*cos(theta));
+        curr->y = (int)lround(r*sin(theta));
+        return;
+    }
+    const double ppr = prand(agg);
     if (agg->at == POINT) {
         if (ppr < 0.5) { // positive/negative y-line of boundary
-            curr->x = (int)agg->spawn_diam*(prand() - 0.5);
+            curr->x = (int)agg->spawn_diam*(prand(agg) - 0.5);
             curr->y = (ppr < 0.25) ? (int)(agg->spawn_diam*0.5) : -(int)(agg->spawn_diam*0.5);
         }
         else { // positive/negative x-line of boundary
             curr->x = (ppr < 0.75) ? (int)(agg->spawn_diam*0.5) : -(int)(agg->spawn_diam*0.5);
-            curr->y = (int)agg->spawn_diam*(prand() - 0.5);
+            curr->y = (int)agg->spawn_diam*(prand(agg) - 0.5);
         }
     }
     else if (agg->at == LINE) {
-        curr->x = 2*(int)(agg->att_size*(prand() - 0.5));
+        curr->x = 2*(int)(agg->att_size*(prand(agg) - 0.5));
         curr->y = (ppr < 0.5) ? (int)agg->spawn_diam : -(int)agg->spawn_diam;
     }
 }
 
-void aggregate_2d_update_bp(const struct aggregate* agg,
+void aggregate_2d_update_bp(struct aggregate* agg,
+                            struct int_pair* curr) {
+    const int* move = (agg->lt == SQUARE)
+        ? moves_2d_square[rng_index(&agg->rng, 4U)]
+        : moves_2d_triangle[rng_index(&agg->rng, 6U)];
+    curr->x += move[0];
+    curr->y += move[1];
+}
+
+size_t aggregate_2d_jump_bp(struct aggregate* agg,
                             struct int_pair* curr) {
-    const double md = prand();
-    if (agg->lt == SQUARE) {
-        if (md < 0.25) ++(curr->x);
-        else if (md >= 0.25 && md < 0.5) --(curr->x);
-        else if (md >= 0.5 && md < 0.75) ++(curr->y);
-        else --(curr->y);
-    }
-    else if (agg->lt == TRIANGLE) {
-        if (md < 1.0/6.0) ++(curr->x);
-        else if (md >= 1.0/6.0 && md < 2.0/6.0) --(curr->x);
-        else if (md >= 2.0/6.0 && md < 3.0/6.0) {
-            ++(curr->x);
-            ++(curr->y);
-        }
-        else if (md >= 3.0/6.0 && md < 4.0/6.0) {
-            ++(curr->x);
-            --(curr->y);
-        }
-        else if (md >= 4.0/6.0 && md < 5.0/6.0) {
-            --(curr->x);
-            ++(curr->y);
+    struct jump_cache* jc = &agg->jump;
+    // keep the jump within the reflecting boundary when box spawning
+    const int epsilon = 2;
+    int max_radius = INT_MAX;
+    if (agg->st != LAUNCH || agg->at != POINT) {
+        int bnd_dist;
+        if (agg->at == LINE) {
+            const int dx = 2*(int)agg->att_size - abs(curr->x);
+            const int dy = (int)agg->spawn_diam + epsilon - abs(curr->y);
+            bnd_dist = dx < dy ? dx : dy;
         }
         else {
-            --(curr->x);
-            --(curr->y);
+            const int bnd_absmax = (int)(agg->spawn_diam*0.5 + epsilon);
+            const int reach = abs(curr->x) > abs(curr->y) ? abs(curr->x) : abs(curr->y);
+            bnd_dist = bnd_absmax - reach;
+        }
+        max_radius = bnd_dist - 1;
+    }
+    // no jump can be longer than the cap, so skip probing the levels
+    if (jump_capped(jc, max_radius, 2U)) return 0U;
+    if (jump_cache_hit(jc, curr->x, curr->y, 0, 2U)) return 0U;
+    // largest block size whose 3x3 neighbourhood of blocks is empty, in which
+    // case every particle lies further than the block size from the walker
+    int radius = 0;
+    for (size_t l = 0U; l < AGGREGATE_JUMP_LEVELS && radius < max_radius; ++l) {
+        const int shift = AGGREGATE_JUMP_MIN_SHIFT + (int)l;
+        const int cx = curr->x >> shift;
+        const int cy = curr->y >> shift;
+        bool empty = true;
+        for (int dx = -1; dx <= 1 && empty; ++dx)
+            for (int dy = -1; dy <= 1 && empty; ++dy) {
+                PROFILE_COUNT(agg, occupancy_tests, 1U);
+                if (occupancy_test(agg->_coarse[l], cx + dx, cy + dy, 0)) {
+                    empty = false;
+                    jc->block.x = cx + dx;
+                    jc->block.y = cy + dy;
+                }
+            }
+        if (!empty) {
+            if (l == 0U) { // cache the block ruling out any jump
+                jc->valid = true;
+                jump_cache_hit(jc, curr->x, curr->y, 0, 2U);
+            }
+            break;
         }
+        radius = (1 << shift) - 1;
     }
+    if (radius > max_radius) radius = max_radius;
+    if (radius < 2) return 0U;
+    const double theta = 2.0*M_PI*prand(agg);
+    curr->x += (int)lround(radius*cos(theta));
+    curr->y += (int)lround(radius*sin(theta));
+    return (size_t)lround(radius*radius/mean_sqd_step[0][agg->lt]);
 }
 
-bool aggregate_2d_lattice_collision(const struct aggregate* agg,
+bool aggregate_2d_lattice_collision(struct aggregate* agg,
                                     struct int_pair* curr,
                                     const struct int_pair* prev) {
     const int epsilon = 2; // small elastic boundary correction
+    if (agg->at == POINT && agg->st == LAUNCH) {
+        const double r_sqd = (double)curr->x*curr->x + (double)curr->y*curr->y;
+        const double r_launch = launch_radius(agg);
+        const double r_kill = kill_radius(agg, r_launch);
+        if (r_sqd > r_kill*r_kill) {
+            // re-inject onto the launch circle at the point where a walker
+            // from radius r first returns, following the harmonic measure of
+            // the circle's exterior (a wrapped Cauchy distribution)
+            const double rho = r_launch/sqrt(r_sqd);
+            const double dtheta = 2.0*atan((1.0 - rho)/(1.0 + rho)*tan(M_PI*(prand(agg) - 0.5)));
+            const double theta = atan2((double)curr->y, (double)curr->x) + dtheta;
+            curr->x = (int)lround(r_launch*cos(theta));
+            curr->y = (int)lround(r_launch*sin(theta));
+            agg->jump.skip = 0;
+            PROFILE_COUNT(agg, reflections, 1U);
+            return true;
+        }
+        return false;
+    }
     if (agg->at == POINT || agg->at == CIRCLE) {
         const int bnd_absmax = (int)(agg->spawn_diam*0.5 + epsilon);
         if (abs(curr->x) > bnd_absmax || abs(curr->y) > bnd_absmax) {
             curr->x = prev->x;
             curr->y = prev->y;
+            PROFILE_COUNT(agg, reflections, 1U);
             return true;
         }
     }
@@ -171,74 +670,109 @@ bool aggregate_2d_lattice_collision(const struct aggregate* agg,
             abs(curr->y) > (int)agg->spawn_diam + epsilon) {
             curr->x = prev->x;
             curr->y = prev->y;
+            PROFILE_COUNT(agg, reflections, 1U);
         }
     }
     return false;
 }
 
-bool aggregate_2d_collision(struct aggregate* agg,
-                            struct int_pair* curr,
-                            struct int_pair* prev) {
-    if (prand() > agg->stickiness) return false;
-    for (size_t i = 0U; i < vector_size(agg->_aggregate); ++i) {
-        const struct int_pair* aggp = (struct int_pair*)vector_at(agg->_aggregate, i);
-        if (curr->x == aggp->x && curr->y == aggp->y) {
-            vector_push_back(agg->_aggregate, prev, sizeof *prev);
-            if (abs(prev->x) > agg->max_x) agg->max_x = abs(prev->x);
-            bool expand_spawn_line = false;
-            if (abs(prev->y) > agg->max_y) {
-                agg->max_y = abs(prev->y);
-                expand_spawn_line = true;
-            }
-            // expand spawning region if necessary
-            if (agg->at == POINT) {
-                double rsqd = prev->x * prev->x + prev->y * prev->y;
-                if (rsqd > agg->max_r_sqd) {
-                    agg->max_r_sqd = rsqd;
-                    agg->spawn_diam = 2*(int)(sqrt(rsqd)) + agg->b_offset;
-                }
-            }
-            else if (agg->at == LINE && expand_spawn_line)
-                agg->spawn_diam = prev->y + agg->b_offset;
-            return true;
+int aggregate_2d_stick(struct aggregate* agg,
+                       const struct int_pair* prev) {
+    if (aggregate_push_site(agg, agg->_aggregate, 2U, prev->x, prev->y, 0) == -1 ||
+        aggregate_occupy(agg, prev->x, prev->y, 0) == -1) return -1;
+    if (abs(prev->x) > agg->max_x) agg->max_x = abs(prev->x);
+    bool expand_spawn_line = false;
+    if (abs(prev->y) > agg->max_y) {
+        agg->max_y = abs(prev->y);
+        expand_spawn_line = true;
+    }
+    // expand spawning region if necessary
+    if (agg->at == POINT) {
+        double rsqd = prev->x * prev->x + prev->y * prev->y;
+        if (rsqd > agg->max_r_sqd) {
+            agg->max_r_sqd = rsqd;
+            agg->spawn_diam = 2*(int)(sqrt(rsqd)) + agg->b_offset;
         }
     }
-    return false;
+    else if (agg->at == LINE && expand_spawn_line)
+        agg->spawn_diam = abs(prev->y) + agg->b_offset;
+    return 0;
 }
 
-int aggregate_2d_generate(struct aggregate* agg, size_t n, bool disp_prog) {
-    if (aggregate_reserve(agg, n) == -1 ||
-        aggregate_2d_init_attractor(agg, n) == -1) return -1;
+int aggregate_2d_collision(struct aggregate* agg,
+                           struct int_pair* curr,
+                           struct int_pair* prev) {
+    if (!occupancy_test(agg->_occupancy, curr->x, curr->y, 0)) return 0;
+    if (!rng_chance(&agg->rng, agg->stickiness)) return 0;
+    return (aggregate_2d_stick(agg, prev) == -1) ? -1 : 1;
+}
+
+// walks until `k` more particles have stuck or `max_steps` walker updates
+// have been taken (0 for no limit), the walker is resumed on the next call
+int aggregate_2d_advance(struct aggregate* agg, size_t k, size_t max_steps,
+                         size_t* nstuck) {
+    struct walker* wlk = &agg->_walker;
     struct int_pair curr;
     struct int_pair prev;
-    size_t steps_to_stick = 0U;
-    size_t bcolls = 0U;
+    curr.x = wlk->pos.x;
+    curr.y = wlk->pos.y;
     size_t count = 0U;
-    bool has_next_spawned = false;
-    while (count < n) {
-        if (!has_next_spawned) {
+    size_t nsteps = 0U;
+    int retval = 0;
+    while (count < k && (!max_steps || nsteps < max_steps)) {
+        if (!wlk->spawned) {
+            PROFILE_START(t_spawn);
             aggregate_2d_spawn_bp(agg, &curr);
-            has_next_spawned = true;
+            PROFILE_STOP(agg, PROFILE_SPAWN, t_spawn);
+            PROFILE_COUNT(agg, spawns, 1U);
+            wlk->spawned = true;
         }
         prev.x = curr.x;
         prev.y = curr.y;
-        aggregate_2d_update_bp(agg, &curr);
-        if (aggregate_2d_lattice_collision(agg, &curr, &prev)) ++bcolls;
-        ++steps_to_stick;
-        if (aggregate_2d_collision(agg, &curr, &prev)) {
-            vector_push_back(agg->_rsteps, &steps_to_stick, sizeof steps_to_stick);
-            vector_push_back(agg->_bcolls, &bcolls, sizeof bcolls);
-            steps_to_stick = 0U;
-            bcolls = 0U;
-            ++count;
-            if (disp_prog) {
-                printf("\rProgress: %d%%", (int)(100*(double)count/(double)n));
-                fflush(stdout);
+        PROFILE_START(t_walk);
+        const size_t jsteps = (agg->engine == LONG_JUMP) ? aggregate_2d_jump(agg, &curr) : 0U;
+        if (jsteps) wlk->steps += jsteps;
+        else {
+            aggregate_2d_update_bp(agg, &curr);
+            ++(wlk->steps);
+        }
+        ++nsteps;
+        PROFILE_STOP(agg, PROFILE_WALK, t_walk);
+        PROFILE_COUNT(agg, steps, 1U);
+        PROFILE_COUNT(agg, jumps, jsteps != 0U);
+        PROFILE_START(t_boundary);
+        if (aggregate_2d_lattice_collision(agg, &curr, &prev)) ++(wlk->bcolls);
+        PROFILE_STOP(agg, PROFILE_BOUNDARY, t_boundary);
+        PROFILE_START(t_collision);
+        PROFILE_COUNT(agg, occupancy_tests, 1U);
+        const bool contact = occupancy_test(agg->_occupancy, curr.x, curr.y, 0);
+        const bool stick = contact && rng_chance(&agg->rng, agg->stickiness);
+        PROFILE_STOP(agg, PROFILE_COLLISION, t_collision);
+        PROFILE_COUNT(agg, rejected_sticks, contact && !stick);
+        if (stick) {
+            PROFILE_START(t_stick);
+            if (aggregate_2d_stick(agg, &prev) == -1 ||
+                aggregate_push_stats(agg, wlk->steps, wlk->bcolls) == -1) {
+                retval = -1;
+                break;
             }
-            has_next_spawned = false;
+            PROFILE_STOP(agg, PROFILE_STICK, t_stick);
+            wlk->steps = 0U;
+            wlk->bcolls = 0U;
+            wlk->spawned = false;
+            ++count;
         }
     }
-    return 0;
+    wlk->pos.x = curr.x;
+    wlk->pos.y = curr.y;
+    if (nstuck) *nstuck = count;
+    return retval;
+}
+
+int aggregate_2d_generate(struct aggregate* agg, size_t n, bool disp_prog) {
+    if (aggregate_reserve(agg, n) == -1 ||
+        aggregate_2d_init_attractor(agg, n) == -1) return -1;
+    return aggregate_generate_controlled(agg, n, disp_prog, aggregate_2d_advance);
 }
 
 /*** 3D aggregate functions ***/
@@ -251,6 +785,16 @@ int aggregate_3d_init(struct aggregate* agg,
     agg->_attractor = (struct vector*)NULL;
     agg->_rsteps = (struct vector*)NULL;
     agg->_bcolls = (struct vector*)NULL;
+    agg->_occupancy = (struct occupancy*)NULL;
+    for (size_t l = 0U; l < AGGREGATE_JUMP_LEVELS; ++l)
+        agg->_coarse[l] = (struct occupancy*)NULL;
+    agg->_stats = (struct running_stats*)NULL;
+    agg->_profile = profile_alloc();
+    aggregate_set_progress(agg, (progress_fn)NULL, NULL, 0U, 0.0);
+    aggregate_set_stop(agg, 0.0, 0.0, 0.0);
+    agg->stop.cancel = 0;
+    agg->stop.reason = STOP_NONE;
+    memset(&agg->jump, 0, sizeof agg->jump);
     // try to allocate vectors
     agg->_aggregate = vector_alloc(sizeof(struct int_triplet));
     if (!(agg->_aggregate)) goto errorcleanup;
@@ -260,6 +804,8 @@ int aggregate_3d_init(struct aggregate* agg,
     if (!(agg->_rsteps)) goto errorcleanup;
     agg->_bcolls = vector_alloc(sizeof(size_t));
     if (!(agg->_bcolls)) goto errorcleanup;
+    agg->_stats = running_stats_alloc(STATS_DEFAULT_WINDOW);
+    if (!(agg->_stats)) goto errorcleanup;
     agg->stickiness = stickiness;
     agg->max_x = 0U;
     agg->max_y = 0U;
@@ -271,14 +817,35 @@ int aggregate_3d_init(struct aggregate* agg,
     agg->att_size = 1U;
     agg->lt = lt;
     agg->at = at;
-    srand(time(NULL));
+    agg->st = BOX;
+    agg->kill_ratio = 1.01;
+    agg->engine = UNIT_STEP;
+    memset(&agg->_walker, 0, sizeof agg->_walker);
+    agg->record_stats = true;
+    if (aggregate_alloc_occupancy(agg, 3U, DENSE) == -1) goto errorcleanup;
+    aggregate_seed(agg, aggregate_default_seed(agg));
     return 0;
     errorcleanup:
         aggregate_free_fields(agg);
         return -1;
 }
 
+// re-populates the occupancy lattices from the particle vector, used after
+// the particle vector has been filled externally (e.g. checkpoint restore)
+int aggregate_3d_rebuild_occupancy(struct aggregate* agg) {
+    for (size_t i = 0U; i < vector_size(agg->_aggregate); ++i) {
+        int x, y, z;
+        aggregate_site_at(agg->_aggregate, 3U, i, &x, &y, &z);
+        if (aggregate_occupy(agg, x, y, z) == -1) return -1;
+    }
+    return 0;
+}
+
 int aggregate_3d_init_attractor(struct aggregate* agg, size_t n) {
+    if (!vector_empty(agg->_attractor)) { // already seeded, continue growth
+        const int ec = vector_reserve(agg->_aggregate, vector_size(agg->_aggregate) + n);
+        return (ec == VECTOR_REALLOC_FAILURE) ? -1 : 0;
+    }
     if (agg->at == POINT) { // set origin point
         struct int_triplet origin;
         origin.x = 0; origin.y = 0; origin.z = 0;
@@ -286,8 +853,10 @@ int aggregate_3d_init_attractor(struct aggregate* agg, size_t n) {
         if (ec1 == VECTOR_REALLOC_FAILURE) return -1;
         const int ec2 = vector_reserve(agg->_aggregate, n + agg->att_size);
         if (ec2 == VECTOR_REALLOC_FAILURE) return -1;
-        vector_push_back(agg->_attractor, &origin, sizeof origin);
-        vector_push_back(agg->_aggregate, &origin, sizeof origin);
+        if (aggregate_push_site(agg, agg->_attractor, 3U, origin.x, origin.y, origin.z) == -1 ||
+            aggregate_push_site(agg, agg->_aggregate, 3U, origin.x, origin.y, origin.z) == -1)
+            return -1;
+        if (aggregate_occupy(agg, origin.x, origin.y, origin.z) == -1) return -1;
     }
     else if (agg->at == LINE) { // set (x=[-att_size/2, att_size/2], y=0, z=0)
         const int ec1 = vector_reserve(agg->_attractor, agg->att_size);
@@ -298,8 +867,10 @@ int aggregate_3d_init_attractor(struct aggregate* agg, size_t n) {
             struct int_triplet attp;
             attp.x = i - (int)(0.5*agg->att_size);
             attp.y = 0; attp.z = 0;
-            vector_push_back(agg->_attractor, &attp, sizeof attp);
-            vector_push_back(agg->_aggregate, &attp, sizeof attp);
+            if (aggregate_push_site(agg, agg->_attractor, 3U, attp.x, attp.y, attp.z) == -1 ||
+                aggregate_push_site(agg, agg->_aggregate, 3U, attp.x, attp.y, attp.z) == -1)
+                return -1;
+            if (aggregate_occupy(agg, attp.x, attp.y, attp.z) == -1) return -1;
         }
     }
     // set (x=[-att_size/2, att_size/2], y=[-att_size/2, att_size/2], z=0)
@@ -315,8 +886,10 @@ int aggregate_3d_init_attractor(struct aggregate* agg, size_t n) {
                 attp.x = i - (int)(0.5*agg->att_size);
                 attp.y = j - (int)(0.5*agg->att_size);
                 attp.z = 0;
-                vector_push_back(agg->_attractor, &attp, sizeof attp);
-                vector_push_back(agg->_aggregate, &attp, sizeof attp);
+                if (aggregate_push_site(agg, agg->_attractor, 3U, attp.x, attp.y, attp.z) == -1 ||
+                    aggregate_push_site(agg, agg->_aggregate, 3U, attp.x, attp.y, attp.z) == -1)
+                    return -1;
+                if (aggregate_occupy(agg, attp.x, attp.y, attp.z) == -1) return -1;
             }
         }
     }
@@ -332,8 +905,10 @@ int aggregate_3d_init_attractor(struct aggregate* agg, size_t n) {
             attp.x = (int)(agg->att_size*cos(theta));
             attp.y = (int)(agg->att_size*sin(theta));
             attp.z = 0;
-            vector_push_back(agg->_attractor, &attp, sizeof attp);
-            vector_push_back(agg->_aggregate, &attp, sizeof attp);
+            if (aggregate_push_site(agg, agg->_attractor, 3U, attp.x, attp.y, attp.z) == -1 ||
+                aggregate_push_site(agg, agg->_aggregate, 3U, attp.x, attp.y, attp.z) == -1)
+                return -1;
+            if (aggregate_occupy(agg, attp.x, attp.y, attp.z) == -1) return -1;
         }
     }
     else if (agg->at == SPHERE) { // set sphere with r = att_size
@@ -349,85 +924,183 @@ int aggregate_3d_init_attractor(struct aggregate* agg, size_t n) {
                 attp.x = (int)(agg->att_size*sin(theta)*cos(phi));
                 attp.y = (int)(agg->att_size*sin(theta)*sin(phi));
                 attp.z = (int)(agg->att_size*cos(theta));
-                vector_push_back(agg->_attractor, &attp, sizeof attp);
-                vector_push_back(agg->_aggregate, &attp, sizeof attp);
+                if (aggregate_push_site(agg, agg->_attractor, 3U, attp.x, attp.y, attp.z) == -1 ||
+                    aggregate_push_site(agg, agg->_aggregate, 3U, attp.x, attp.y, attp.z) == -1)
+                    return -1;
+                if (aggregate_occupy(agg, attp.x, attp.y, attp.z) == -1) return -1;
             }
         }
     }
     return 0;
 }
 
-void aggregate_3d_spawn_bp(const struct aggregate* agg,
+void aggregate_3d_spawn_bp(struct aggregate* agg,
     struct int_triplet* curr) {
-    const double ppr = prand();
+    agg->jump.skip = 0; // the walker is moved away from the cached block
+    if (agg->at == POINT && agg->st == LAUNCH) { // uniformly on launch sphere
+        const double r = launch_radius(agg);
+        const double cos_theta = 2.0*prand(agg) - 1.0;
+        const double sin_theta = sqrt(1.0 - cos_theta*cos_theta);
+        const double phi = 2.0*M_PI*prand(agg);
+        curr->x = (int)lround(r*sin_theta*cos(phi));
+        curr->y = (int)lround(r*sin_theta*sin(phi));
+        curr->z = (int)lround(r*cos_theta);
+        return;
+    }
+    const double ppr = prand(agg);
     if (agg->at == POINT) {
         if (ppr < 1.0/3.0) { // positive/negative z-plane of boundary
-            curr->x = (int)(agg->spawn_diam*(prand() - 0.5));
-            curr->y = (int)(agg->spawn_diam*(prand() - 0.5));
+            curr->x = (int)(agg->spawn_diam*(prand(agg) - 0.5));
+            curr->y = (int)(agg->spawn_diam*(prand(agg) - 0.5));
             curr->z = (ppr < 1.0/6.0) ? (int)(agg->spawn_diam*0.5) : -(int)(agg->spawn_diam*0.5);
         }
         else if (ppr >= 1.0/3.0 && ppr < 2.0/3.0) { // positive/negative x-plane of boundary
             curr->x = (ppr < 0.5) ? (int)(agg->spawn_diam*0.5) : -(int)(agg->spawn_diam*0.5);
-            curr->y = (int)(agg->spawn_diam*(prand() - 0.5));
-            curr->z = (int)(agg->spawn_diam*(prand() - 0.5));
+            curr->y = (int)(agg->spawn_diam*(prand(agg) - 0.5));
+            curr->z = (int)(agg->spawn_diam*(prand(agg) - 0.5));
         }
         else { // positive/negative z-plane of boundary
-            curr->x = (int)(agg->spawn_diam*(prand() - 0.5));
+            curr->x = (int)(agg->spawn_diam*(prand(agg) - 0.5));
             curr->y = (ppr < 5.0/6.0) ? (int)(agg->spawn_diam*0.5) : -(int)(agg->spawn_diam*0.5);
-            curr->z = (int)(agg->spawn_diam*(prand() - 0.5));
+            curr->z = (int)(agg->spawn_diam*(prand(agg) - 0.5));
         }
     }
     else if (agg->at == LINE) {
-        curr->x = 2*(int)(agg->att_size*(prand() - 0.5));
+        curr->x = 2*(int)(agg->att_size*(prand(agg) - 0.5));
         curr->y = (ppr < 0.5) ? (int)agg->spawn_diam : -(int)agg->spawn_diam;
         curr->z = (ppr < 0.5) ? (int)agg->spawn_diam : -(int)agg->spawn_diam;
     }
     else if (agg->at == PLANE) {
-        curr->x = 2*(int)(agg->att_size*(prand() - 0.5));
-        curr->y = 2*(int)(agg->att_size*(prand() - 0.5));
+        curr->x = 2*(int)(agg->att_size*(prand(agg) - 0.5));
+        curr->y = 2*(int)(agg->att_size*(prand(agg) - 0.5));
         curr->z = (ppr < 0.5) ? (int)agg->spawn_diam : - (int)agg->spawn_diam;
     }
 }
 
-void aggregate_3d_update_bp(const struct aggregate* agg,
+void aggregate_3d_update_bp(struct aggregate* agg,
     struct int_triplet* curr) {
-    const double md = prand();
-    if (agg->lt == SQUARE) {
-        if (md < 1.0/6.0) ++(curr->x);
-        else if (md >= 1.0/6.0 && md < 2.0/6.0) --(curr->x);
-        else if (md >= 2.0/6.0 && md < 3.0/6.0) ++(curr->y);
-        else if (md >= 3.0/6.0 && md < 4.0/6.0) --(curr->y);
-        else if (md >= 4.0/6.0 && md < 5.0/6.0) ++(curr->z);
-        else --(curr->z);
-    }
-    else if (agg->lt == TRIANGLE) {
-        if (md < 1.0/8.0) {
-            ++(curr->x);
-            ++(curr->y);
-        }
-        else if (md >= 1.0/8.0 && md < 2.0/8.0) {
-            ++(curr->x);
-            --(curr->y);
+    const int* move = (agg->lt == SQUARE)
+        ? moves_3d_square[rng_index(&agg->rng, 6U)]
+        : moves_3d_triangle[rng_index(&agg->rng, 8U)];
+    curr->x += move[0];
+    curr->y += move[1];
+    curr->z += move[2];
+}
+
+size_t aggregate_3d_jump_bp(struct aggregate* agg,
+                            struct int_triplet* curr) {
+    struct jump_cache* jc = &agg->jump;
+    const int epsilon = 2;
+    int max_radius = INT_MAX;
+    if (agg->st != LAUNCH || agg->at != POINT) {
+        int bnd_dist;
+        if (agg->at == LINE || agg->at == PLANE) {
+            const int dx = 2*(int)agg->att_size - abs(curr->x);
+            const int dy = (agg->at == LINE) ? (int)agg->spawn_diam + epsilon - abs(curr->y)
+                : 2*(int)agg->att_size - abs(curr->y);
+            const int dz = (int)agg->spawn_diam + epsilon - abs(curr->z);
+            bnd_dist = dx < dy ? dx : dy;
+            if (dz < bnd_dist) bnd_dist = dz;
         }
-        else if (md >= 2.0/8.0 && md < 3.0/8.0) {
-            --(curr->x);
-            --(curr->y);
+        else {
+            const int bnd_absmax = (int)(agg->spawn_diam*0.5) + epsilon;
+            int reach = abs(curr->x) > abs(curr->y) ? abs(curr->x) : abs(curr->y);
+            if (abs(curr->z) > reach) reach = abs(curr->z);
+            bnd_dist = bnd_absmax - reach;
         }
-        else if (md >= 3.0/8.0 && md < 4.0/8.0) {
-            --(curr->x);
-            ++(curr->y);
+        max_radius = bnd_dist - 1;
+    }
+    if (jump_capped(jc, max_radius, 3U)) return 0U;
+    if (jump_cache_hit(jc, curr->x, curr->y, curr->z, 3U)) return 0U;
+    int radius = 0;
+    for (size_t l = 0U; l < AGGREGATE_JUMP_LEVELS && radius < max_radius; ++l) {
+        const int shift = AGGREGATE_JUMP_MIN_SHIFT + (int)l;
+        const int cx = curr->x >> shift;
+        const int cy = curr->y >> shift;
+        const int cz = curr->z >> shift;
+        bool empty = true;
+        for (int dx = -1; dx <= 1 && empty; ++dx)
+            for (int dy = -1; dy <= 1 && empty; ++dy)
+                for (int dz = -1; dz <= 1 && empty; ++dz) {
+                    PROFILE_COUNT(agg, occupancy_tests, 1U);
+                    if (occupancy_test(agg->_coarse[l], cx + dx, cy + dy, cz + dz)) {
+                        empty = false;
+                        jc->block.x = cx + dx;
+                        jc->block.y = cy + dy;
+                        jc->block.z = cz + dz;
+                    }
+                }
+        if (!empty) {
+            if (l == 0U) {
+                jc->valid = true;
+                jump_cache_hit(jc, curr->x, curr->y, curr->z, 3U);
+            }
+            break;
         }
-        else if (md >= 4.0/8.0 && md < 5.0/8.0) ++(curr->x);
-        else if (md >= 5.0/8.0 && md < 6.0/8.0) --(curr->x);
-        else if (md >= 6.0/8.0 && md < 7.0/8.0) ++(curr->z);
-        else --(curr->z);
+        radius = (1 << shift) - 1;
     }
+    if (radius > max_radius) radius = max_radius;
+    if (radius < 2) return 0U;
+    const double cos_theta = 2.0*prand(agg) - 1.0;
+    const double sin_theta = sqrt(1.0 - cos_theta*cos_theta);
+    const double phi = 2.0*M_PI*prand(agg);
+    curr->x += (int)lround(radius*sin_theta*cos(phi));
+    curr->y += (int)lround(radius*sin_theta*sin(phi));
+    curr->z += (int)lround(radius*cos_theta);
+    return (size_t)lround(radius*radius/mean_sqd_step[1][agg->lt]);
 }
 
-bool aggregate_3d_lattice_collision(const struct aggregate* agg,
+bool aggregate_3d_lattice_collision(struct aggregate* agg,
     struct int_triplet* curr,
     const struct int_triplet* prev) {
     const int epsilon = 2;
+    if (agg->at == POINT && agg->st == LAUNCH) {
+        const double r_sqd = (double)curr->x*curr->x + (double)curr->y*curr->y
+            + (double)curr->z*curr->z;
+        const double r_launch = launch_radius(agg);
+        const double r_kill = kill_radius(agg, r_launch);
+        if (r_sqd > r_kill*r_kill) {
+            const double r = sqrt(r_sqd);
+            // a walker at radius r returns to the launch sphere with probability
+            // r_launch/r, otherwise it escapes and is replaced by a fresh walker
+            PROFILE_COUNT(agg, reflections, 1U);
+            if (prand(agg) >= r_launch/r) {
+                aggregate_3d_spawn_bp(agg, curr);
+                return true;
+            }
+            // polar angle of first return relative to the walker direction,
+            // sampled by inverting the CDF of the exterior Poisson kernel
+            const double a = r_sqd + r_launch*r_launch;
+            const double b = 2.0*r*r_launch;
+            const double q = 1.0/(r + r_launch)
+                + prand(agg)*(1.0/(r - r_launch) - 1.0/(r + r_launch));
+            double cos_gamma = (a - 1.0/(q*q))/b;
+            if (cos_gamma > 1.0) cos_gamma = 1.0;
+            else if (cos_gamma < -1.0) cos_gamma = -1.0;
+            const double sin_gamma = sqrt(1.0 - cos_gamma*cos_gamma);
+            const double psi = 2.0*M_PI*prand(agg);
+            // orthonormal basis (n, e1, e2) with n along the walker position
+            const double n[3] = {curr->x/r, curr->y/r, curr->z/r};
+            double e1[3];
+            if (fabs(n[0]) < 0.9) { e1[0] = 0.0; e1[1] = n[2]; e1[2] = -n[1]; }
+            else { e1[0] = -n[2]; e1[1] = 0.0; e1[2] = n[0]; }
+            const double e1_norm = sqrt(e1[0]*e1[0] + e1[1]*e1[1] + e1[2]*e1[2]);
+            for (int i = 0; i < 3; ++i) e1[i] /= e1_norm;
+            const double e2[3] = {n[1]*e1[2] - n[2]*e1[1],
+                                  n[2]*e1[0] - n[0]*e1[2],
+                                  n[0]*e1[1] - n[1]*e1[0]};
+            double pos[3];
+            for (int i = 0; i < 3; ++i)
+                pos[i] = r_launch*(cos_gamma*n[i]
+                    + sin_gamma*(cos(psi)*e1[i] + sin(psi)*e2[i]));
+            curr->x = (int)lround(pos[0]);
+            curr->y = (int)lround(pos[1]);
+            curr->z = (int)lround(pos[2]);
+            agg->jump.skip = 0;
+            return true;
+        }
+        return false;
+    }
     if (agg->at == POINT || agg->at == CIRCLE || agg->at == SPHERE) {
         const int bnd_absmax = (int)(agg->spawn_diam*0.5) + epsilon;
         if (abs(curr->x) > bnd_absmax || abs(curr->y) > bnd_absmax
@@ -435,6 +1108,7 @@ bool aggregate_3d_lattice_collision(const struct aggregate* agg,
             curr->x = prev->x;
             curr->y = prev->y;
             curr->z = prev->z;
+            PROFILE_COUNT(agg, reflections, 1U);
             return true;
         }
     }
@@ -445,6 +1119,7 @@ bool aggregate_3d_lattice_collision(const struct aggregate* agg,
             curr->x = prev->x;
             curr->y = prev->y;
             curr->z = prev->z;
+            PROFILE_COUNT(agg, reflections, 1U);
             return true;
         }
     }
@@ -455,75 +1130,112 @@ bool aggregate_3d_lattice_collision(const struct aggregate* agg,
             curr->x = prev->x;
             curr->y = prev->y;
             curr->z = prev->z;
+            PROFILE_COUNT(agg, reflections, 1U);
             return true;
         }
     }
     return false;
 }
 
-bool aggregate_3d_collision(struct aggregate* agg,
-    struct int_triplet* curr,
-    struct int_triplet* prev) {
-    if (prand() > agg->stickiness) return false;
-    for (size_t i = 0U; i < vector_size(agg->_aggregate); ++i) {
-        const struct int_triplet* aggp = (struct int_triplet*)vector_at(agg->_aggregate, i);
-        if (curr->x == aggp->x && curr->y == aggp->y && curr->z == aggp->z) {
-            vector_push_back(agg->_aggregate, prev, sizeof *prev);
-            if (abs(prev->x) > agg->max_x) agg->max_x = abs(prev->x);
-            if (abs(prev->y) > agg->max_y) agg->max_y = abs(prev->y);
-            bool expand_spawn_plane = false;
-            if (abs(prev->z) > agg->max_z) { 
-                agg->max_z = abs(prev->z);
-                expand_spawn_plane = true;
-            }
-            // expand spawning region if necessary
-            if (agg->at == POINT) {
-                double rsqd = prev->x*prev->x + prev->y*prev->y + prev->z*prev->z;
-                if (rsqd > agg->max_r_sqd) {
-                    agg->max_r_sqd = rsqd;
-                    agg->spawn_diam = 2*(int)(sqrt(rsqd)) + agg->b_offset;
-                }
-            }
-            else if (agg->at == PLANE && expand_spawn_plane)
-                agg->spawn_diam = prev->z + agg->b_offset;
-            return true;
+int aggregate_3d_stick(struct aggregate* agg,
+                       const struct int_triplet* prev) {
+    if (aggregate_push_site(agg, agg->_aggregate, 3U, prev->x, prev->y, prev->z) == -1 ||
+        aggregate_occupy(agg, prev->x, prev->y, prev->z) == -1) return -1;
+    if (abs(prev->x) > agg->max_x) agg->max_x = abs(prev->x);
+    if (abs(prev->y) > agg->max_y) agg->max_y = abs(prev->y);
+    bool expand_spawn_plane = false;
+    if (abs(prev->z) > agg->max_z) {
+        agg->max_z = abs(prev->z);
+        expand_spawn_plane = true;
+    }
+    // expand spawning region if necessary
+    if (agg->at == POINT) {
+        double rsqd = prev->x*prev->x + prev->y*prev->y + prev->z*prev->z;
+        if (rsqd > agg->max_r_sqd) {
+            agg->max_r_sqd = rsqd;
+            agg->spawn_diam = 2*(int)(sqrt(rsqd)) + agg->b_offset;
         }
     }
-    return false;
+    else if (agg->at == PLANE && expand_spawn_plane)
+        agg->spawn_diam = abs(prev->z) + agg->b_offset;
+    return 0;
 }
 
-int aggregate_3d_generate(struct aggregate* agg, size_t n, bool disp_prog) {
-    if (aggregate_reserve(agg, n) == -1 ||
-        aggregate_3d_init_attractor(agg, n) == -1) return -1;
+int aggregate_3d_collision(struct aggregate* agg,
+    struct int_triplet* curr,
+    struct int_triplet* prev) {
+    if (!occupancy_test(agg->_occupancy, curr->x, curr->y, curr->z)) return 0;
+    if (!rng_chance(&agg->rng, agg->stickiness)) return 0;
+    return (aggregate_3d_stick(agg, prev) == -1) ? -1 : 1;
+}
+
+// walks until `k` more particles have stuck or `max_steps` walker updates
+// have been taken (0 for no limit), the walker is resumed on the next call
+int aggregate_3d_advance(struct aggregate* agg, size_t k, size_t max_steps,
+                         size_t* nstuck) {
+    struct walker* wlk = &agg->_walker;
     struct int_triplet curr;
     struct int_triplet prev;
-    size_t steps_to_stick = 0U;
-    size_t bcolls = 0U;
+    curr.x = wlk->pos.x;
+    curr.y = wlk->pos.y;
+    curr.z = wlk->pos.z;
     size_t count = 0U;
-    bool has_next_spawned = false;
-    while (count < n) {
-        if (!has_next_spawned) {
+    size_t nsteps = 0U;
+    int retval = 0;
+    while (count < k && (!max_steps || nsteps < max_steps)) {
+        if (!wlk->spawned) {
+            PROFILE_START(t_spawn);
             aggregate_3d_spawn_bp(agg, &curr);
-            has_next_spawned = true;
+            PROFILE_STOP(agg, PROFILE_SPAWN, t_spawn);
+            PROFILE_COUNT(agg, spawns, 1U);
+            wlk->spawned = true;
         }
         prev.x = curr.x;
         prev.y = curr.y;
         prev.z = curr.z;
-        aggregate_3d_update_bp(agg, &curr);
-        if (aggregate_3d_lattice_collision(agg, &curr, &prev)) ++bcolls;
-        ++steps_to_stick;
-        if (aggregate_3d_collision(agg, &curr, &prev)) {
-            vector_push_back(agg->_rsteps, &steps_to_stick, sizeof steps_to_stick);
-            vector_push_back(agg->_bcolls, &bcolls, sizeof bcolls);
-            steps_to_stick = 0U;
-            bcolls = 0U;
-            ++count;
-            if (disp_prog) {
-                printf("\rProgress: %d%%", (int)(100*(double)count/(double)n));
-                fflush(stdout);
+        PROFILE_START(t_walk);
+        const size_t jsteps = (agg->engine == LONG_JUMP) ? aggregate_3d_jump(agg, &curr) : 0U;
+        if (jsteps) wlk->steps += jsteps;
+        else {
+            aggregate_3d_update_bp(agg, &curr);
+            ++(wlk->steps);
+        }
+        ++nsteps;
+        PROFILE_STOP(agg, PROFILE_WALK, t_walk);
+        PROFILE_COUNT(agg, steps, 1U);
+        PROFILE_COUNT(agg, jumps, jsteps != 0U);
+        PROFILE_START(t_boundary);
+        if (aggregate_3d_lattice_collision(agg, &curr, &prev)) ++(wlk->bcolls);
+        PROFILE_STOP(agg, PROFILE_BOUNDARY, t_boundary);
+        PROFILE_START(t_collision);
+        PROFILE_COUNT(agg, occupancy_tests, 1U);
+        const bool contact = occupancy_test(agg->_occupancy, curr.x, curr.y, curr.z);
+        const bool stick = contact && rng_chance(&agg->rng, agg->stickiness);
+        PROFILE_STOP(agg, PROFILE_COLLISION, t_collision);
+        PROFILE_COUNT(agg, rejected_sticks, contact && !stick);
+        if (stick) {
+            PROFILE_START(t_stick);
+            if (aggregate_3d_stick(agg, &prev) == -1 ||
+                aggregate_push_stats(agg, wlk->steps, wlk->bcolls) == -1) {
+                retval = -1;
+                break;
             }
-            has_next_spawned = false;
+            PROFILE_STOP(agg, PROFILE_STICK, t_stick);
+            wlk->steps = 0U;
+            wlk->bcolls = 0U;
+            wlk->spawned = false;
+            ++count;
         }
     }
-    return 0;
+    wlk->pos.x = curr.x;
+    wlk->pos.y = curr.y;
+    wlk->pos.z = curr.z;
+    if (nstuck) *nstuck = count;
+    return retval;
+}
+
+int aggregate_3d_generate(struct aggregate* agg, size_t n, bool disp_prog) {
+    if (aggregate_reserve(agg, n) == -1 ||
+        aggregate_3d_init_attractor(agg, n) == -1) return -1;
+    return aggregate_generate_controlled(agg, n, disp_prog, aggregate_3d_advance);
 }
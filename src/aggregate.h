@@ -1,11 +1,22 @@
 #ifndef AGGREGATE_H_
 #define AGGREGATE_H_
 
+#include "occupancy.h"
+#include "profile.h"
+#include "progress.h"
+#include "rng.h"
+#include "stats.h"
+#include "stop.h"
 #include "vector.h"
+#include <limits.h>
 #include <math.h>
 #include <stdio.h>
 #include <time.h>
 
+#define AGGREGATE_JUMP_LEVELS 7 /**< Number of coarse occupancy levels used by `LONG_JUMP`. */
+#define AGGREGATE_JUMP_MIN_SHIFT 3 /**< Block size of the finest coarse level is `1 << 3`. */
+#define AGGREGATE_KILL_MIN_MARGIN 2.0 /**< Least distance, in sites, of the kill radius beyond the launch radius. */
+
 enum lattice_type {
     SQUARE,
     TRIANGLE
@@ -19,6 +30,16 @@ enum attractor_type {
     PLANE
 };
 
+enum spawn_type {
+    BOX,
+    LAUNCH
+};
+
+enum walk_engine {
+    UNIT_STEP,
+    LONG_JUMP
+};
+
 struct int_pair {
     int x;
     int y;
@@ -30,11 +51,35 @@ struct int_triplet {
     int z;
 };
 
+struct walker {
+    struct int_triplet pos; /**< Current position of walker, `z` unused in 2D. */
+    size_t steps; /**< Lattice steps taken by walker since spawning. */
+    size_t bcolls; /**< Lattice boundary collisions of walker since spawning. */
+    bool spawned; /**< Whether the walker has been spawned onto the lattice. */
+};
+
+/**
+ * \brief State of `LONG_JUMP` carried between updates of a walker. The
+ *        occupied block of the finest coarse level last found around a walker
+ *        rules out a jump for as long as the walker stays in its neighbourhood,
+ *        since occupied blocks never become free, as does proximity to the
+ *        reflecting boundary. Rather than probing the coarse levels on every
+ *        update, the updates a walker typically takes to get clear of these
+ *        are skipped.
+ */
+struct jump_cache {
+    struct int_triplet block; /**< Co-ordinates of the occupied block, `z` unused in 2D. */
+    bool valid; /**< Whether `block` has been set. */
+    int skip; /**< Walker updates left to take before probing for a jump again. */
+};
+
 struct aggregate {
     struct vector* _aggregate; /**< Aggregate particle co-ordinates. */
     struct vector* _attractor; /**< Attractor particle co-ordinates. */
     struct vector* _bcolls; /**< Lattice boundary collisions beffore stick for each particle. */
     struct vector* _rsteps; /**< Required steps until stick for each particle. */
+    struct occupancy* _occupancy; /**< Occupancy lattice of aggregate particle sites. */
+    struct occupancy* _coarse[AGGREGATE_JUMP_LEVELS]; /**< Coarse occupancy levels, block size doubling per level. */
     double stickiness; /**< Probability of a particle sticking to the aggregate. */
     size_t max_x; /**< Maximum extent of aggregate in x-direction. */
     size_t max_y; /**< Maximum extent of aggregate in y-direction. */
@@ -45,6 +90,18 @@ struct aggregate {
     size_t att_size; /**< Number of particles in attractor. */
     enum lattice_type lt; /**< Type of lattice to generate aggregate upon. */
     enum attractor_type at; /**< Type of initial attractor geometry. */
+    enum spawn_type st; /**< Spawning scheme for random-walking particles. */
+    double kill_ratio; /**< Ratio of kill radius to launch radius for `LAUNCH` spawning. */
+    enum walk_engine engine; /**< Random walk engine used for particle updates. */
+    uint64_t seed; /**< Seed of the aggregate's pseudo-random number generator. */
+    struct rng rng; /**< Pseudo-random number generator state of the aggregate. */
+    struct walker _walker; /**< Random-walking particle, persisted between calls. */
+    bool record_stats; /**< Whether required steps and boundary collisions are recorded. */
+    struct running_stats* _stats; /**< Statistics maintained incrementally during generation. */
+    struct profile* _profile; /**< Hot-path counters and timers, `NULL` unless built with `DROPLET_PROFILE`. */
+    struct progress progress; /**< Progress reporting of generation. */
+    struct stop_conditions stop; /**< Limits and cancellation of generation. */
+    struct jump_cache jump; /**< State of `LONG_JUMP` carried between updates of the walker. */
 };
 
 struct aggregate* aggregate_alloc(void);
@@ -62,36 +119,116 @@ int aggregate_3d_init(struct aggregate* agg,
 
 void aggregate_free_fields(struct aggregate* agg);
 
+void aggregate_seed(struct aggregate* agg, uint64_t seed);
+
 int aggregate_reserve(struct aggregate* agg, size_t n);
 
+int aggregate_set_storage(struct aggregate* agg, size_t dims, bool compact,
+                          size_t stat_bytes);
+
+int aggregate_push_stats(struct aggregate* agg, size_t steps, size_t bcolls);
+
+void aggregate_rebuild_stats(struct aggregate* agg, size_t dims);
+
+int aggregate_set_occupancy(struct aggregate* agg, size_t dims,
+                            enum occupancy_type type);
+
+void aggregate_set_progress(struct aggregate* agg, progress_fn fn, void* data,
+                            size_t every, double interval_ms);
+
+void aggregate_report_progress(struct aggregate* agg, struct progress_state* st,
+                               size_t count);
+
+void aggregate_set_stop(struct aggregate* agg, double max_r_sqd, double max_ms,
+                        double max_steps);
+
+void aggregate_cancel(struct aggregate* agg);
+
+double aggregate_steps_taken(const struct aggregate* agg);
+
+void aggregate_finish_stop(struct aggregate* agg, enum stop_reason reason);
+
+int aggregate_2d_rebuild_occupancy(struct aggregate* agg);
+int aggregate_3d_rebuild_occupancy(struct aggregate* agg);
+
 int aggregate_2d_init_attractor(struct aggregate* agg, size_t n);
 int aggregate_3d_init_attractor(struct aggregate* agg, size_t n);
 
-void aggregate_2d_spawn_bp(const struct aggregate* agg,
+void aggregate_2d_spawn_bp(struct aggregate* agg,
                            struct int_pair* curr);
-void aggregate_3d_spawn_bp(const struct aggregate* agg,
+void aggregate_3d_spawn_bp(struct aggregate* agg,
                            struct int_triplet* curr);
 
-void aggregate_2d_update_bp(const struct aggregate* agg, 
+void aggregate_2d_update_bp(struct aggregate* agg, 
+                            struct int_pair* curr);
+void aggregate_3d_update_bp(struct aggregate* agg,
+                            struct int_triplet* curr);
+
+size_t aggregate_2d_jump_bp(struct aggregate* agg,
                             struct int_pair* curr);
-void aggregate_3d_update_bp(const struct aggregate* agg,
+size_t aggregate_3d_jump_bp(struct aggregate* agg,
                             struct int_triplet* curr);
 
-bool aggregate_2d_lattice_collision(const struct aggregate* agg,
+/**
+ * \brief Advances a walker by a long jump with `aggregate_2d_jump_bp`, unless
+ *        updates are left to skip before probing for a jump again, in which
+ *        case the update costs no call.
+ * \return Equivalent number of lattice steps of the jump, zero if none.
+ */
+static inline size_t aggregate_2d_jump(struct aggregate* agg, struct int_pair* curr) {
+    if (agg->jump.skip > 0) {
+        --(agg->jump.skip);
+        return 0U;
+    }
+    return aggregate_2d_jump_bp(agg, curr);
+}
+static inline size_t aggregate_3d_jump(struct aggregate* agg, struct int_triplet* curr) {
+    if (agg->jump.skip > 0) {
+        --(agg->jump.skip);
+        return 0U;
+    }
+    return aggregate_3d_jump_bp(agg, curr);
+}
+
+bool aggregate_2d_lattice_collision(struct aggregate* agg,
                                     struct int_pair* curr,
                                     const struct int_pair* prev);
-bool aggregate_3d_lattice_collision(const struct aggregate* agg,
+bool aggregate_3d_lattice_collision(struct aggregate* agg,
                                     struct int_triplet* curr,
                                     const struct int_triplet* prev);
 
-bool aggregate_2d_collision(struct aggregate* agg,
-                            struct int_pair* curr,
-                            struct int_pair* prev);
-bool aggregate_3d_collision(struct aggregate* agg,
-                            struct int_triplet* curr,
-                            struct int_triplet* prev);
+int aggregate_2d_stick(struct aggregate* agg,
+                       const struct int_pair* prev);
+int aggregate_3d_stick(struct aggregate* agg,
+                       const struct int_triplet* prev);
+
+/**
+ * \brief Sticks the walker at `prev` to the aggregate, with probability
+ *        `stickiness`, if `curr` is an occupied site.
+ * \return 1 if the walker stuck, 0 if not and -1 if a vector or occupancy
+ *         allocation failure occurred while storing the particle.
+ */
+int aggregate_2d_collision(struct aggregate* agg,
+                           struct int_pair* curr,
+                           struct int_pair* prev);
+/**
+ * \brief As `aggregate_2d_collision` for 3D aggregates.
+ */
+int aggregate_3d_collision(struct aggregate* agg,
+                           struct int_triplet* curr,
+                           struct int_triplet* prev);
+
+int aggregate_2d_advance(struct aggregate* agg, size_t k, size_t max_steps,
+                         size_t* nstuck);
+int aggregate_3d_advance(struct aggregate* agg, size_t k, size_t max_steps,
+                         size_t* nstuck);
 
 int aggregate_2d_generate(struct aggregate* agg, size_t n, bool disp_prog);
 int aggregate_3d_generate(struct aggregate* agg, size_t n, bool disp_prog);
 
+int aggregate_2d_generate_parallel(struct aggregate* agg, size_t n, size_t nthreads,
+                                   size_t nwalkers, bool deterministic, bool disp_prog);
+int aggregate_3d_generate_parallel(struct aggregate* agg, size_t n, size_t nthreads,
+                                   size_t nwalkers, bool deterministic, bool disp_prog);
+
 #endif // !AGGREGATE_H_
\ No newline at end of file
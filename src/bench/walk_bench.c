@@ -0,0 +1,114 @@
+/**
+ * \file walk_bench.c
+ * \brief Microbenchmark of the random-walk step update. Compares the original
+ *        update, which drew a full `double` from libc `rand()` per step and
+ *        selected a direction through a ladder of float comparisons, with the
+ *        current update, which draws a few bits from the aggregate's buffered
+ *        generator and indexes a table of lattice offsets.
+ *
+ *        Build and run from `src/` with `make bench`. An optional argument
+ *        sets the number of steps timed per case (default 50000000).
+ */
+
+#include "../aggregate.h"
+
+static inline double legacy_prand(void) { return (double)rand()/(double)RAND_MAX; }
+
+static void legacy_2d_update_bp(const struct aggregate* agg,
+                                struct int_pair* curr) {
+    const double md = legacy_prand();
+    if (agg->lt == SQUARE) {
+        if (md < 0.25) ++(curr->x);
+        else if (md >= 0.25 && md < 0.5) --(curr->x);
+        else if (md >= 0.5 && md < 0.75) ++(curr->y);
+        else --(curr->y);
+    }
+    else if (agg->lt == TRIANGLE) {
+        if (md < 1.0/6.0) ++(curr->x);
+        else if (md >= 1.0/6.0 && md < 2.0/6.0) --(curr->x);
+        else if (md >= 2.0/6.0 && md < 3.0/6.0) { ++(curr->x); ++(curr->y); }
+        else if (md >= 3.0/6.0 && md < 4.0/6.0) { ++(curr->x); --(curr->y); }
+        else if (md >= 4.0/6.0 && md < 5.0/6.0) { --(curr->x); ++(curr->y); }
+        else { --(curr->x); --(curr->y); }
+    }
+}
+
+static void legacy_3d_update_bp(const struct aggregate* agg,
+                                struct int_triplet* curr) {
+    const double md = legacy_prand();
+    if (agg->lt == SQUARE) {
+        if (md < 1.0/6.0) ++(curr->x);
+        else if (md >= 1.0/6.0 && md < 2.0/6.0) --(curr->x);
+        else if (md >= 2.0/6.0 && md < 3.0/6.0) ++(curr->y);
+        else if (md >= 3.0/6.0 && md < 4.0/6.0) --(curr->y);
+        else if (md >= 4.0/6.0 && md < 5.0/6.0) ++(curr->z);
+        else --(curr->z);
+    }
+    else if (agg->lt == TRIANGLE) {
+        if (md < 1.0/8.0) { ++(curr->x); ++(curr->y); }
+        else if (md >= 1.0/8.0 && md < 2.0/8.0) { ++(curr->x); --(curr->y); }
+        else if (md >= 2.0/8.0 && md < 3.0/8.0) { --(curr->x); --(curr->y); }
+        else if (md >= 3.0/8.0 && md < 4.0/8.0) { --(curr->x); ++(curr->y); }
+        else if (md >= 4.0/8.0 && md < 5.0/8.0) ++(curr->x);
+        else if (md >= 5.0/8.0 && md < 6.0/8.0) --(curr->x);
+        else if (md >= 6.0/8.0 && md < 7.0/8.0) ++(curr->z);
+        else --(curr->z);
+    }
+}
+
+static double elapsed(const struct timespec* start) {
+    struct timespec end;
+    clock_gettime(CLOCK_MONOTONIC, &end);
+    return (double)(end.tv_sec - start->tv_sec) + 1e-9*(end.tv_nsec - start->tv_nsec);
+}
+
+static void bench_2d(enum lattice_type lt, const char* name, size_t nsteps) {
+    struct aggregate* agg = aggregate_alloc();
+    aggregate_2d_init(agg, 1.0, lt, POINT);
+    aggregate_seed(agg, 1U);
+    srand(1U);
+    struct int_pair curr = {0, 0};
+    struct timespec start;
+    clock_gettime(CLOCK_MONOTONIC, &start);
+    for (size_t i = 0U; i < nsteps; ++i) legacy_2d_update_bp(agg, &curr);
+    const double t_before = elapsed(&start);
+    long checksum = curr.x + curr.y;
+    curr.x = 0; curr.y = 0;
+    clock_gettime(CLOCK_MONOTONIC, &start);
+    for (size_t i = 0U; i < nsteps; ++i) aggregate_2d_update_bp(agg, &curr);
+    const double t_after = elapsed(&start);
+    checksum += curr.x + curr.y;
+    printf("2D %-8s before: %8.2f Msteps/s  after: %8.2f Msteps/s  speedup: %5.2fx  [%ld]\n",
+           name, 1e-6*nsteps/t_before, 1e-6*nsteps/t_after, t_before/t_after, checksum);
+    aggregate_free(agg);
+}
+
+static void bench_3d(enum lattice_type lt, const char* name, size_t nsteps) {
+    struct aggregate* agg = aggregate_alloc();
+    aggregate_3d_init(agg, 1.0, lt, POINT);
+    aggregate_seed(agg, 1U);
+    srand(1U);
+    struct int_triplet curr = {0, 0, 0};
+    struct timespec start;
+    clock_gettime(CLOCK_MONOTONIC, &start);
+    for (size_t i = 0U; i < nsteps; ++i) legacy_3d_update_bp(agg, &curr);
+    const double t_before = elapsed(&start);
+    long checksum = curr.x + curr.y + curr.z;
+    curr.x = 0; curr.y = 0; curr.z = 0;
+    clock_gettime(CLOCK_MONOTONIC, &start);
+    for (size_t i = 0U; i < nsteps; ++i) aggregate_3d_update_bp(agg, &curr);
+    const double t_after = elapsed(&start);
+    checksum += curr.x + curr.y + curr.z;
+    printf("3D %-8s before: %8.2f Msteps/s  after: %8.2f Msteps/s  speedup: %5.2fx  [%ld]\n",
+           name, 1e-6*nsteps/t_before, 1e-6*nsteps/t_after, t_before/t_after, checksum);
+    aggregate_free(agg);
+}
+
+int main(int argc, char** argv) {
+    const size_t nsteps = (argc > 1) ? strtoull(argv[1], NULL, 10) : 50000000U;
+    bench_2d(SQUARE, "SQUARE", nsteps);
+    bench_2d(TRIANGLE, "TRIANGLE", nsteps);
+    bench_3d(SQUARE, "SQUARE", nsteps);
+    bench_3d(TRIANGLE, "TRIANGLE", nsteps);
+    return 0;
+}
@@ -0,0 +1,191 @@
+/**
+ * \file occupancy.c
+ * \brief Contains the implementation of all functions declared in
+ *        occupancy.h.
+ */
+
+#include "occupancy.h"
+
+/**
+ * \brief Computes the number of 64-bit words required to store a lattice
+ *        of `side` sites along each of `dims` axes. To be used only
+ *        internally by the occupancy.
+ */
+static size_t private_occupancy_nwords(size_t dims, size_t side) {
+    size_t nsites = side*side;
+    if (dims == 3U) nsites *= side;
+    return (nsites + 63U)/64U;
+}
+
+struct occupancy* occupancy_alloc(size_t dims, size_t half) {
+    struct occupancy* occ = malloc(sizeof(struct occupancy));
+    if (!occ) return occ;
+    if (half < 1U) half = 1U;
+    occ->dims = dims;
+    occ->half = half;
+    occ->side = 2U*half;
+    occ->nwords = private_occupancy_nwords(dims, occ->side);
+    occ->type = DENSE;
+    occ->keys = (uint64_t*)NULL;
+    occ->slots = (size_t*)NULL;
+    occ->table_cap = 0U;
+    occ->nbricks = 0U;
+    occ->brick_cap = 0U;
+    occ->brick_words = 0U;
+    occ->bits = calloc(occ->nwords, sizeof(uint64_t));
+    if (!(occ->bits)) { free(occ); occ = (struct occupancy*)NULL; }
+    return occ;
+}
+
+struct occupancy* occupancy_alloc_sparse(size_t dims) {
+    struct occupancy* occ = malloc(sizeof(struct occupancy));
+    if (!occ) return occ;
+    occ->dims = dims;
+    // representable extent of the packed brick keys
+    occ->half = (size_t)1U << (OCCUPANCY_BRICK_BITS - 1 + OCCUPANCY_BRICK_SHIFT);
+    occ->side = 2U*occ->half;
+    occ->nwords = 0U;
+    occ->type = SPARSE;
+    occ->table_cap = 64U;
+    occ->nbricks = 0U;
+    occ->brick_cap = 16U;
+    size_t nsites = (size_t)1U << 2*OCCUPANCY_BRICK_SHIFT;
+    if (dims == 3U) nsites <<= OCCUPANCY_BRICK_SHIFT;
+    occ->brick_words = nsites/64U;
+    occ->keys = calloc(occ->table_cap, sizeof(uint64_t));
+    occ->slots = malloc(occ->table_cap*sizeof(size_t));
+    occ->bits = malloc(occ->brick_cap*occ->brick_words*sizeof(uint64_t));
+    if (!(occ->keys) || !(occ->slots) || !(occ->bits)) {
+        occupancy_free(occ);
+        occ = (struct occupancy*)NULL;
+    }
+    return occ;
+}
+
+void occupancy_free(struct occupancy* occ) {
+    free(occ->bits);
+    free(occ->keys);
+    free(occ->slots);
+    free(occ);
+}
+
+size_t occupancy_nbytes(const struct occupancy* occ) {
+    if (occ->type == DENSE) return occ->nwords*sizeof(uint64_t);
+    return occ->brick_cap*occ->brick_words*sizeof(uint64_t)
+        + occ->table_cap*(sizeof(uint64_t) + sizeof(size_t));
+}
+
+/**
+ * \brief Doubles the number of slots of the hash table of a sparse occupancy,
+ *        re-inserting every brick. To be used only internally by the occupancy.
+ */
+static int private_occupancy_rehash(struct occupancy* occ) {
+    const size_t ncap = 2U*occ->table_cap;
+    uint64_t* nkeys = calloc(ncap, sizeof(uint64_t));
+    size_t* nslots = malloc(ncap*sizeof(size_t));
+    if (!nkeys || !nslots) { free(nkeys); free(nslots); return -1; }
+    uint64_t* okeys = occ->keys;
+    size_t* oslots = occ->slots;
+    const size_t ocap = occ->table_cap;
+    occ->keys = nkeys;
+    occ->slots = nslots;
+    occ->table_cap = ncap;
+    for (size_t i = 0U; i < ocap; ++i) {
+        if (!okeys[i]) continue;
+        size_t slot = occupancy_brick_slot(occ, okeys[i]);
+        while (nkeys[slot]) slot = (slot + 1U) & (ncap - 1U);
+        nkeys[slot] = okeys[i];
+        nslots[slot] = oslots[i];
+    }
+    free(okeys);
+    free(oslots);
+    return 0;
+}
+
+/**
+ * \brief Returns the brick of a sparse occupancy containing the site
+ *        `(x, y, z)`, allocating an empty brick if none exists. To be used
+ *        only internally by the occupancy.
+ */
+static uint64_t* private_occupancy_brick(struct occupancy* occ, int x, int y, int z) {
+    const uint64_t key = occupancy_brick_key(occ, x, y, z);
+    size_t slot = occupancy_brick_slot(occ, key);
+    while (occ->keys[slot]) {
+        if (occ->keys[slot] == key) return occ->bits + occ->slots[slot]*occ->brick_words;
+        slot = (slot + 1U) & (occ->table_cap - 1U);
+    }
+    // keep the load factor of the hash table at most one half
+    if (2U*(occ->nbricks + 1U) > occ->table_cap) {
+        if (private_occupancy_rehash(occ) == -1) return (uint64_t*)NULL;
+        slot = occupancy_brick_slot(occ, key);
+        while (occ->keys[slot]) slot = (slot + 1U) & (occ->table_cap - 1U);
+    }
+    if (occ->nbricks == occ->brick_cap) {
+        uint64_t* nbits = realloc(occ->bits, 2U*occ->brick_cap*occ->brick_words*sizeof(uint64_t));
+        if (!nbits) return (uint64_t*)NULL;
+        occ->bits = nbits;
+        occ->brick_cap *= 2U;
+    }
+    uint64_t* brick = occ->bits + occ->nbricks*occ->brick_words;
+    memset(brick, 0, occ->brick_words*sizeof(uint64_t));
+    occ->keys[slot] = key;
+    occ->slots[slot] = occ->nbricks++;
+    occ->nwords += occ->brick_words;
+    return brick;
+}
+
+int occupancy_reserve(struct occupancy* occ, size_t half) {
+    if (occ->type == SPARSE || half <= occ->half) return OCCUPANCY_GROW_PASS;
+    size_t nhalf = occ->half;
+    while (nhalf < half) nhalf *= 2U;
+    const size_t nside = 2U*nhalf;
+    const size_t nnwords = private_occupancy_nwords(occ->dims, nside);
+    uint64_t* nbits = calloc(nnwords, sizeof(uint64_t));
+    if (!nbits) return OCCUPANCY_GROW_FAILURE;
+    // re-index every occupied site into the larger lattice
+    const size_t shift = nhalf - occ->half;
+    const size_t plane = occ->side*occ->side;
+    for (size_t w = 0U; w < occ->nwords; ++w) {
+        uint64_t word = occ->bits[w];
+        while (word) {
+            const size_t idx = 64U*w + (size_t)__builtin_ctzll(word);
+            word &= word - 1U;
+            const size_t ix = idx%occ->side + shift;
+            const size_t iy = (idx%plane)/occ->side + shift;
+            size_t nidx = iy*nside + ix;
+            if (occ->dims == 3U) nidx += (idx/plane + shift)*nside*nside;
+            nbits[nidx >> 6] |= (uint64_t)1U << (nidx & 63U);
+        }
+    }
+    free(occ->bits);
+    occ->bits = nbits;
+    occ->half = nhalf;
+    occ->side = nside;
+    occ->nwords = nnwords;
+    return OCCUPANCY_GROW_SUCCESS;
+}
+
+int occupancy_set(struct occupancy* occ, int x, int y, int z) {
+    size_t reach = (size_t)abs(x) > (size_t)abs(y) ? (size_t)abs(x) : (size_t)abs(y);
+    if (occ->dims == 3U && (size_t)abs(z) > reach) reach = (size_t)abs(z);
+    if (occ->type == SPARSE) {
+        if (reach >= occ->half) return -1;
+        uint64_t* brick = private_occupancy_brick(occ, x, y, z);
+        if (!brick) return -1;
+        const unsigned int lmask = (1U << OCCUPANCY_BRICK_SHIFT) - 1U;
+        unsigned int bit = ((unsigned int)y & lmask) << OCCUPANCY_BRICK_SHIFT | ((unsigned int)x & lmask);
+        if (occ->dims == 3U) bit |= ((unsigned int)z & lmask) << 2*OCCUPANCY_BRICK_SHIFT;
+        brick[bit >> 6] |= (uint64_t)1U << (bit & 63U);
+        return 0;
+    }
+    // extent covers [-half, half) so a site at +half requires growth
+    if (reach >= occ->half &&
+        occupancy_reserve(occ, reach + 1U) == OCCUPANCY_GROW_FAILURE) return -1;
+    const size_t ix = (size_t)((long)x + (long)occ->half);
+    const size_t iy = (size_t)((long)y + (long)occ->half);
+    size_t idx = iy*occ->side + ix;
+    if (occ->dims == 3U)
+        idx += (size_t)((long)z + (long)occ->half)*occ->side*occ->side;
+    occ->bits[idx >> 6] |= (uint64_t)1U << (idx & 63U);
+    return 0;
+}
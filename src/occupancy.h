@@ -0,0 +1,159 @@
+/**
+ * \file occupancy.h
+ * \brief File containing the occupancy struct definition and relevant
+ *        API functions for constant-time lattice site lookups.
+ */
+
+#ifndef OCCUPANCY_H_
+#define OCCUPANCY_H_
+
+#include <stdbool.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+// occupancy error/notify codes
+#define OCCUPANCY_GROW_FAILURE -1 /**< Memory allocation failure on growth. */
+#define OCCUPANCY_GROW_PASS 0 /**< Growth skipped, extent already sufficient. */
+#define OCCUPANCY_GROW_SUCCESS 1 /**< Growth succeeded. */
+
+#define OCCUPANCY_BRICK_SHIFT 3 /**< Sparse bricks span `1 << 3` sites along each axis. */
+#define OCCUPANCY_BRICK_BITS 21 /**< Bits per axis of a packed sparse brick key. */
+
+enum occupancy_type {
+    DENSE,
+    SPARSE
+};
+
+/**
+ * \struct occupancy
+ * \brief Lattice of occupied sites. A `DENSE` occupancy is a bitmap centred
+ *        on the origin, sites with co-ordinates in `[-half, half)` along each
+ *        axis are stored, one bit per site, in row-major order. A `SPARSE`
+ *        occupancy is a hash table of bit-packed bricks of `8^dims` sites,
+ *        bricks being allocated only where sites are occupied, such that its
+ *        memory scales with the number of occupied sites rather than with the
+ *        volume of their bounding box.
+ */
+struct occupancy {
+    uint64_t* bits; /**< Pointer to underlying bit array, brick storage if sparse. */
+    size_t dims; /**< Number of lattice dimensions, 2 or 3. */
+    size_t half; /**< Half-extent of the stored region along each axis. */
+    size_t side; /**< Number of sites along each axis, equal to `2*half`. */
+    size_t nwords; /**< Number of 64-bit words in use in `bits`. */
+    enum occupancy_type type; /**< Storage scheme of the occupancy. */
+    uint64_t* keys; /**< Packed brick key of each hash table slot, 0 if empty. */
+    size_t* slots; /**< Index of the brick of each hash table slot. */
+    size_t table_cap; /**< Number of hash table slots, a power of two. */
+    size_t nbricks; /**< Number of allocated bricks. */
+    size_t brick_cap; /**< Number of bricks that `bits` can hold. */
+    size_t brick_words; /**< Number of 64-bit words per brick. */
+};
+/**
+ * \brief Construct a new, empty occupancy lattice of dimension `dims`
+ *        covering co-ordinates in `[-half, half)` along each axis.
+ * \param dims Number of lattice dimensions, 2 or 3.
+ * \param half Initial half-extent of the lattice.
+ * \return Pointer to newly allocated occupancy, `NULL` if malloc failed.
+ */
+struct occupancy* occupancy_alloc(size_t dims, size_t half);
+/**
+ * \brief Construct a new, empty sparse occupancy lattice of dimension `dims`.
+ *        Sites with co-ordinates in `[-2^23, 2^23)` along each axis can be stored.
+ * \param dims Number of lattice dimensions, 2 or 3.
+ * \return Pointer to newly allocated occupancy, `NULL` if malloc failed.
+ */
+struct occupancy* occupancy_alloc_sparse(size_t dims);
+/**
+ * \brief Destroy an occupancy instance, freeing its memory.
+ * \param occ Pointer to instance of occupancy to delete.
+ */
+void occupancy_free(struct occupancy* occ);
+/**
+ * \brief Increases the half-extent of an occupancy lattice to at least
+ *        `half`, preserving all occupied sites. The extent is grown
+ *        geometrically so that repeated calls are amortised. Sparse
+ *        lattices are unbounded so growth is always avoided.
+ * \param occ Pointer to instance of occupancy to grow.
+ * \param half Required half-extent.
+ * \return - `OCCUPANCY_GROW_SUCCESS` if growth was successful,
+ *         - `OCCUPANCY_GROW_PASS` if growth was avoided,
+ *         - `OCCUPANCY_GROW_FAILURE` if growth failed.
+ */
+int occupancy_reserve(struct occupancy* occ, size_t half);
+/**
+ * \brief Marks the site `(x, y, z)` as occupied, growing the lattice if the
+ *        site lies outside of the current extent. For two-dimensional
+ *        lattices `z` is ignored.
+ * \param occ Pointer to instance of occupancy.
+ * \return 0 if successful, -1 if growth of the lattice failed or the site
+ *         lies outside of the range of a sparse lattice.
+ */
+int occupancy_set(struct occupancy* occ, int x, int y, int z);
+/**
+ * \brief Computes the memory allocated to an occupancy lattice.
+ * \param occ Pointer to instance of occupancy.
+ * \return Number of bytes allocated to the bits and any hash table.
+ */
+size_t occupancy_nbytes(const struct occupancy* occ);
+/**
+ * \brief Packs the brick containing the site `(x, y, z)` of a sparse
+ *        occupancy into a non-zero key.
+ */
+static inline uint64_t occupancy_brick_key(const struct occupancy* occ,
+                                           int x, int y, int z) {
+    const uint64_t mask = ((uint64_t)1U << OCCUPANCY_BRICK_BITS) - 1U;
+    const long bias = 1L << (OCCUPANCY_BRICK_BITS - 1);
+    const uint64_t bx = (uint64_t)((x >> OCCUPANCY_BRICK_SHIFT) + bias) & mask;
+    const uint64_t by = (uint64_t)((y >> OCCUPANCY_BRICK_SHIFT) + bias) & mask;
+    const uint64_t bz = (occ->dims == 3U)
+        ? (uint64_t)((z >> OCCUPANCY_BRICK_SHIFT) + bias) & mask : 0U;
+    return ((bx << 2*OCCUPANCY_BRICK_BITS) | (by << OCCUPANCY_BRICK_BITS) | bz) + 1U;
+}
+/**
+ * \brief Computes the first hash table slot probed for a brick `key`.
+ */
+static inline size_t occupancy_brick_slot(const struct occupancy* occ, uint64_t key) {
+    key ^= key >> 33;
+    key *= 0xFF51AFD7ED558CCDU;
+    key ^= key >> 33;
+    return (size_t)key & (occ->table_cap - 1U);
+}
+/**
+ * \brief Determines whether the site `(x, y, z)` of a sparse occupancy is
+ *        occupied, by linear probing for its brick.
+ */
+static inline bool occupancy_sparse_test(const struct occupancy* occ, int x, int y, int z) {
+    const uint64_t key = occupancy_brick_key(occ, x, y, z);
+    size_t slot = occupancy_brick_slot(occ, key);
+    while (occ->keys[slot] != key) {
+        if (!(occ->keys[slot])) return false; // no brick, hence unoccupied
+        slot = (slot + 1U) & (occ->table_cap - 1U);
+    }
+    const unsigned int lmask = (1U << OCCUPANCY_BRICK_SHIFT) - 1U;
+    unsigned int bit = ((unsigned int)y & lmask) << OCCUPANCY_BRICK_SHIFT | ((unsigned int)x & lmask);
+    if (occ->dims == 3U) bit |= ((unsigned int)z & lmask) << 2*OCCUPANCY_BRICK_SHIFT;
+    const uint64_t* brick = occ->bits + occ->slots[slot]*occ->brick_words;
+    return (brick[bit >> 6] >> (bit & 63U)) & 1U;
+}
+/**
+ * \brief Determines whether the site `(x, y, z)` is occupied. Sites outside
+ *        of the current extent are never occupied. For two-dimensional
+ *        lattices `z` is ignored.
+ * \param occ Pointer to instance of occupancy.
+ * \return `true` if the site is occupied, `false` otherwise.
+ */
+static inline bool occupancy_test(const struct occupancy* occ, int x, int y, int z) {
+    if (occ->type == SPARSE) return occupancy_sparse_test(occ, x, y, z);
+    const size_t ix = (size_t)((long)x + (long)occ->half);
+    const size_t iy = (size_t)((long)y + (long)occ->half);
+    if (ix >= occ->side || iy >= occ->side) return false;
+    size_t idx = iy*occ->side + ix;
+    if (occ->dims == 3U) {
+        const size_t iz = (size_t)((long)z + (long)occ->half);
+        if (iz >= occ->side) return false;
+        idx += iz*occ->side*occ->side;
+    }
+    return (occ->bits[idx >> 6] >> (idx & 63U)) & 1U;
+}
+
+#endif // !OCCUPANCY_H_
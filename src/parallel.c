@@ -0,0 +1,305 @@
+/**
+ * \file parallel.c
+ * \brief Contains the implementation of multi-threaded generation of a single
+ *        aggregate by many concurrently random-walking particles.
+ *
+ *        Walkers are advanced in quanta of at most `PARALLEL_QUANTUM` updates,
+ *        during which the occupancy lattices and aggregate are only read. A
+ *        walker which finds a sticking site stops and its candidate is then
+ *        committed with exclusive access to the aggregate, after re-checking
+ *        that the site was not claimed by another commit in the meantime (in
+ *        which case the walker is discarded and re-spawned). Each walker keeps
+ *        its own generator, seeded from the aggregate's generator, and a
+ *        private copy of the aggregate scalars refreshed before each quantum.
+ *
+ *        In deterministic mode all walkers advance one quantum, then commits
+ *        are applied in order of walker index, so that the result depends only
+ *        on the aggregate seed and the number of walkers, not on the number of
+ *        threads or on scheduling. Otherwise commits are applied in order of
+ *        arrival without synchronising the walk phases of different threads.
+ *
+ *        Stop conditions are checked after every commit and, for cancellation
+ *        and the wall-clock budget, after every walk phase. The step budget
+ *        counts the required steps of committed particles only.
+ */
+
+#define _GNU_SOURCE
+#include "aggregate.h"
+#include <pthread.h>
+
+#define PARALLEL_QUANTUM 1024U /**< Maximum walker updates per walk phase. */
+
+struct pwalker {
+    struct aggregate view; /**< Copy of the aggregate with the walker's own generator. */
+    struct walker wlk; /**< State of the walker. */
+    struct int_triplet prev; /**< Site at which the walker is a candidate to stick. */
+    bool candidate; /**< Whether the walker holds an uncommitted sticking site. */
+};
+
+struct pgen {
+    struct aggregate* agg; /**< Shared aggregate being generated. */
+    size_t dims; /**< Dimensionality of the aggregate. */
+    size_t n; /**< Number of particles to commit. */
+    size_t count; /**< Number of particles committed so far. */
+    size_t nthreads; /**< Number of worker threads. */
+    size_t nwalkers; /**< Number of concurrent walkers. */
+    struct pwalker* walkers; /**< Walker states, `nwalkers` in length. */
+    bool deterministic; /**< Whether commits are ordered by walker index. */
+    bool report; /**< Whether to report progress, by callback or to the terminal. */
+    struct progress_state prog; /**< State of progress reporting. */
+    struct stop_state stop; /**< Budgets consumed at the start of generation. */
+    enum stop_reason reason; /**< Condition which stopped generation. */
+    bool done; /**< Set once generation is complete or has failed. */
+    int retval; /**< Return value of generation, -1 on allocation failure. */
+    pthread_rwlock_t lock; /**< Shared during walk phases, exclusive for commits. */
+    pthread_barrier_t barrier; /**< Separates walk and commit phases in deterministic mode. */
+};
+
+struct pthread_arg {
+    struct pgen* pg;
+    size_t tid;
+};
+
+/**
+ * \brief Advances a walker by at most `PARALLEL_QUANTUM` updates, stopping
+ *        early if it becomes a candidate to stick. To be used only with shared
+ *        (read) access to the aggregate.
+ */
+static void private_parallel_walk(const struct pgen* pg, struct pwalker* pw) {
+    struct aggregate* view = &pw->view;
+    const struct rng rng = view->rng;
+    const struct jump_cache jump = view->jump;
+    *view = *(pg->agg); // refresh spawning region and extents
+    view->rng = rng;
+    view->jump = jump;
+    view->_profile = (struct profile*)NULL; // counters are not shared between threads
+    struct walker* wlk = &pw->wlk;
+    struct int_triplet curr = wlk->pos;
+    // walker was overtaken by particles committed since its last quantum
+    if (wlk->spawned && occupancy_test(view->_occupancy, curr.x, curr.y, curr.z)) {
+        wlk->spawned = false;
+        wlk->steps = 0U;
+        wlk->bcolls = 0U;
+    }
+    for (size_t s = 0U; s < PARALLEL_QUANTUM; ++s) {
+        struct int_triplet prev = curr;
+        bool bcoll;
+        size_t jsteps = 0U;
+        if (pg->dims == 2U) {
+            struct int_pair c2 = {curr.x, curr.y};
+            if (!wlk->spawned) {
+                aggregate_2d_spawn_bp(view, &c2);
+                wlk->spawned = true;
+            }
+            const struct int_pair p2 = c2;
+            if (view->engine == LONG_JUMP) jsteps = aggregate_2d_jump(view, &c2);
+            if (!jsteps) aggregate_2d_update_bp(view, &c2);
+            bcoll = aggregate_2d_lattice_collision(view, &c2, &p2);
+            prev.x = p2.x; prev.y = p2.y; prev.z = 0;
+            curr.x = c2.x; curr.y = c2.y; curr.z = 0;
+        }
+        else {
+            if (!wlk->spawned) {
+                aggregate_3d_spawn_bp(view, &curr);
+                wlk->spawned = true;
+            }
+            prev = curr;
+            if (view->engine == LONG_JUMP) jsteps = aggregate_3d_jump(view, &curr);
+            if (!jsteps) aggregate_3d_update_bp(view, &curr);
+            bcoll = aggregate_3d_lattice_collision(view, &curr, &prev);
+        }
+        wlk->steps += jsteps ? jsteps : 1U;
+        if (bcoll) ++(wlk->bcolls);
+        if (occupancy_test(view->_occupancy, curr.x, curr.y, curr.z) &&
+            rng_chance(&view->rng, view->stickiness)) {
+            pw->prev = prev;
+            pw->candidate = true;
+            break;
+        }
+    }
+    wlk->pos = curr;
+}
+
+/**
+ * \brief Commits the candidate site of a walker to the aggregate, unless the
+ *        site has since been occupied, and resets the walker. To be used only
+ *        with exclusive access to the aggregate.
+ */
+static int private_parallel_commit(struct pgen* pg, struct pwalker* pw) {
+    struct aggregate* agg = pg->agg;
+    struct walker* wlk = &pw->wlk;
+    const struct int_triplet* p = &pw->prev;
+    pw->candidate = false;
+    if (!occupancy_test(agg->_occupancy, p->x, p->y, p->z)) {
+        int ec;
+        if (pg->dims == 2U) {
+            const struct int_pair p2 = {p->x, p->y};
+            ec = aggregate_2d_stick(agg, &p2);
+        }
+        else ec = aggregate_3d_stick(agg, p);
+        if (ec == -1 || aggregate_push_stats(agg, wlk->steps, wlk->bcolls) == -1)
+            return -1;
+        ++(pg->count);
+        if (pg->report) aggregate_report_progress(agg, &pg->prog, pg->count);
+    }
+    wlk->steps = 0U;
+    wlk->bcolls = 0U;
+    wlk->spawned = false;
+    return 0;
+}
+
+// marks generation complete on failure, or once a stop condition is met
+static void private_parallel_check_done(struct pgen* pg) {
+    if (pg->retval == -1) pg->done = true;
+    if (pg->done) return;
+    if (pg->count >= pg->n) pg->reason = STOP_COUNT;
+    else pg->reason = stop_check(&pg->agg->stop, &pg->stop, (double)pg->agg->max_r_sqd,
+                                 pg->agg->_stats->steps_total);
+    if (pg->reason != STOP_NONE) pg->done = true;
+}
+
+static void* private_parallel_deterministic(void* varg) {
+    const struct pthread_arg* arg = (struct pthread_arg*)varg;
+    struct pgen* pg = arg->pg;
+    // wait until every thread has been created
+    pthread_rwlock_rdlock(&pg->lock);
+    pthread_rwlock_unlock(&pg->lock);
+    for (;;) {
+        for (size_t i = arg->tid; i < pg->nwalkers; i += pg->nthreads)
+            private_parallel_walk(pg, &pg->walkers[i]);
+        pthread_barrier_wait(&pg->barrier);
+        if (arg->tid == 0U) { // commit phase, in order of walker index
+            for (size_t i = 0U; i < pg->nwalkers && !pg->done; ++i) {
+                if (!pg->walkers[i].candidate) continue;
+                if (private_parallel_commit(pg, &pg->walkers[i]) == -1) pg->retval = -1;
+                private_parallel_check_done(pg);
+            }
+            private_parallel_check_done(pg);
+        }
+        pthread_barrier_wait(&pg->barrier);
+        if (pg->done) break;
+    }
+    return NULL;
+}
+
+static void* private_parallel_arrival(void* varg) {
+    const struct pthread_arg* arg = (struct pthread_arg*)varg;
+    struct pgen* pg = arg->pg;
+    for (;;) {
+        bool any = false;
+        pthread_rwlock_rdlock(&pg->lock);
+        const bool done = pg->done;
+        if (!done) {
+            for (size_t i = arg->tid; i < pg->nwalkers; i += pg->nthreads) {
+                private_parallel_walk(pg, &pg->walkers[i]);
+                any = any || pg->walkers[i].candidate;
+            }
+        }
+        pthread_rwlock_unlock(&pg->lock);
+        if (done) break;
+        const bool stop = stop_check_async(&pg->agg->stop, &pg->stop) != STOP_NONE;
+        if (!any && !stop) continue;
+        pthread_rwlock_wrlock(&pg->lock);
+        if (stop) private_parallel_check_done(pg);
+        for (size_t i = arg->tid; i < pg->nwalkers && !pg->done; i += pg->nthreads) {
+            if (!pg->walkers[i].candidate) continue;
+            if (private_parallel_commit(pg, &pg->walkers[i]) == -1) pg->retval = -1;
+            private_parallel_check_done(pg);
+        }
+        pthread_rwlock_unlock(&pg->lock);
+    }
+    return NULL;
+}
+
+/**
+ * \brief Runs multi-threaded generation of `n` particles on an aggregate
+ *        whose attractor and storage have already been initialised.
+ */
+static int private_parallel_run(struct aggregate* agg, size_t dims, size_t n,
+                                size_t nthreads, size_t nwalkers,
+                                bool deterministic, bool disp_prog) {
+    if (!n) {
+        aggregate_finish_stop(agg, STOP_COUNT);
+        return 0;
+    }
+    if (nthreads < 1U) nthreads = 1U;
+    if (nwalkers < 1U) nwalkers = nthreads;
+    if (nthreads > nwalkers) nthreads = nwalkers;
+    struct pgen pg;
+    pg.agg = agg;
+    pg.dims = dims;
+    pg.n = n;
+    pg.count = 0U;
+    pg.nwalkers = nwalkers;
+    pg.deterministic = deterministic;
+    pg.report = disp_prog || agg->progress.fn;
+    if (pg.report) progress_start(&pg.prog, &agg->progress, n);
+    stop_start(&pg.stop, agg->_stats->steps_total);
+    pg.reason = STOP_NONE;
+    pg.done = false;
+    pg.retval = 0;
+    // a condition may already hold, e.g. cancellation requested while idle
+    private_parallel_check_done(&pg);
+    if (pg.done) {
+        aggregate_finish_stop(agg, pg.reason);
+        return 0;
+    }
+    pg.walkers = calloc(nwalkers, sizeof(struct pwalker));
+    pthread_t* threads = malloc(nthreads*sizeof(pthread_t));
+    struct pthread_arg* args = malloc(nthreads*sizeof(struct pthread_arg));
+    if (!pg.walkers || !threads || !args) {
+        free(pg.walkers); free(threads); free(args);
+        return -1;
+    }
+    // each walker draws from its own stream, seeded from the aggregate's
+    for (size_t i = 0U; i < nwalkers; ++i)
+        rng_seed(&pg.walkers[i].view.rng, rng_next(&agg->rng));
+    pthread_rwlockattr_t attr;
+    pthread_rwlockattr_init(&attr);
+#ifdef __GLIBC__
+    // commits must not be starved by walkers re-acquiring shared access
+    pthread_rwlockattr_setkind_np(&attr, PTHREAD_RWLOCK_PREFER_WRITER_NONRECURSIVE_NP);
+#endif
+    pthread_rwlock_init(&pg.lock, &attr);
+    pthread_rwlockattr_destroy(&attr);
+    void* (*routine)(void*) = deterministic ? private_parallel_deterministic
+        : private_parallel_arrival;
+    // hold the lock so that no thread starts until the thread count is final
+    pthread_rwlock_wrlock(&pg.lock);
+    size_t created = 0U;
+    for (; created < nthreads; ++created) {
+        args[created].pg = &pg;
+        args[created].tid = created;
+        if (pthread_create(&threads[created], NULL, routine, &args[created])) break;
+    }
+    pg.nthreads = created ? created : 1U;
+    if (deterministic) pthread_barrier_init(&pg.barrier, NULL, (unsigned int)pg.nthreads);
+    pthread_rwlock_unlock(&pg.lock);
+    if (!created) { // run on the calling thread if no thread could be created
+        args[0].pg = &pg;
+        args[0].tid = 0U;
+        routine(&args[0]);
+    }
+    for (size_t t = 0U; t < created; ++t) pthread_join(threads[t], NULL);
+    if (deterministic) pthread_barrier_destroy(&pg.barrier);
+    pthread_rwlock_destroy(&pg.lock);
+    free(pg.walkers);
+    free(threads);
+    free(args);
+    aggregate_finish_stop(agg, pg.reason);
+    return pg.retval;
+}
+
+int aggregate_2d_generate_parallel(struct aggregate* agg, size_t n, size_t nthreads,
+                                   size_t nwalkers, bool deterministic, bool disp_prog) {
+    if (aggregate_reserve(agg, n) == -1 ||
+        aggregate_2d_init_attractor(agg, n) == -1) return -1;
+    return private_parallel_run(agg, 2U, n, nthreads, nwalkers, deterministic, disp_prog);
+}
+
+int aggregate_3d_generate_parallel(struct aggregate* agg, size_t n, size_t nthreads,
+                                   size_t nwalkers, bool deterministic, bool disp_prog) {
+    if (aggregate_reserve(agg, n) == -1 ||
+        aggregate_3d_init_attractor(agg, n) == -1) return -1;
+    return private_parallel_run(agg, 3U, n, nthreads, nwalkers, deterministic, disp_prog);
+}
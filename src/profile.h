@@ -0,0 +1,98 @@
+/**
+ * \file profile.h
+ * \brief File containing the profile struct definition and the macros used to
+ *        instrument the hot paths of aggregate generation with event counters
+ *        and per-phase timers.
+ *
+ *        Instrumentation is compiled in only when `DROPLET_PROFILE` is defined
+ *        (build with `make profile`), otherwise every macro expands to nothing
+ *        and an aggregate's `_profile` is always `NULL`. Timers count CPU cycles
+ *        via the time-stamp counter on x86, and nanoseconds elsewhere.
+ */
+
+#ifndef PROFILE_H_
+#define PROFILE_H_
+
+#include <stdbool.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+#if defined(DROPLET_PROFILE) && (defined(__x86_64__) || defined(__i386__))
+#include <x86intrin.h>
+#define PROFILE_TSC 1
+#else
+#define PROFILE_TSC 0
+#endif
+
+enum profile_phase {
+    PROFILE_SPAWN, /**< Spawning walkers. */
+    PROFILE_WALK, /**< Unit steps and long jumps of walkers. */
+    PROFILE_BOUNDARY, /**< Reflection and re-injection at the spawning boundary. */
+    PROFILE_COLLISION, /**< Occupancy lookups and stickiness trials. */
+    PROFILE_STICK, /**< Sticking particles and recording their statistics. */
+    PROFILE_NPHASES
+};
+
+/**
+ * \struct profile
+ * \brief Event counters and per-phase timers of the single-threaded engine.
+ */
+struct profile {
+    size_t steps; /**< Walker updates, unit steps or long jumps. */
+    size_t jumps; /**< Walker updates which were long jumps. */
+    size_t spawns; /**< Walkers spawned. */
+    size_t reflections; /**< Walkers reflected or re-injected at the boundary. */
+    size_t rejected_sticks; /**< Contacts with the aggregate rejected by stickiness. */
+    size_t occupancy_tests; /**< Occupancy lattice lookups, fine and coarse. */
+    size_t reallocations; /**< Reallocations of particle and statistics vectors. */
+    uint64_t ticks[PROFILE_NPHASES]; /**< Time spent in each phase. */
+    bool tsc; /**< Whether `ticks` are CPU cycles, otherwise nanoseconds. */
+};
+
+#ifdef DROPLET_PROFILE
+
+static inline uint64_t profile_ticks(void) {
+#if PROFILE_TSC
+    return __rdtsc();
+#else
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (uint64_t)ts.tv_sec*1000000000U + (uint64_t)ts.tv_nsec;
+#endif
+}
+
+static inline struct profile* profile_alloc(void) {
+    struct profile* prof = calloc(1U, sizeof(struct profile));
+    if (prof) prof->tsc = PROFILE_TSC;
+    return prof;
+}
+
+// counters are skipped where `_profile` is NULL, e.g. for multi-threaded walkers
+#define PROFILE_COUNT(agg, field, n) \
+    do { if ((agg)->_profile) (agg)->_profile->field += (n); } while (0)
+#define PROFILE_START(t) const uint64_t t = profile_ticks()
+#define PROFILE_STOP(agg, phase, t) \
+    do { if ((agg)->_profile) (agg)->_profile->ticks[phase] += profile_ticks() - (t); } while (0)
+
+#else
+
+static inline struct profile* profile_alloc(void) { return (struct profile*)NULL; }
+
+#define PROFILE_COUNT(agg, field, n) ((void)0)
+#define PROFILE_START(t) ((void)0)
+#define PROFILE_STOP(agg, phase, t) ((void)0)
+
+#endif
+
+/**
+ * \brief Resets every counter and timer of a profile.
+ */
+static inline void profile_clear(struct profile* prof) {
+    if (!prof) return;
+    const bool tsc = prof->tsc;
+    memset(prof, 0, sizeof *prof);
+    prof->tsc = tsc;
+}
+
+#endif // PROFILE_H_
@@ -0,0 +1,93 @@
+/**
+ * \file progress.h
+ * \brief File containing the progress struct definition and helpers for
+ *        reporting the progress of generation through a callback, throttled
+ *        to at most once every given number of particles or milliseconds.
+ */
+
+#ifndef PROGRESS_H_
+#define PROGRESS_H_
+
+#include <stdbool.h>
+#include <stdlib.h>
+#include <time.h>
+
+#define PROGRESS_CHUNK_STEPS 65536U /**< Walker updates between checks of the report interval. */
+#define PROGRESS_PRINT_INTERVAL_MS 100.0 /**< Default report interval when printing progress. */
+
+/**
+ * \brief Progress callback, passed the number of particles stuck so far, the
+ *        number requested, the spanning radius of the aggregate, the total
+ *        lattice steps taken by stuck particles and the user data pointer.
+ */
+typedef void (*progress_fn)(size_t count, size_t total, double radius,
+                            double steps, void* data);
+
+/**
+ * \struct progress
+ * \brief Progress reporting configuration of an aggregate.
+ */
+struct progress {
+    progress_fn fn; /**< Callback, or `NULL` to print progress if requested. */
+    void* data; /**< User data passed to the callback. */
+    size_t every; /**< Particles between reports, 0 to report on the interval only. */
+    double interval_ms; /**< Milliseconds between reports, 0 to report on the count only. */
+};
+
+/**
+ * \struct progress_state
+ * \brief State of progress reporting during a single generation call.
+ */
+struct progress_state {
+    size_t total; /**< Number of particles requested. */
+    size_t every; /**< Effective particles between reports. */
+    double interval_ms; /**< Effective milliseconds between reports. */
+    size_t last_count; /**< Number of particles at the last report. */
+    double last_ms; /**< Time of the last report. */
+};
+
+static inline double progress_clock_ms(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return 1e3*(double)ts.tv_sec + 1e-6*(double)ts.tv_nsec;
+}
+
+/**
+ * \brief Starts reporting the progress of generating `total` particles, where
+ *        printing without a throttle defaults to `PROGRESS_PRINT_INTERVAL_MS`.
+ */
+static inline void progress_start(struct progress_state* st, const struct progress* pg,
+                                  size_t total) {
+    st->total = total;
+    st->every = pg->every;
+    st->interval_ms = pg->interval_ms;
+    if (!pg->fn && !st->every && st->interval_ms <= 0.0)
+        st->interval_ms = PROGRESS_PRINT_INTERVAL_MS;
+    st->last_count = 0U;
+    st->last_ms = progress_clock_ms();
+}
+
+/**
+ * \brief Determines whether a report is due with `count` particles stuck, a
+ *        final report always being due on completion.
+ */
+static inline bool progress_due(const struct progress_state* st, size_t count) {
+    if (count == st->last_count) return false;
+    if (count >= st->total) return true;
+    if (!st->every && st->interval_ms <= 0.0) return true;
+    if (st->every && count - st->last_count >= st->every) return true;
+    return st->interval_ms > 0.0 && progress_clock_ms() - st->last_ms >= st->interval_ms;
+}
+
+/**
+ * \brief Returns the number of particles, at most `remaining`, which may stick
+ *        before the next report due on the count.
+ */
+static inline size_t progress_batch(const struct progress_state* st, size_t count,
+                                    size_t remaining) {
+    if (!st->every) return remaining;
+    const size_t until = st->last_count + st->every - count;
+    return until < remaining ? until : remaining;
+}
+
+#endif // PROGRESS_H_
@@ -0,0 +1,19 @@
+/**
+ * \file rng.c
+ * \brief Contains the implementation of all non-inline functions declared
+ *        in rng.h.
+ */
+
+#include "rng.h"
+
+void rng_seed(struct rng* rng, uint64_t seed) {
+    for (int i = 0; i < 4; ++i) { // splitmix64
+        seed += 0x9E3779B97F4A7C15U;
+        uint64_t z = seed;
+        z = (z ^ (z >> 30))*0xBF58476D1CE4E5B9U;
+        z = (z ^ (z >> 27))*0x94D049BB133111EBU;
+        rng->s[i] = z ^ (z >> 31);
+    }
+    rng->bits = 0U;
+    rng->nbits = 0U;
+}
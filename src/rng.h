@@ -0,0 +1,101 @@
+/**
+ * \file rng.h
+ * \brief File containing the rng struct definition and relevant API
+ *        functions for drawing pseudo-random numbers from independent,
+ *        explicitly seeded streams.
+ */
+
+#ifndef RNG_H_
+#define RNG_H_
+
+#include <stdbool.h>
+#include <stdint.h>
+
+/**
+ * \struct rng
+ * \brief State of a xoshiro256** pseudo-random number generator. Each
+ *        instance is an independent stream so that no state is shared
+ *        between aggregates.
+ */
+struct rng {
+    uint64_t s[4]; /**< Generator state, must not be all zero. */
+    uint64_t bits; /**< Buffer of random bits not yet consumed. */
+    unsigned int nbits; /**< Number of valid bits remaining in `bits`. */
+};
+/**
+ * \brief Seeds a generator, expanding the 64-bit `seed` into the full state
+ *        using the splitmix64 sequence.
+ * \param rng Pointer to instance of rng to seed.
+ * \param seed Seed value, any value (including zero) is valid.
+ */
+void rng_seed(struct rng* rng, uint64_t seed);
+/**
+ * \brief Draws the next 64 random bits from a generator.
+ * \param rng Pointer to instance of rng.
+ * \return Uniformly distributed 64-bit value.
+ */
+static inline uint64_t rng_next(struct rng* rng) {
+    uint64_t* s = rng->s;
+    const uint64_t x = s[1]*5U;
+    const uint64_t result = ((x << 7) | (x >> 57))*9U;
+    const uint64_t t = s[1] << 17;
+    s[2] ^= s[0];
+    s[3] ^= s[1];
+    s[1] ^= s[2];
+    s[0] ^= s[3];
+    s[2] ^= t;
+    s[3] = (s[3] << 45) | (s[3] >> 19);
+    return result;
+}
+/**
+ * \brief Draws `k` random bits from the bit buffer of a generator, refilling
+ *        the buffer from a fresh 64-bit word only once it is exhausted. This
+ *        allows a single generator call to supply many small draws.
+ * \param rng Pointer to instance of rng.
+ * \param k Number of bits to draw, in `[1, 32]`.
+ * \return Uniformly distributed value in `[0, 2^k)`.
+ */
+static inline uint64_t rng_bits(struct rng* rng, unsigned int k) {
+    if (rng->nbits < k) {
+        rng->bits = rng_next(rng);
+        rng->nbits = 64U;
+    }
+    const uint64_t result = rng->bits & (((uint64_t)1U << k) - 1U);
+    rng->bits >>= k;
+    rng->nbits -= k;
+    return result;
+}
+/**
+ * \brief Draws a uniformly distributed index in `[0, n)` for `n <= 8` from
+ *        the bit buffer of a generator, using rejection for non powers of two.
+ * \param rng Pointer to instance of rng.
+ * \param n Number of outcomes, in `[2, 8]`.
+ * \return Random index in `[0, n)`.
+ */
+static inline unsigned int rng_index(struct rng* rng, unsigned int n) {
+    const unsigned int k = (n <= 2U) ? 1U : (n <= 4U) ? 2U : 3U;
+    unsigned int idx;
+    do idx = (unsigned int)rng_bits(rng, k); while (idx >= n);
+    return idx;
+}
+/**
+ * \brief Draws a Bernoulli trial with success probability `p` from 32 bits
+ *        of the bit buffer of a generator. No bits are consumed if `p >= 1`.
+ * \param rng Pointer to instance of rng.
+ * \param p Probability of success.
+ * \return `true` with probability `p`, `false` otherwise.
+ */
+static inline bool rng_chance(struct rng* rng, double p) {
+    if (p >= 1.0) return true;
+    return (double)rng_bits(rng, 32U) < p*4294967296.0;
+}
+/**
+ * \brief Draws a uniformly distributed double in `[0, 1)` from a generator.
+ * \param rng Pointer to instance of rng.
+ * \return Random value in `[0, 1)` with 53 bits of precision.
+ */
+static inline double rng_uniform(struct rng* rng) {
+    return (double)(rng_next(rng) >> 11)*(1.0/9007199254740992.0);
+}
+
+#endif // !RNG_H_
@@ -0,0 +1,62 @@
+/**
+ * \file stats.c
+ * \brief Contains the implementation of all non-inline functions declared
+ *        in stats.h.
+ */
+
+#include "stats.h"
+
+struct running_stats* running_stats_alloc(size_t window) {
+    struct running_stats* rs = malloc(sizeof(struct running_stats));
+    if (!rs) return rs;
+    rs->steps_ring = (size_t*)NULL;
+    rs->bcolls_ring = (size_t*)NULL;
+    if (running_stats_set_window(rs, window) == -1) {
+        free(rs);
+        return (struct running_stats*)NULL;
+    }
+    running_stats_clear(rs);
+    return rs;
+}
+
+void running_stats_free(struct running_stats* rs) {
+    free(rs->steps_ring);
+    free(rs->bcolls_ring);
+    free(rs);
+}
+
+void running_stats_clear(struct running_stats* rs) {
+    rs->nsites = 0U;
+    rs->sum[0] = 0.0; rs->sum[1] = 0.0; rs->sum[2] = 0.0;
+    rs->sum_sqd = 0.0;
+    rs->nstuck = 0U;
+    rs->steps_total = 0.0;
+    rs->bcolls_total = 0.0;
+    rs->max_steps = 0U;
+    rs->head = 0U;
+    rs->nring = 0U;
+    rs->window_steps = 0U;
+    rs->window_bcolls = 0U;
+    memset(rs->steps_hist, 0, sizeof rs->steps_hist);
+}
+
+int running_stats_set_window(struct running_stats* rs, size_t window) {
+    if (window < 1U) window = 1U;
+    size_t* steps_ring = malloc(window*sizeof(size_t));
+    size_t* bcolls_ring = malloc(window*sizeof(size_t));
+    if (!steps_ring || !bcolls_ring) {
+        free(steps_ring);
+        free(bcolls_ring);
+        return -1;
+    }
+    free(rs->steps_ring);
+    free(rs->bcolls_ring);
+    rs->steps_ring = steps_ring;
+    rs->bcolls_ring = bcolls_ring;
+    rs->window = window;
+    rs->head = 0U;
+    rs->nring = 0U;
+    rs->window_steps = 0U;
+    rs->window_bcolls = 0U;
+    return 0;
+}
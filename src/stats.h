@@ -0,0 +1,103 @@
+/**
+ * \file stats.h
+ * \brief File containing the running_stats struct definition and relevant
+ *        API functions for maintaining statistics of an aggregate
+ *        incrementally as particles stick to it.
+ */
+
+#ifndef STATS_H_
+#define STATS_H_
+
+#include <stdbool.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+
+#define STATS_HIST_BINS 64 /**< Number of logarithmic bins of the steps histogram. */
+#define STATS_DEFAULT_WINDOW 1000U /**< Default number of particles in windowed means. */
+
+/**
+ * \struct running_stats
+ * \brief Statistics of an aggregate updated in constant time per particle,
+ *        such that they can be queried at any point during generation
+ *        without traversing the particle history.
+ */
+struct running_stats {
+    size_t nsites; /**< Number of sites accumulated into the moments, including the attractor. */
+    double sum[3]; /**< Sum of the co-ordinates of all sites. */
+    double sum_sqd; /**< Sum of the squared distances of all sites from the origin. */
+    size_t nstuck; /**< Number of particles accumulated into the walk statistics. */
+    double steps_total; /**< Sum of the required steps of all stuck particles. */
+    double bcolls_total; /**< Sum of the boundary collisions of all stuck particles. */
+    size_t max_steps; /**< Largest number of required steps of any stuck particle. */
+    size_t window; /**< Number of most recent particles in the windowed means. */
+    size_t* steps_ring; /**< Required steps of the most recent particles. */
+    size_t* bcolls_ring; /**< Boundary collisions of the most recent particles. */
+    size_t head; /**< Index of the next slot to overwrite in the rings. */
+    size_t nring; /**< Number of valid entries in the rings. */
+    size_t window_steps; /**< Sum of the required steps in the rings. */
+    size_t window_bcolls; /**< Sum of the boundary collisions in the rings. */
+    size_t steps_hist[STATS_HIST_BINS]; /**< Counts of required steps in `[2^(k-1), 2^k)`, bin 0 for zero. */
+};
+/**
+ * \brief Construct a new, empty running_stats instance.
+ * \param window Number of most recent particles in the windowed means.
+ * \return Pointer to newly allocated running_stats, `NULL` if malloc failed.
+ */
+struct running_stats* running_stats_alloc(size_t window);
+/**
+ * \brief Destroy a running_stats instance, freeing its memory.
+ * \param rs Pointer to instance of running_stats to delete.
+ */
+void running_stats_free(struct running_stats* rs);
+/**
+ * \brief Resets a running_stats instance to contain no sites or particles.
+ * \param rs Pointer to instance of running_stats.
+ */
+void running_stats_clear(struct running_stats* rs);
+/**
+ * \brief Changes the number of particles in the windowed means, clearing the
+ *        current window.
+ * \param rs Pointer to instance of running_stats.
+ * \param window New number of most recent particles in the windowed means.
+ * \return 0 if successful, -1 if allocation failed.
+ */
+int running_stats_set_window(struct running_stats* rs, size_t window);
+/**
+ * \brief Accumulates the site `(x, y, z)` into the moments of the aggregate.
+ * \param rs Pointer to instance of running_stats.
+ */
+static inline void running_stats_add_site(struct running_stats* rs, int x, int y, int z) {
+    ++(rs->nsites);
+    rs->sum[0] += x;
+    rs->sum[1] += y;
+    rs->sum[2] += z;
+    rs->sum_sqd += (double)x*x + (double)y*y + (double)z*z;
+}
+/**
+ * \brief Accumulates the walk statistics of a stuck particle.
+ * \param rs Pointer to instance of running_stats.
+ * \param steps Required steps of the particle.
+ * \param bcolls Boundary collisions of the particle.
+ */
+static inline void running_stats_add_particle(struct running_stats* rs, size_t steps,
+                                              size_t bcolls) {
+    ++(rs->nstuck);
+    rs->steps_total += (double)steps;
+    rs->bcolls_total += (double)bcolls;
+    if (steps > rs->max_steps) rs->max_steps = steps;
+    if (rs->nring == rs->window) { // evict the oldest particle of the window
+        rs->window_steps -= rs->steps_ring[rs->head];
+        rs->window_bcolls -= rs->bcolls_ring[rs->head];
+    }
+    else ++(rs->nring);
+    rs->steps_ring[rs->head] = steps;
+    rs->bcolls_ring[rs->head] = bcolls;
+    rs->window_steps += steps;
+    rs->window_bcolls += bcolls;
+    rs->head = (rs->head + 1U) % rs->window;
+    const unsigned int bin = steps ? 64U - (unsigned int)__builtin_clzll((unsigned long long)steps) : 0U;
+    ++(rs->steps_hist[bin < STATS_HIST_BINS ? bin : STATS_HIST_BINS - 1U]);
+}
+
+#endif // !STATS_H_
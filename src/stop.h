@@ -0,0 +1,86 @@
+/**
+ * \file stop.h
+ * \brief File containing the stop_conditions struct definition and helpers
+ *        for bounding generation by the spanning radius of an aggregate, a
+ *        wall-clock budget or a lattice step budget, and for cancelling it
+ *        asynchronously from another thread.
+ */
+
+#ifndef STOP_H_
+#define STOP_H_
+
+#include "progress.h"
+
+enum stop_reason {
+    STOP_NONE, /**< Generation has not stopped. */
+    STOP_COUNT, /**< The requested number of particles stuck. */
+    STOP_RADIUS, /**< The spanning radius reached its limit. */
+    STOP_TIME, /**< The wall-clock budget was exhausted. */
+    STOP_STEPS, /**< The lattice step budget was exhausted. */
+    STOP_CANCELLED /**< Generation was cancelled. */
+};
+
+/**
+ * \struct stop_conditions
+ * \brief Limits of generation of an aggregate, each zero for no limit.
+ */
+struct stop_conditions {
+    double max_r_sqd; /**< Limit of the squared spanning radius, `max_r_sqd` of the aggregate. */
+    double max_ms; /**< Wall-clock budget of each generation call in milliseconds. */
+    double max_steps; /**< Lattice step budget of each generation call. */
+    int cancel; /**< Set, atomically, to cancel generation. */
+    int reason; /**< The `enum stop_reason` of the most recent generation call. */
+};
+
+/**
+ * \struct stop_state
+ * \brief Budgets consumed at the start of a generation call.
+ */
+struct stop_state {
+    double start_ms; /**< Time at the start of generation. */
+    double start_steps; /**< Lattice steps taken at the start of generation. */
+};
+
+static inline void stop_start(struct stop_state* st, double steps) {
+    st->start_ms = progress_clock_ms();
+    st->start_steps = steps;
+}
+
+/**
+ * \brief Checks the conditions which may change without the aggregate growing,
+ *        cancellation and the wall-clock budget. Safe to call concurrently.
+ */
+static inline enum stop_reason stop_check_async(const struct stop_conditions* sc,
+                                                const struct stop_state* st) {
+    if (__atomic_load_n(&sc->cancel, __ATOMIC_RELAXED)) return STOP_CANCELLED;
+    if (sc->max_ms > 0.0 && progress_clock_ms() - st->start_ms >= sc->max_ms)
+        return STOP_TIME;
+    return STOP_NONE;
+}
+
+/**
+ * \brief Checks every stop condition given the squared spanning radius and the
+ *        total lattice steps taken.
+ */
+static inline enum stop_reason stop_check(const struct stop_conditions* sc,
+                                          const struct stop_state* st,
+                                          double r_sqd, double steps) {
+    if (sc->max_r_sqd > 0.0 && r_sqd >= sc->max_r_sqd) return STOP_RADIUS;
+    if (sc->max_steps > 0.0 && steps - st->start_steps >= sc->max_steps) return STOP_STEPS;
+    return stop_check_async(sc, st);
+}
+
+/**
+ * \brief Returns the number of walker updates, at most `max_updates`, which
+ *        may be taken before the lattice step budget is exhausted.
+ */
+static inline size_t stop_updates(const struct stop_conditions* sc,
+                                  const struct stop_state* st, double steps,
+                                  size_t max_updates) {
+    if (sc->max_steps <= 0.0) return max_updates;
+    const double remaining = sc->max_steps - (steps - st->start_steps);
+    if (remaining < 1.0) return 1U;
+    return remaining < (double)max_updates ? (size_t)remaining : max_updates;
+}
+
+#endif // STOP_H_
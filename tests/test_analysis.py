@@ -0,0 +1,69 @@
+"""Estimators of the fractal dimension and size on geometries of known dimension."""
+import numpy as np
+import pytest
+import droplet as drp
+from droplet import analysis
+
+def _by_distance(coords):
+    """Orders co-ordinates by distance from the origin, as if grown outwards."""
+    return coords[np.argsort(np.sum(coords**2, axis=1), kind='stable')]
+
+LINE = np.array([(x, 0) for x in range(-256, 256)])
+SQUARE = np.array([(x, y) for x in range(-64, 64) for y in range(-64, 64)])
+CUBE = np.array([(x, y, z) for x in range(-24, 24) for y in range(-24, 24)
+                 for z in range(-24, 24)])
+GEOMETRIES = [(LINE, 1), (SQUARE, 2), (CUBE, 3)]
+
+@pytest.mark.parametrize('coords,dimension', GEOMETRIES)
+def test_box_counting_dimension(coords, dimension):
+    assert analysis.box_counting_dimension(coords)[0] == pytest.approx(dimension, abs=0.05)
+
+@pytest.mark.parametrize('coords,dimension', GEOMETRIES)
+def test_mass_radius_dimension(coords, dimension):
+    assert analysis.mass_radius_dimension(coords)[0] == pytest.approx(dimension, abs=0.05)
+
+@pytest.mark.parametrize('coords,dimension', GEOMETRIES)
+def test_gyration_dimension(coords, dimension):
+    result, sizes, radii = analysis.gyration_dimension(_by_distance(coords))
+    assert result == pytest.approx(dimension, abs=0.05)
+    assert np.all(np.diff(sizes) > 0)
+    assert np.all(np.diff(radii) >= 0)
+
+def test_radius_of_gyration():
+    assert analysis.radius_of_gyration([(-3, 0), (3, 0)]) == pytest.approx(3.0)
+    assert analysis.radius_of_gyration([(-3, 0), (3, 0)], center=(3, 0)) == \
+        pytest.approx(np.sqrt(18.0))
+    n = len(LINE)
+    assert analysis.radius_of_gyration(LINE) == pytest.approx(np.sqrt((n**2 - 1)/12))
+
+def test_aggregates_accepted_in_place_of_arrays():
+    agg = drp.Aggregate2D(seed=41)
+    agg.generate(500, display_progress=False)
+    coords = agg.as_ndarray()
+    assert analysis.radius_of_gyration(agg) == analysis.radius_of_gyration(coords)
+    lhs = analysis.fractal_dimensions(agg)
+    rhs = analysis.fractal_dimensions(coords)
+    assert set(lhs) == {'box_counting', 'correlation', 'mass_radius', 'gyration',
+                        'radius_of_gyration'}
+    assert lhs == rhs
+    # a two-dimensional aggregate is sparser than the plane
+    assert 1.0 < lhs['box_counting'] < 2.0
+
+def test_analyze_preserves_order():
+    aggregates = [LINE, SQUARE, CUBE, LINE]
+    results = analysis.analyze(aggregates, analysis.radius_of_gyration, max_workers=3)
+    assert results == [analysis.radius_of_gyration(coords) for coords in aggregates]
+
+@pytest.mark.parametrize('coords,dimension', GEOMETRIES)
+def test_correlation_function(coords, dimension):
+    # the edges of the geometry bias the estimate low, by more in higher dimensions
+    result, radii, corr = analysis.correlation_function(coords, max_radius=8)
+    assert dimension - 0.15 < result <= dimension + 0.01
+    assert np.array_equal(radii, np.arange(9))
+    assert corr[0] == pytest.approx(1.0)
+    assert np.all((corr >= 0.0) & (corr <= 1.0 + 1e-9))
+
+def test_correlation_function_of_line():
+    # two of the eight sites within half a site of unit distance lie on the line
+    corr = analysis.correlation_function(LINE, max_radius=4)[2]
+    assert corr[1] == pytest.approx(0.25*(len(LINE) - 1)/len(LINE))
@@ -0,0 +1,152 @@
+"""Checkpoint round trips, continued generation and corrupt files."""
+import os
+import struct
+import numpy as np
+import pytest
+import droplet as drp
+from droplet import checkpoint
+
+def _assert_same(lhs, rhs):
+    assert lhs.size == rhs.size
+    assert np.array_equal(lhs.as_ndarray(), rhs.as_ndarray())
+    assert np.array_equal(lhs.attractor_as_ndarray(), rhs.attractor_as_ndarray())
+    assert np.array_equal(lhs.required_steps, rhs.required_steps)
+    assert np.array_equal(lhs.boundary_collisions, rhs.boundary_collisions)
+    assert lhs.radius == rhs.radius
+
+@pytest.mark.parametrize('cls', [drp.Aggregate2D, drp.Aggregate3D])
+@pytest.mark.parametrize('options', [
+    dict(),
+    dict(spawn_type=drp.SpawnType.LAUNCH),
+    dict(engine=drp.WalkEngine.LONG_JUMP),
+    dict(compact=True, stats_bits=32),
+    dict(stats_bits=0),
+    dict(occupancy_type=drp.OccupancyType.SPARSE)])
+def test_round_trip_continues_identically(cls, options, tmp_path):
+    path = str(tmp_path/'agg.drpl')
+    whole = cls(seed=21, **options)
+    whole.generate(150, display_progress=False)
+    agg = cls(seed=21, **options)
+    agg.generate(100, display_progress=False)
+    agg.save(path)
+    restored = cls.load(path)
+    _assert_same(restored, agg)
+    assert restored.seed == agg.seed
+    assert restored.compact == agg.compact
+    assert restored.stats_bits == agg.stats_bits
+    assert restored.occupancy_type == agg.occupancy_type
+    assert restored.stats['count'] == (100 if agg.stats_bits else 0)
+    agg.grow(50, display_progress=False)
+    restored.grow(50, display_progress=False)
+    _assert_same(restored, agg)
+    _assert_same(restored, whole)
+
+@pytest.mark.parametrize('cls', [drp.Aggregate2D, drp.Aggregate3D])
+def test_round_trip_mid_walk_long_jump(cls, tmp_path):
+    # stopping on steps leaves the walker, and its long jump cache, mid-walk
+    path = str(tmp_path/'agg.drpl')
+    agg = cls(seed=11, engine=drp.WalkEngine.LONG_JUMP, spawn_type=drp.SpawnType.LAUNCH)
+    agg.generate(500, display_progress=False, max_steps=123457)
+    agg.save(path)
+    restored = cls.load(path)
+    agg.grow(300, display_progress=False)
+    restored.grow(300, display_progress=False)
+    _assert_same(restored, agg)
+
+@pytest.mark.parametrize('stats_bits', [64, 0])
+def test_round_trip_stats_window(stats_bits, tmp_path):
+    path = str(tmp_path/'agg.drpl')
+    agg = drp.Aggregate2D(seed=26, stats_bits=stats_bits)
+    agg.stats_window = 16
+    agg.generate(100, display_progress=False)
+    agg.save(path)
+    restored = drp.Aggregate2D.load(path)
+    assert restored.stats_window == 16
+    keys = ('window', 'window_mean_steps', 'window_mean_boundary_collisions')
+    assert [restored.stats[key] for key in keys] == [agg.stats[key] for key in keys]
+    agg.grow(50, display_progress=False)
+    restored.grow(50, display_progress=False)
+    assert [restored.stats[key] for key in keys] == [agg.stats[key] for key in keys]
+
+def _downgrade(path, version):
+    # rewrites a checkpoint with the header of an earlier format version
+    with open(path, 'rb') as f:
+        data = f.read()
+    header = checkpoint._HEADER
+    fields = list(header.unpack_from(data, 0))
+    fields[1] = version
+    old = checkpoint._HEADERS[version]
+    packed = old.pack(*fields[:len(old.unpack(bytes(old.size)))])
+    body = data[header.size + checkpoint._padding(header.size):]
+    with open(path, 'wb') as f:
+        f.write(packed + b'\0'*checkpoint._padding(len(packed)) + body)
+
+@pytest.mark.parametrize('version', [1, 2, 3])
+def test_load_earlier_version(version, tmp_path):
+    path = str(tmp_path/'agg.drpl')
+    agg = drp.Aggregate2D(seed=25, engine=drp.WalkEngine.LONG_JUMP)
+    agg.generate(80, display_progress=False)
+    agg.save(path)
+    _downgrade(path, version)
+    restored = drp.Aggregate2D.load(path)
+    _assert_same(restored, agg)
+    if version < 3:
+        assert restored._this.jump.skip == 0
+        assert not restored._this.jump.valid
+    assert restored.stats_window == 1000
+
+def test_checkpoint_every_writes_latest_state(tmp_path):
+    path = str(tmp_path/'agg.drpl')
+    agg = drp.Aggregate2D(seed=22)
+    agg.generate(90, display_progress=False, checkpoint_path=path, checkpoint_every=40)
+    _assert_same(drp.Aggregate2D.load(path), agg)
+
+def test_checkpoint_path_alone_writes_final_state(tmp_path):
+    path = str(tmp_path/'agg.drpl')
+    agg = drp.Aggregate3D(seed=23)
+    agg.generate(60, display_progress=False, checkpoint_path=path)
+    assert os.path.exists(path)
+    _assert_same(drp.Aggregate3D.load(path), agg)
+
+@pytest.fixture
+def saved(tmp_path):
+    path = str(tmp_path/'agg.drpl')
+    agg = drp.Aggregate2D(seed=24)
+    agg.generate(80, display_progress=False)
+    agg.save(path)
+    return path
+
+def _truncate(path, size):
+    with open(path, 'r+b') as f:
+        f.truncate(size)
+
+@pytest.mark.parametrize('keep', [
+    checkpoint._HEADER.size - 1, # within the header
+    checkpoint._HEADER.size + 16, # within the particle co-ordinates
+    -8]) # within the statistics window
+def test_truncated_file(saved, keep):
+    _truncate(saved, keep if keep > 0 else os.path.getsize(saved) + keep)
+    with pytest.raises(ValueError, match="truncated"):
+        drp.Aggregate2D.load(saved)
+
+def test_corrupt_vector_size(saved):
+    # a vector size beyond the end of the file must not be read
+    offset = struct.calcsize(checkpoint._HEADER_V1) - 8*8
+    with open(saved, 'r+b') as f:
+        f.seek(offset)
+        f.write((2**40).to_bytes(8, 'little'))
+    with pytest.raises(ValueError, match="truncated"):
+        drp.Aggregate2D.load(saved)
+
+def test_not_a_checkpoint(saved):
+    _truncate(saved, 4)
+    with pytest.raises(ValueError, match="not a droplet checkpoint"):
+        drp.Aggregate2D.load(saved)
+    with open(saved, 'wb') as f:
+        f.write(b'\0'*256)
+    with pytest.raises(ValueError, match="not a droplet checkpoint"):
+        drp.Aggregate2D.load(saved)
+
+def test_wrong_dimensions(saved):
+    with pytest.raises(ValueError, match="2D aggregate"):
+        drp.Aggregate3D.load(saved)
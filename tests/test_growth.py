@@ -0,0 +1,74 @@
+"""Resumable growth, `grow` and `extend_to`, in each storage mode."""
+import numpy as np
+import pytest
+import droplet as drp
+
+AGGREGATES = [drp.Aggregate2D, drp.Aggregate3D]
+STORAGE = [(compact, stats_bits) for compact in (False, True) for stats_bits in (64, 32, 0)]
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+@pytest.mark.parametrize('compact,stats_bits', STORAGE)
+def test_extend_to_reaches_exact_size(cls, compact, stats_bits):
+    agg = cls(seed=11, compact=compact, stats_bits=stats_bits)
+    agg.generate(100, display_progress=False)
+    assert agg.extend_to(150, display_progress=False) == drp.StopReason.COUNT
+    assert agg.size == 151
+    assert agg.stats['count'] == 150
+    assert len(agg.required_steps) == (150 if stats_bits else 0)
+    # already large enough, nothing is added
+    assert agg.extend_to(120, display_progress=False) == drp.StopReason.COUNT
+    assert agg.size == 151
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+@pytest.mark.parametrize('compact,stats_bits', STORAGE)
+def test_grow_continues_generation(cls, compact, stats_bits):
+    whole = cls(seed=12, compact=compact, stats_bits=stats_bits)
+    whole.generate(150, display_progress=False)
+    parts = cls(seed=12, compact=compact, stats_bits=stats_bits)
+    parts.generate(60, display_progress=False)
+    parts.grow(40, display_progress=False)
+    assert parts.size == 101
+    parts.extend_to(150, display_progress=False)
+    assert np.array_equal(parts.as_ndarray(), whole.as_ndarray())
+    assert np.array_equal(parts.required_steps, whole.required_steps)
+    assert np.array_equal(parts.boundary_collisions, whole.boundary_collisions)
+
+@pytest.mark.parametrize('compact,stats_bits', STORAGE)
+def test_extend_to_line_attractor(compact, stats_bits):
+    agg = drp.Aggregate2D(seed=13, compact=compact, stats_bits=stats_bits,
+                          attractor_type=drp.AttractorType.LINE)
+    agg.attractor_size = 20
+    agg.generate(50, display_progress=False)
+    agg.extend_to(80, display_progress=False)
+    assert agg.size == 20 + 80
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+@pytest.mark.parametrize('compact,stats_bits', STORAGE)
+def test_extend_to_after_load(cls, compact, stats_bits, tmp_path):
+    path = str(tmp_path/'agg.drpl')
+    agg = cls(seed=14, compact=compact, stats_bits=stats_bits)
+    agg.generate(100, display_progress=False)
+    agg.save(path)
+    restored = cls.load(path)
+    restored.extend_to(150, display_progress=False)
+    assert restored.size == 151
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+def test_views_block_growth(cls):
+    agg = cls(seed=14)
+    agg.generate(50, display_progress=False)
+    expected = agg.as_ndarray()
+    view = agg.as_ndarray(copy=False)
+    head = view[:10] # derived arrays also hold the memory
+    steps = agg.required_steps_as_ndarray(copy=False)
+    del view
+    for grow in (lambda: agg.grow(20000, display_progress=False),
+                 lambda: agg.extend_to(20000, display_progress=False),
+                 lambda: next(agg.generate_stream(20000))):
+        with pytest.raises(RuntimeError, match="copy=False"):
+            grow()
+    assert agg.size == 51
+    assert np.array_equal(head, expected[:10])
+    del head, steps
+    agg.grow(20000, display_progress=False)
+    assert np.array_equal(agg.as_ndarray(copy=False)[:51], expected)
@@ -0,0 +1,107 @@
+"""Seed reproducibility of each walk engine and thread count, and lattice
+invariants of the occupancy-based collision detection."""
+import numpy as np
+import pytest
+import droplet as drp
+
+AGGREGATES = [drp.Aggregate2D, drp.Aggregate3D]
+MOVES = {
+    (2, drp.LatticeType.SQUARE) : [(1, 0), (0, 1)],
+    (2, drp.LatticeType.TRIANGLE) : [(1, 0), (1, 1), (1, -1)],
+    (3, drp.LatticeType.SQUARE) : [(1, 0, 0), (0, 1, 0), (0, 0, 1)],
+    (3, drp.LatticeType.TRIANGLE) : [(1, 1, 0), (1, -1, 0), (1, 0, 0), (0, 0, 1)]
+}
+
+def _generate(cls, nparticles, **kwargs):
+    agg = cls(**kwargs)
+    agg.generate(nparticles, display_progress=False)
+    return agg
+
+def _assert_same(lhs, rhs):
+    assert np.array_equal(lhs.as_ndarray(), rhs.as_ndarray())
+    assert np.array_equal(lhs.required_steps, rhs.required_steps)
+    assert np.array_equal(lhs.boundary_collisions, rhs.boundary_collisions)
+
+def _assert_lattice_aggregate(agg, lattice_type):
+    """Asserts that no site is occupied twice and that every stuck particle
+    lies a single lattice step from a particle which stuck before it."""
+    coords = agg.as_ndarray()
+    dims = coords.shape[1]
+    assert len(np.unique(coords, axis=0)) == len(coords)
+    nattractor = len(agg.attractor_as_ndarray())
+    moves = np.array(MOVES[(dims, lattice_type)])
+    moves = np.concatenate((moves, -moves))
+    for i in range(nattractor, len(coords)):
+        neighbours = coords[i] + moves
+        earlier = coords[:i]
+        assert (earlier[:, None, :] == neighbours[None, :, :]).all(axis=2).any(), i
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+@pytest.mark.parametrize('engine', list(drp.WalkEngine))
+@pytest.mark.parametrize('spawn_type', list(drp.SpawnType))
+def test_seed_reproduces_aggregate(cls, engine, spawn_type):
+    kwargs = dict(engine=engine, spawn_type=spawn_type)
+    first = _generate(cls, 200, seed=21, **kwargs)
+    second = _generate(cls, 200, seed=21, **kwargs)
+    _assert_same(first, second)
+    other = _generate(cls, 200, seed=22, **kwargs)
+    assert not np.array_equal(first.as_ndarray(), other.as_ndarray())
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+@pytest.mark.parametrize('engine', list(drp.WalkEngine))
+def test_occupancy_types_agree(cls, engine):
+    dense = _generate(cls, 200, seed=23, engine=engine,
+                      occupancy_type=drp.OccupancyType.DENSE)
+    sparse = _generate(cls, 200, seed=23, engine=engine,
+                       occupancy_type=drp.OccupancyType.SPARSE)
+    _assert_same(dense, sparse)
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+@pytest.mark.parametrize('lattice_type', list(drp.LatticeType))
+@pytest.mark.parametrize('engine', list(drp.WalkEngine))
+@pytest.mark.parametrize('spawn_type', list(drp.SpawnType))
+def test_particles_stick_next_to_aggregate(cls, lattice_type, engine, spawn_type):
+    agg = _generate(cls, 300, seed=24, lattice_type=lattice_type, engine=engine,
+                    spawn_type=spawn_type)
+    assert agg.size == 301
+    _assert_lattice_aggregate(agg, lattice_type)
+
+@pytest.mark.parametrize('cls,attractor_type', [
+    (drp.Aggregate2D, drp.AttractorType.LINE),
+    (drp.Aggregate3D, drp.AttractorType.LINE),
+    (drp.Aggregate3D, drp.AttractorType.PLANE)])
+def test_particles_stick_next_to_attractor(cls, attractor_type):
+    agg = cls(seed=25, attractor_type=attractor_type)
+    agg.attractor_size = 10
+    agg.generate(100, display_progress=False)
+    _assert_lattice_aggregate(agg, drp.LatticeType.SQUARE)
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+@pytest.mark.parametrize('engine', list(drp.WalkEngine))
+def test_deterministic_parallel_is_independent_of_threads(cls, engine):
+    aggs = []
+    for threads in (1, 2, 4):
+        agg = cls(seed=26, engine=engine)
+        agg.generate(300, display_progress=False, threads=threads, walkers=4,
+                     deterministic=True)
+        aggs.append(agg)
+    for agg in aggs[1:]:
+        _assert_same(aggs[0], agg)
+    # but does depend on the number of walkers
+    other = cls(seed=26, engine=engine)
+    other.generate(300, display_progress=False, threads=2, walkers=3, deterministic=True)
+    assert not np.array_equal(aggs[0].as_ndarray(), other.as_ndarray())
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+@pytest.mark.parametrize('engine', list(drp.WalkEngine))
+def test_parallel_commits_consistent_aggregate(cls, engine):
+    agg = cls(seed=27, engine=engine)
+    agg.generate(400, display_progress=False, threads=4)
+    assert agg.size == 401
+    assert agg.stats['count'] == 400
+    assert len(agg.required_steps) == 400
+    _assert_lattice_aggregate(agg, drp.LatticeType.SQUARE)
+    # growth continues on the single-threaded engine
+    agg.grow(50, display_progress=False)
+    assert agg.size == 451
+    _assert_lattice_aggregate(agg, drp.LatticeType.SQUARE)
@@ -0,0 +1,86 @@
+"""Running statistics maintained during generation against those computed from
+the recorded particles and steps."""
+import numpy as np
+import pytest
+import droplet as drp
+
+AGGREGATES = [drp.Aggregate2D, drp.Aggregate3D]
+
+def _histogram(steps):
+    """Bins steps as `stats['steps_histogram']`, bin `k > 0` counting steps in
+    `[2**(k-1), 2**k)` and bin 0 counting zero steps."""
+    bins = np.zeros(64, dtype=np.int64)
+    np.add.at(bins, [int(s).bit_length() for s in steps], 1)
+    return bins
+
+def _assert_geometry(stats, coords):
+    coords = coords.astype(float)
+    com = coords.mean(axis=0)
+    assert stats['size'] == len(coords)
+    assert np.allclose(stats['center_of_mass'], com)
+    rg = np.sqrt(np.mean(np.sum((coords - com)**2, axis=1)))
+    assert stats['radius_of_gyration'] == pytest.approx(rg, rel=1e-9)
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+@pytest.mark.parametrize('engine', list(drp.WalkEngine))
+def test_stats_match_recorded_particles(cls, engine):
+    agg = cls(seed=51, engine=engine)
+    agg.generate(400, display_progress=False)
+    stats = agg.stats
+    _assert_geometry(stats, agg.as_ndarray())
+    steps = np.array(agg.required_steps)
+    bcolls = np.array(agg.boundary_collisions)
+    assert stats['count'] == 400
+    assert stats['mean_steps'] == pytest.approx(steps.mean())
+    assert stats['mean_boundary_collisions'] == pytest.approx(bcolls.mean())
+    assert stats['max_steps'] == steps.max()
+    assert np.array_equal(stats['steps_histogram'], _histogram(steps))
+
+@pytest.mark.parametrize('cls,attractor_type', [
+    (drp.Aggregate2D, drp.AttractorType.LINE),
+    (drp.Aggregate3D, drp.AttractorType.LINE),
+    (drp.Aggregate3D, drp.AttractorType.PLANE)])
+def test_stats_include_attractor(cls, attractor_type):
+    agg = cls(seed=52, attractor_type=attractor_type)
+    agg.attractor_size = 10
+    agg.generate(100, display_progress=False)
+    nattractor = len(agg.attractor_as_ndarray())
+    assert nattractor > 1
+    assert agg.stats['size'] == nattractor + 100
+    assert agg.stats['count'] == 100
+    _assert_geometry(agg.stats, agg.as_ndarray())
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+def test_window(cls):
+    agg = cls(seed=53)
+    agg.stats_window = 50
+    assert agg.stats_window == 50
+    agg.generate(30, display_progress=False)
+    # a window which has not yet filled averages over the particles so far
+    assert agg.stats['window'] == 30
+    assert agg.stats['window_mean_steps'] == pytest.approx(np.mean(agg.required_steps))
+    agg.generate(170, display_progress=False)
+    stats = agg.stats
+    assert stats['window'] == 50
+    assert stats['window_mean_steps'] == pytest.approx(np.mean(agg.required_steps[-50:]))
+    assert stats['window_mean_boundary_collisions'] == \
+        pytest.approx(np.mean(agg.boundary_collisions[-50:]))
+    # changing the window restarts it without affecting the totals
+    agg.stats_window = 20
+    assert agg.stats['window'] == 0
+    assert agg.stats['count'] == 200
+    agg.grow(25, display_progress=False)
+    assert agg.stats['window'] == 20
+    assert agg.stats['window_mean_steps'] == pytest.approx(np.mean(agg.required_steps[-20:]))
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+def test_stats_without_recorded_steps(cls):
+    recorded = cls(seed=54)
+    recorded.generate(200, display_progress=False)
+    unrecorded = cls(seed=54, stats_bits=0)
+    unrecorded.generate(200, display_progress=False)
+    assert len(unrecorded.required_steps) == 0
+    lhs, rhs = recorded.stats, unrecorded.stats
+    assert lhs.keys() == rhs.keys()
+    for key in lhs:
+        assert np.array_equal(lhs[key], rhs[key]), key
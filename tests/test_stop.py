@@ -0,0 +1,106 @@
+"""Stop conditions and cancellation of generation."""
+import asyncio
+import threading
+import time
+import numpy as np
+import pytest
+import droplet as drp
+
+AGGREGATES = [drp.Aggregate2D, drp.Aggregate3D]
+BIG = 10**7
+
+def _assert_consistent(agg):
+    """Asserts that the particles, statistics and recorded steps agree."""
+    count = agg.size - len(agg.attractor_as_ndarray())
+    assert agg.stats['count'] == count
+    assert len(agg.required_steps) == count
+    coords = agg.as_ndarray()
+    assert np.isclose(agg.radius**2, np.max(np.sum(coords**2, axis=1)))
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+def test_count(cls):
+    agg = cls(seed=31)
+    assert agg.stop_reason == drp.StopReason.NONE
+    assert agg.generate(50, display_progress=False) == drp.StopReason.COUNT
+    assert agg.stop_reason == drp.StopReason.COUNT
+    assert agg.size == 51
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+@pytest.mark.parametrize('threads', [1, 2])
+def test_max_radius(cls, threads):
+    agg = cls(seed=32)
+    reason = agg.generate(BIG, display_progress=False, threads=threads, max_radius=12)
+    assert reason == drp.StopReason.RADIUS
+    assert agg.radius >= 12
+    _assert_consistent(agg)
+    # the aggregate can be grown further
+    size = agg.size
+    assert agg.grow(20, display_progress=False) == drp.StopReason.COUNT
+    assert agg.size == size + 20
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+def test_max_steps(cls):
+    agg = cls(seed=33)
+    agg.generate(20, display_progress=False)
+    assert agg.generate(BIG, display_progress=False, max_steps=5000) == drp.StopReason.STEPS
+    # the particle stuck by the walker which crosses the budget is kept
+    assert np.sum(agg.required_steps[20:-1]) < 5000
+    _assert_consistent(agg)
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+def test_max_time(cls):
+    agg = cls(seed=34)
+    start = time.perf_counter()
+    assert agg.generate(BIG, display_progress=False, max_time=0.05) == drp.StopReason.TIME
+    assert time.perf_counter() - start < 5.0
+    assert agg.size < BIG
+    _assert_consistent(agg)
+
+def test_limits_with_checkpoints(tmp_path):
+    path = str(tmp_path/'agg.drpl')
+    agg = drp.Aggregate2D(seed=35)
+    reason = agg.generate(BIG, display_progress=False, checkpoint_path=path,
+                          checkpoint_every=25, max_radius=10)
+    assert reason == drp.StopReason.RADIUS
+    restored = drp.Aggregate2D.load(path)
+    assert np.array_equal(restored.as_ndarray(), agg.as_ndarray())
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+@pytest.mark.parametrize('threads', [1, 2])
+def test_cancel_from_another_thread(cls, threads):
+    agg = cls(seed=36)
+    timer = threading.Timer(0.05, agg.cancel)
+    timer.start()
+    try:
+        reason = agg.generate(BIG, display_progress=False, threads=threads)
+    finally:
+        timer.cancel()
+    assert reason == drp.StopReason.CANCELLED
+    assert agg.stop_reason == drp.StopReason.CANCELLED
+    _assert_consistent(agg)
+    # a cancellation applies to a single generation
+    size = agg.size
+    assert agg.grow(10, display_progress=False) == drp.StopReason.COUNT
+    assert agg.size == size + 10
+
+def test_cancel_before_generation():
+    agg = drp.Aggregate2D(seed=37)
+    agg.generate(10, display_progress=False)
+    agg.cancel()
+    assert agg.generate(10, display_progress=False) == drp.StopReason.CANCELLED
+    assert agg.size == 11
+    assert agg.generate(10, display_progress=False) == drp.StopReason.COUNT
+    assert agg.size == 21
+
+def test_cancel_from_event_loop():
+    async def run(agg):
+        task = asyncio.ensure_future(
+            asyncio.to_thread(agg.generate, BIG, display_progress=False))
+        # the event loop keeps running while the aggregate is generated
+        await asyncio.sleep(0.05)
+        assert not task.done()
+        agg.cancel()
+        return await asyncio.wait_for(task, timeout=10.0)
+    agg = drp.Aggregate3D(seed=38)
+    assert asyncio.run(run(agg)) == drp.StopReason.CANCELLED
+    _assert_consistent(agg)
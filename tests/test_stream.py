@@ -0,0 +1,84 @@
+"""Batches yielded by the synchronous and asynchronous streams of growth."""
+import asyncio
+import numpy as np
+import pytest
+import droplet as drp
+
+AGGREGATES = [drp.Aggregate2D, drp.Aggregate3D]
+
+def _generated(cls, seed, *counts):
+    agg = cls(seed=seed)
+    for count in counts:
+        agg.generate(count, display_progress=False)
+    return agg
+
+async def _collect(stream):
+    return [item async for item in stream]
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+@pytest.mark.parametrize('batch', [1, 7, 100])
+def test_generate_stream_batches(cls, batch):
+    agg = cls(seed=61)
+    counts = []
+    for coords, colors, count in agg.generate_stream(50, batch=batch):
+        # the array spans the final size and is filled up to the current count
+        assert coords.shape == (51, 2 if cls is drp.Aggregate2D else 3)
+        assert np.array_equal(coords[:count + 1], agg.as_ndarray()[:count + 1])
+        assert len(colors) >= count + 1
+        counts.append(count)
+    # counts step by the batch, the final batch holding the remainder
+    assert counts == list(range(batch, 50, batch)) + [50]
+    assert np.array_equal(coords, _generated(cls, 61, 50).as_ndarray())
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+def test_generate_stream_after_generate(cls):
+    agg = _generated(cls, 62, 20)
+    for coords, _, count in agg.generate_stream(30, batch=4):
+        pass
+    assert count == 30
+    assert coords.shape[0] == 51
+    assert np.array_equal(coords, agg.as_ndarray())
+    assert np.array_equal(coords, _generated(cls, 62, 20, 30).as_ndarray())
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+def test_realtime_frames_cover_filled_rows(cls):
+    pytest.importorskip('matplotlib')
+    from droplet.realtime import _filled
+    # frames include the attractor and particles of earlier generation
+    agg = _generated(cls, 64, 20)
+    for coords, _, count in agg.generate_stream(30, batch=4):
+        assert np.array_equal(coords[:_filled(coords, 30, count)], agg.as_ndarray())
+
+@pytest.mark.parametrize('cls', AGGREGATES)
+@pytest.mark.parametrize('batch', [1, 8])
+def test_agenerate_stream_yields_new_particles(cls, batch):
+    agg = _generated(cls, 63, 10)
+    items = asyncio.run(_collect(agg.agenerate_stream(45, batch=batch)))
+    assert all(len(coords) <= batch for coords, _ in items)
+    assert [count for _, count in items] == list(range(batch, 45, batch)) + [45]
+    new = np.concatenate([coords for coords, _ in items])
+    assert np.array_equal(new, agg.as_ndarray()[11:])
+    assert np.array_equal(agg.as_ndarray(), _generated(cls, 63, 10, 45).as_ndarray())
+
+def test_agenerate_stream_close_stops_generation():
+    async def consume(agg):
+        stream = agg.agenerate_stream(10**6, batch=10, maxsize=2)
+        async for _, count in stream:
+            if count >= 50:
+                break
+        await stream.aclose()
+        return count
+    agg = drp.Aggregate2D(seed=64)
+    count = asyncio.run(consume(agg))
+    # the producer runs at most a full queue of batches ahead of the consumer
+    size = agg.size
+    assert count <= size - 1 <= count + 4*10
+    asyncio.run(asyncio.sleep(0.05))
+    assert agg.size == size
+    assert agg.grow(5, display_progress=False) == drp.StopReason.COUNT
+
+def test_agenerate_stream_rejects_empty_batch():
+    agg = _generated(drp.Aggregate2D, 65, 10)
+    with pytest.raises(ValueError):
+        asyncio.run(_collect(agg.agenerate_stream(10, batch=0)))
+    assert agg.size == 11